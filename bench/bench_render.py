@@ -0,0 +1,44 @@
+# Micro-benchmark: per-route render time with and without the compiled template registry.
+# Usage: python bench/bench_render.py [iterations]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'sqli'), os.path.join(ROOT, 'xss')]
+os.environ.setdefault('SQLI_SLEEP_MODE', 'deferred')
+# One client here sends far more than the per-client rate limits allow.
+os.environ.setdefault('SQLI_RATE_LIMIT', '0')
+os.environ.setdefault('XSS_RATE_LIMIT', '0')
+
+import vuln_sqli
+import vuln_xss
+
+ROUTES = {
+    'sqli': (vuln_sqli, ['/level1', '/level2?id=1', '/level3?search=a', '/level4', '/level5?u=user',
+                         '/level6', '/level7?id=1', '/level8', '/level9?q=a', '/level10']),
+    'xss': (vuln_xss, ['/level1?q=x', '/level2', '/level3', '/level4?q=x', '/level5', '/level6',
+                       '/level7', '/level8?q=x', '/level9', '/level10']),
+}
+
+def time_route(client, path, iterations):
+    client.get(path)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        client.get(path)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'route':<22}{'uncached us':>14}{'compiled us':>14}{'speedup':>10}")
+    for name, (module, paths) in ROUTES.items():
+        client = module.app.test_client()
+        for path in paths:
+            module.templates.cache = False
+            before = time_route(client, path, iterations)
+            module.templates.cache = True
+            after = time_route(client, path, iterations)
+            print(f"{name + ' ' + path.split('?')[0]:<22}{before:>14.1f}{after:>14.1f}{before / after:>9.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# Benchmark for dojo/scoreboard.py at class size: trainees (500 by default)
+# attempt random levels of both dojos and solve some. Times folding events into
+# the scoreboard, folding them from the shared event file as a worker would, and
+# answering /scoreboard; checks the incremental leaderboard against a full
+# recount of the same events.
+# Usage: python bench/bench_scoreboard.py [trainees] [events]
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask
+
+from dojo import scoreboard
+
+def simulate(trainees, count, seed=7):
+    rng = random.Random(seed)
+    sids = [f'{rng.getrandbits(128):032x}' for _ in range(trainees)]
+    levels = [(app, f'level{i}') for app in ('sqli', 'xss') for i in range(1, 11)]
+    at = 1_700_000_000.0
+    events = []
+    for _ in range(count):
+        at += rng.random() * 0.01
+        app, level = rng.choice(levels)
+        events.append((at, app, level, rng.choice(sids), rng.random() < 0.05))
+    return events
+
+def recount(events):
+    # The slow way: scores from the whole log, sorted afterwards.
+    solved = {}
+    for at, app, level, trainee, ok in events:
+        if ok:
+            solved.setdefault(trainee, {}).setdefault(f'{app}/{level}', (at, level))
+    scores = []
+    for trainee, levels in solved.items():
+        score = sum(scoreboard.points(level) for _, level in levels.values())
+        scores.append((-score, max(at for at, _ in levels.values()), trainee))
+    return sorted(scores)
+
+def main():
+    trainees = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    events = simulate(trainees, count)
+
+    board = scoreboard.Scoreboard()
+    start = time.perf_counter()
+    for event in events:
+        board.apply(event)
+    elapsed = time.perf_counter() - start
+    print(f'fold in memory:   {count / elapsed:>10.0f} events/s ({elapsed / count * 1e6:.2f} us each)')
+    expected = recount(events)
+    print(f'leaderboard:      {"OK" if board.ranking == expected else "MISMATCH"} ({len(board.ranking)} ranked of {len(board.trainees)} trainees)')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bus = scoreboard.EventBus(os.path.join(tmp, 'events.jsonl'))
+        for event in events:
+            bus.publish(event)
+        replayed = scoreboard.Scoreboard()
+        reader = scoreboard.EventBus(bus.path)
+        reader.subscribe(replayed.apply)
+        start = time.perf_counter()
+        reader.poll()
+        elapsed = time.perf_counter() - start
+        print(f'fold shared file: {count / elapsed:>10.0f} events/s ({os.path.getsize(bus.path) / count:.0f} bytes each)')
+        print(f'replayed board:   {"OK" if replayed.ranking == expected else "MISMATCH"}')
+
+    scoreboard.board = board
+    app = Flask(__name__)
+    scoreboard.init_app(app, 'bench')
+    client = app.test_client()
+    rounds = 200
+    start = time.perf_counter()
+    for _ in range(rounds):
+        client.get('/scoreboard').close()
+    elapsed = time.perf_counter() - start
+    print(f'/scoreboard:      {rounds / elapsed:>10.0f} requests/s ({elapsed / rounds * 1000:.2f} ms each, top 50 of {trainees})')
+    return board.ranking != expected or replayed.ranking != expected
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,102 @@
+# Accuracy / throughput benchmark for dojo/xssverify.py. Every corpus entry is
+# a payload for one XSS level and whether it should count as solved; each one
+# is requested through the app (end to end: render + verify) and its prerendered
+# response is verified again on its own (analysis only).
+# Usage: python bench/bench_verifier.py [rounds]
+import os
+import sys
+import time
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'xss')]
+# One client here sends far more than the per-client rate limits allow.
+os.environ.setdefault('XSS_RATE_LIMIT', '0')
+
+import vuln_xss
+from dojo.xssverify import Policy, features
+
+CORPUS = [
+    ('level1', '<img src=x onerror=alert(1)>', True),
+    ('level1', '<script>alert(1)</script>', True),
+    ('level1', '<svg/onload=alert(1)>', True),
+    ('level1', '<a href="javascript:alert(1)">x</a>', True),
+    ('level1', '<iframe srcdoc="<img src=x onerror=alert(1)>"></iframe>', True),
+    ('level1', 'hello world', False),
+    ('level1', '&lt;script&gt;alert(1)&lt;/script&gt;', False),
+    ('level1', '<!-- <script>alert(1)</script> -->', False),
+    ('level1', '<textarea><img src=x onerror=alert(1)></textarea>', False),
+    ('level1', '<script type="text/plain">alert(1)</script>', False),
+    ('level2', '<img src=x onerror=alert(1)>', True),
+    ('level2', 'just a comment', False),
+    ('level4', '<img src=x onerror=alert(1)>', True),
+    ('level4', '<body onload=alert(1)>', True),
+    ('level4', '<script>alert(1)</script>', False),
+    ('level4', '<ScRiPt>alert(1)</ScRiPt>', False),
+    ('level5', '" onmouseover="alert(1)', True),
+    ('level5', '" autofocus onfocus="alert(1)', True),
+    ('level5', '<script>alert(1)</script>', False),
+    ('level5', 'neo', False),
+    ('level6', 'javascript:alert(1)', True),
+    ('level6', ' JaVaScRiPt:alert(1)', True),
+    ('level6', 'https://example.org/', False),
+    ('level6', '" onclick="alert(1)', False),
+    ('level7', "';alert(1);'", True),
+    ('level7', "'-alert(1)-'", True),
+    ('level7', "';alert(1);//", False),
+    ('level7', "it's", False),
+    ('level7', 'System OK', False),
+    ('level8', '%3Cimg%20src%3Dx%20onerror%3Dalert(1)%3E', True),
+    ('level8', '%3Cscript%3Ealert(1)%3C%2Fscript%3E', True),
+    ('level8', '<script>alert(1)</script>', False),
+    ('level8', 'plain', False),
+    ('level10', '<script src="/api/widgets?callback=alert(1)"></script>', True),
+    ('level10', '<script>alert(1)</script>', False),
+    ('level10', '<img src=x onerror=alert(1)>', False),
+    ('level10', '<script src="https://evil.example/x.js"></script>', False),
+]
+
+def request(client, level, payload):
+    if level == 'level2':
+        client.get('/reset')
+        client.post('/level2', data={'comment': payload})
+        return client.get('/level2')
+    arg = vuln_xss.verifier.levels[level] or 'q'
+    # Level 8 decodes its raw query string twice: corpus entries are encoded once more here.
+    return client.get(f'/{level}?{arg}=' + (quote(payload) if level == 'level8' else quote(payload, safe='')))
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    client = vuln_xss.app.test_client()
+    wrong = []
+    pages = []
+    for level, payload, expected in CORPUS:
+        response = request(client, level, payload)
+        solved = response.headers.get('X-Dojo-Solved') == level
+        if solved != expected:
+            wrong.append((level, payload, expected))
+        pages.append((response.get_data(as_text=True), response.headers.get('Content-Security-Policy', ''), level))
+    print(f'accuracy: {len(CORPUS) - len(wrong)}/{len(CORPUS)}')
+    for level, payload, expected in wrong:
+        print(f'  MISS {level:<8} expected {"solved" if expected else "unsolved":<9} {payload!r}')
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for doc, csp, level in pages:
+            features(doc, Policy(csp), vuln_xss.verifier.gadgets)
+    elapsed = time.perf_counter() - start
+    count = rounds * len(pages)
+    print(f'analysis only: {count / elapsed:>10.0f} verifications/s ({elapsed / count * 1e6:.0f} us each)')
+
+    e2e_rounds = max(1, rounds // 10)
+    start = time.perf_counter()
+    for _ in range(e2e_rounds):
+        for level, payload, _ in CORPUS:
+            request(client, level, payload).close()
+    elapsed = time.perf_counter() - start
+    count = e2e_rounds * len(CORPUS)
+    print(f'end to end:    {count / elapsed:>10.0f} requests/s      ({elapsed / count * 1e6:.0f} us each, level2 includes reset + post)')
+    return wrong
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
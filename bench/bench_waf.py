@@ -0,0 +1,81 @@
+# Adversarial-input benchmark for dojo/waf.py. For growing input sizes it times
+# the old per-level checks (plain re / str calls) against the compiled engine,
+# and fuzz-checks that both give identical results.
+# Usage: python bench/bench_waf.py [max_kb]
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dojo import waf
+
+def legacy_level4(q):
+    s = re.sub(r'(?i)<script.*?>.*?</script>', '[BLOCKED]', q)
+    return re.sub(r'(?i)<script', '[BLOCKED]', s)
+
+def legacy_level9(s):
+    return bool(re.search(r'union\s+select', s, re.IGNORECASE))
+
+def legacy_level8(s):
+    return '<script' in s.lower() or 'javascript:' in s.lower()
+
+# Worst cases: every '<script>' opener forces the lazy groups to scan to the end of the line.
+ADVERSARIAL = {
+    'xss level4 <script> flood': (lambda n: '<script>' * (n // 8), legacy_level4, waf.XSS_LEVEL4.sanitize),
+    'xss level4 <script>x ... >': (lambda n: '<script>x' * (n // 9) + '</scrip', legacy_level4, waf.XSS_LEVEL4.sanitize),
+    'sqli level9 union+spaces': (lambda n: ('union' + ' ' * 64) * (n // 69), legacy_level9,
+                                 lambda s: waf.SQLI_LEVEL9.check(s) is not None),
+    'xss level8 near-miss': (lambda n: '<scrip' * (n // 6), legacy_level8, lambda s: waf.XSS_LEVEL8.check(s) is not None),
+}
+
+LEGACY_CUTOFF_MS = 1000
+
+def timed(func, arg):
+    start = time.perf_counter()
+    result = func(arg)
+    return result, (time.perf_counter() - start) * 1000
+
+def fuzz(rounds=50000):
+    random.seed(0)
+    alphabet4 = ['<script', '<SCRİPT', '<ſcript', '>', '</script>', '</SCRIPT>', '\n', 'a', ' ', '<', '</scrip']
+    alphabet9 = ['union', 'UNION', 'unıon', 'select', 'ſelect', ' ', '\t', '\n', 'x', 'un', 'ion']
+    alphabet8 = ['<script', '<SCRİPT', 'javascript:', 'JAVA', 'script:', 'K', '<', 'x']
+    for _ in range(rounds):
+        text = ''.join(random.choice(alphabet4) for _ in range(random.randint(0, 12)))
+        assert waf.XSS_LEVEL4.sanitize(text) == legacy_level4(text), repr(text)
+        text = ''.join(random.choice(alphabet9) for _ in range(random.randint(0, 10)))
+        assert (waf.SQLI_LEVEL9.check(text) is not None) == legacy_level9(text), repr(text)
+        text = ''.join(random.choice(alphabet8) for _ in range(random.randint(0, 8)))
+        assert (waf.XSS_LEVEL8.check(text) is not None) == legacy_level8(text), repr(text)
+    print(f'fuzz: {rounds} random inputs per level, engine == legacy')
+
+def main():
+    max_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    fuzz()
+    # The engine's length budget would reject these outright; lift it to time the scan itself.
+    for ruleset in (waf.SQLI_LEVEL9, waf.XSS_LEVEL4, waf.XSS_LEVEL8):
+        ruleset.max_length = max_kb * 1024 * 2
+    print(f"{'case':<30}{'size':>8}{'legacy ms':>12}{'engine ms':>12}")
+    for name, (make, legacy, engine) in ADVERSARIAL.items():
+        size = 1
+        legacy_ok = True
+        while size <= max_kb:
+            text = make(size * 1024)
+            new, new_ms = timed(engine, text)
+            if legacy_ok:
+                old, old_ms = timed(legacy, text)
+                assert old == new, name
+                # Super-linear legacy cases blow up quickly; stop timing them past the cutoff.
+                legacy_ok = old_ms < LEGACY_CUTOFF_MS
+                legacy_col = f'{old_ms:>12.2f}'
+            else:
+                legacy_col = f"{'skipped':>12}"
+            print(f'{name:<30}{size:>6}KB{legacy_col}{new_ms:>12.2f}')
+            size *= 2
+
+if __name__ == '__main__':
+    main()
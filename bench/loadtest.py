@@ -0,0 +1,159 @@
+# Load test: drives every level route of both dojos in-process (no network)
+# with a payload mix taken from sqli/README.md and xss/README.md, at a given
+# concurrency, and reports throughput plus p50/p95/p99 latency and p50
+# time-to-first-byte per route, split into SQL and template-render time. The
+# phases are read from environ['dojo.phases'] once the body has been consumed
+# (see dojo/timing.py): streamed SQLi pages run their SQL and render the panel
+# after the Server-Timing header has been sent.
+#
+# Usage: python bench/loadtest.py [--app sqli|xss|all] [-c 16] [-n 300] [--sleep 0.5] [--json out.json]
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'sqli'), os.path.join(ROOT, 'xss')]
+os.environ.setdefault('SQLI_JOURNAL', os.path.join(tempfile.mkdtemp(prefix='dojo-bench-'), 'queries.jsonl'))
+# One client here sends far more than the per-client rate limits allow.
+os.environ.setdefault('SQLI_RATE_LIMIT', '0')
+os.environ.setdefault('XSS_RATE_LIMIT', '0')
+
+# (method, path, form) per route; '{sleep}' is replaced by --sleep.
+SQLI_MIX = {
+    'level1': [('POST', '/level1', {'username': "admin' --", 'password': 'x'}),
+               ('POST', '/level1', {'username': "admin' OR '1'='1", 'password': 'x'}),
+               ('POST', '/level1', {'username': 'user', 'password': 'wrong'})],
+    'level2': [('GET', '/level2?id=1 OR 1=1', None), ('GET', '/level2?id=1 UNION SELECT 1,2--', None),
+               ('GET', '/level2?id=2', None)],
+    'level3': [('GET', "/level3?search=' UNION SELECT id, flag, 1 FROM secrets--", None),
+               ('GET', "/level3?search=' UNION SELECT 1,sqlite_version(),1--", None),
+               ('GET', "/level3?search=' UNION SELECT sql,1,1 FROM sqlite_master--", None),
+               ('GET', '/level3?search=Plasma', None)],
+    'level4': [('GET', "/level4?uuid=1'", None), ('GET', '/level4?uuid=1"', None), ('GET', '/level4?uuid=admin', None)],
+    'level5': [('GET', "/level5?u=admin' AND SUBSTR(password,1,1) = 's'--", None),
+               ('GET', "/level5?u=admin' AND LENGTH(password) = 15--", None),
+               ('GET', "/level5?u=' OR (SELECT SUBSTR(flag,1,1) FROM secrets LIMIT 1) = 'F'--", None)],
+    'level6': [('GET', "/level6?q=' OR (SELECT CASE WHEN (SELECT SUBSTR(flag,1,1) FROM secrets LIMIT 1) = 'F' THEN sleep({sleep}) ELSE 0 END)--", None),
+               ('GET', "/level6?q=' OR (SELECT CASE WHEN (SELECT SUBSTR(flag,1,1) FROM secrets LIMIT 1) = 'X' THEN sleep({sleep}) ELSE 0 END)--", None),
+               ('GET', '/level6?q=Quantum Core', None)],
+    'level7': [('GET', '/level7?id=0/**/UNION/**/SELECT/**/flag,1,flag/**/FROM/**/secrets', None),
+               ('GET', '/level7?id=1', None), ('GET', '/level7?id=1 OR 1=1', None)],
+    'level8': [('POST', '/level8', {'username': "admin' --"}), ('GET', "/level8?step=view&user=admin' --", None),
+               ('GET', "/level8?step=view&user=admin' OR '1'='1", None)],
+    'level9': [('GET', "/level9?q=' UNION/**/SELECT id, flag, 1 FROM secrets--", None),
+               ('GET', "/level9?q=' UNION SELECT id, flag, 1 FROM secrets--", None), ('GET', '/level9?q=Chip', None)],
+    'level10': [('POST', '/level10', {'id': "1; UPDATE users SET password='pwned' WHERE username='admin';--"}),
+                ('POST', '/level10', {'id': '1'})],
+    'reset': [('GET', '/reset', None), ('GET', '/reset?level=10', None)],
+}
+XSS_MIX = {
+    'level1': [('GET', '/level1?q=<script>alert(1)</script>', None), ('GET', '/level1?q=<img src=x onerror=alert(1)>', None),
+               ('GET', '/level1?q=<svg onload=alert(1)>', None)],
+    'level2': [('POST', '/level2', {'comment': '<script>alert(document.cookie)</script>'}), ('GET', '/level2', None),
+               ('GET', '/level2', None), ('GET', '/level2', None)],
+    'level3': [('GET', '/level3', None)],
+    'level4': [('GET', '/level4?q=<img src=x onerror=alert(1)>', None), ('GET', '/level4?q=<script>alert(1)</script>', None),
+               ('GET', '/level4?q=<svg/onload=alert(1)>', None)],
+    'level5': [('GET', '/level5?u=" onmouseover="alert(1)', None), ('GET', '/level5?u=" autofocus onfocus="alert(1)', None)],
+    'level6': [('GET', '/level6?link=javascript:alert(1)', None), ('GET', '/level6?link=https://example.com', None)],
+    'level7': [('GET', "/level7?p=';alert(1);//", None), ('GET', "/level7?p='-alert(1)-'", None)],
+    'level8': [('GET', '/level8?q=%253Cscript%253Ealert(1)%253C/script%253E', None), ('GET', '/level8?q=%3Cscript%3E', None)],
+    'level9': [('GET', '/level9', None)],
+    'level10': [('GET', '/level10?q=<script src="/api/widgets?callback=alert"></script>', None), ('GET', '/level10', None)],
+    'api_widgets': [('GET', '/api/widgets', None), ('GET', '/api/widgets?callback=alert', None)],
+    'reset': [('GET', '/reset?level=2', None)],
+}
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+def summary(values):
+    return {'mean': round(sum(values) / len(values), 3) if values else 0.0,
+            'p50': round(percentile(values, 50), 3), 'p95': round(percentile(values, 95), 3),
+            'p99': round(percentile(values, 99), 3)}
+
+def server_timing(header):
+    return {name: float(dur) for name, dur in re.findall(r'(\w+);dur=([\d.]+)', header or '')}
+
+def run_route(app, requests, concurrency, total, sleep):
+    local = threading.local()
+
+    def one(i):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        method, path, form = requests[i % len(requests)]
+        path = path.replace('{sleep}', str(sleep))
+        phases = {}
+        start = time.perf_counter()
+        response = client.open(path, method=method, data=form, buffered=False, environ_overrides={'dojo.phases': phases})
+        chunks = iter(response.response)
+        next(chunks, None)
+        first = (time.perf_counter() - start) * 1000
+        for _ in chunks:
+            pass
+        response.close()
+        elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, response.status_code, ({name: seconds * 1000 for name, seconds in phases.items()} if phases else server_timing(response.headers.get('Server-Timing'))), first
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+    latencies = [s[0] for s in samples]
+    return {
+        'requests': total,
+        'errors': sum(1 for s in samples if s[1] >= 500),
+        'throughput_rps': round(total / wall, 1),
+        'latency_ms': summary(latencies),
+        'ttfb_ms': summary([s[3] for s in samples]),
+        'sql_ms': summary([s[2].get('sql', 0.0) for s in samples]),
+        'render_ms': summary([s[2].get('render', 0.0) for s in samples]),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--app', choices=('sqli', 'xss', 'all'), default='all')
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('-n', '--requests', type=int, default=300, help='requests per route')
+    parser.add_argument('--sleep', type=float, default=0.5, help='sleep() argument used by Level 6 payloads')
+    parser.add_argument('--json', help='write machine-readable results to this file')
+    args = parser.parse_args()
+
+    apps = []
+    if args.app in ('sqli', 'all'):
+        import vuln_sqli
+        apps.append(('sqli', vuln_sqli.app, SQLI_MIX))
+    if args.app in ('xss', 'all'):
+        import vuln_xss
+        apps.append(('xss', vuln_xss.app, XSS_MIX))
+
+    results = []
+    print(f"{'route':<18}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'ttfb p50':>10}{'sql p50':>10}{'render p50':>12}{'errors':>8}")
+    for name, app, mix in apps:
+        for route, requests in mix.items():
+            result = run_route(app, requests, args.concurrency, args.requests, args.sleep)
+            result.update(app=name, route=route)
+            results.append(result)
+            lat = result['latency_ms']
+            print(f"{name + ' ' + route:<18}{result['throughput_rps']:>9}{lat['p50']:>9}{lat['p95']:>9}{lat['p99']:>9}"
+                  f"{result['ttfb_ms']['p50']:>10}{result['sql_ms']['p50']:>10}{result['render_ms']['p50']:>12}{result['errors']:>8}")
+
+    if args.json:
+        meta = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                'concurrency': args.concurrency, 'requests_per_route': args.requests, 'sleep': args.sleep}
+        with open(args.json, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
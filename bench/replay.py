@@ -0,0 +1,202 @@
+# Replays a traffic capture (dojo/capture.py, written when DOJO_CAPTURE_DIR is
+# set) against a running dojo over HTTP, at the captured pace (--speed 1), N
+# times faster (--speed N) or as fast as it goes (--speed max). Each captured
+# trainee is replayed in order on its own connection with its own session
+# cookie; trainees run concurrently. Reports, per route, the captured time to
+# response headers next to the replayed one and their difference, plus status
+# codes that differ from the capture and how late requests were sent. Captured
+# times are taken inside the app and replayed ones at the client, so even an
+# idle replay shows a small positive delta (connection and WSGI server).
+#
+# A path in --target is prepended to captured paths (a single dojo's capture
+# replays against dojo.host as --target http://127.0.0.1:1110/sqli).
+#
+# Usage: python bench/replay.py CAPTURE_DIR [--target http://127.0.0.1:1111] [--speed 1|N|max] [-c 256] [--json out.json]
+import argparse
+import glob
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dojo.session import COOKIE_NAME
+
+def load(directory):
+    # Requests of every capture file, oldest first; a worker's rotated .1 file precedes its current one.
+    def order(path):
+        base = path.replace('.1.jsonl', '.jsonl')
+        return (base, path == base)
+    requests = []
+    for path in sorted(glob.glob(os.path.join(directory, 'capture-*.jsonl')), key=order):
+        pending = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # last line cut short by a crash
+                if record[0] == 'q':
+                    _, seq, at, method, route, query, body, content_type, client = record
+                    pending[seq] = entry = {'at': at, 'method': method, 'path': route, 'query': query, 'body': body,
+                                            'content_type': content_type, 'client': client,
+                                            'status': None, 'ms': None, 'issued': None}
+                    requests.append(entry)
+                elif record[0] == 'r' and record[1] in pending:
+                    entry = pending.pop(record[1])
+                    entry['status'], entry['ms'], entry['issued'] = record[2:5]
+    requests.sort(key=lambda entry: entry['at'])
+    return requests
+
+def trainees(requests):
+    # A request without a session that was handed one starts that trainee's sequence.
+    groups = {}
+    for i, entry in enumerate(requests):
+        groups.setdefault(entry['client'] or entry['issued'] or ('anonymous', i), []).append(entry)
+    return list(groups.values())
+
+class Replayer:
+    def __init__(self, target, speed, start_at):
+        url = urlsplit(target)
+        self.host = url.hostname or '127.0.0.1'
+        self.port = url.port or (443 if url.scheme == 'https' else 80)
+        self.https = url.scheme == 'https'
+        self.prefix = url.path.rstrip('/')
+        self.speed = speed
+        self.start_at = start_at
+        self.results = []
+        self._lock = threading.Lock()
+
+    def connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=60)
+
+    def run(self, entries, origin):
+        conn = self.connect()
+        sid = None
+        results = []
+        for entry in entries:
+            lag = 0.0
+            if self.speed:
+                due = origin + (entry['at'] - self.start_at) / self.speed
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                else:
+                    lag = -wait * 1000
+            url = self.prefix + entry['path'] + ('?' + entry['query'] if entry['query'] else '')
+            headers = {'Accept-Encoding': 'gzip'}
+            if sid:
+                headers['Cookie'] = f'{COOKIE_NAME}={sid}'
+            body = entry['body'].encode('utf-8') if entry['body'] is not None else None
+            if body is not None:
+                headers['Content-Type'] = entry['content_type'] or 'application/octet-stream'
+            status = None
+            first = total = 0.0
+            for _ in range(2):
+                start = time.perf_counter()
+                try:
+                    conn.request(entry['method'], url, body=body, headers=headers)
+                    response = conn.getresponse()
+                    first = (time.perf_counter() - start) * 1000
+                    response.read()
+                    total = (time.perf_counter() - start) * 1000
+                    status = response.status
+                    issued = self.session_cookie(response)
+                    if issued:
+                        sid = issued
+                    break
+                except (OSError, http.client.HTTPException):
+                    # The server closed a kept-alive connection: retry once on a new one.
+                    conn.close()
+                    conn = self.connect()
+            results.append({'path': entry['path'], 'captured_status': entry['status'], 'status': status,
+                            'captured_ms': entry['ms'], 'ttfb_ms': first, 'total_ms': total, 'lag_ms': lag})
+        conn.close()
+        with self._lock:
+            self.results.extend(results)
+
+    @staticmethod
+    def session_cookie(response):
+        for header in response.headers.get_all('Set-Cookie') or []:
+            name, _, rest = header.partition('=')
+            if name.strip() == COOKIE_NAME:
+                return rest.split(';', 1)[0]
+        return None
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+def report(results):
+    routes = {}
+    for result in results:
+        routes.setdefault(result['path'], []).append(result)
+    rows = {}
+    for route, samples in sorted(routes.items()):
+        captured = [s['captured_ms'] for s in samples if s['captured_ms'] is not None]
+        replayed = [s['ttfb_ms'] for s in samples if s['status'] is not None]
+        deltas = [s['ttfb_ms'] - s['captured_ms'] for s in samples if s['status'] is not None and s['captured_ms'] is not None]
+        rows[route] = {
+            'requests': len(samples),
+            'failed': sum(1 for s in samples if s['status'] is None),
+            'status_changed': sum(1 for s in samples if s['status'] is not None and s['captured_status'] is not None
+                                  and s['status'] != s['captured_status']),
+            'captured_p50_ms': round(percentile(captured, 50), 3),
+            'replay_p50_ms': round(percentile(replayed, 50), 3),
+            'replay_p95_ms': round(percentile(replayed, 95), 3),
+            'delta_p50_ms': round(percentile(deltas, 50), 3),
+            'delta_p95_ms': round(percentile(deltas, 95), 3),
+        }
+    return rows
+
+def main():
+    ap = argparse.ArgumentParser(description='Replay a dojo traffic capture and compare latencies.')
+    ap.add_argument('capture_dir')
+    ap.add_argument('--target', default='http://127.0.0.1:1111')
+    ap.add_argument('--speed', default='1', help="pace multiplier, or 'max' to send without waiting")
+    ap.add_argument('-c', '--concurrency', type=int, default=256, help='trainees replayed at once')
+    ap.add_argument('--json', help='write the per-route report here')
+    args = ap.parse_args()
+    speed = None if args.speed == 'max' else float(args.speed)
+
+    requests = load(args.capture_dir)
+    if not requests:
+        sys.exit(f'no captured requests in {args.capture_dir}')
+    groups = trainees(requests)
+    span = requests[-1]['at'] - requests[0]['at']
+    print(f'{len(requests)} requests from {len(groups)} trainees over {span:.1f}s, '
+          f'replaying at {"max speed" if speed is None else f"{speed:g}x"} against {args.target}', flush=True)
+
+    replayer = Replayer(args.target, speed, requests[0]['at'])
+    origin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(args.concurrency, len(groups)))) as pool:
+        for future in [pool.submit(replayer.run, group, origin) for group in groups]:
+            future.result()
+    wall = time.perf_counter() - origin
+
+    rows = report(replayer.results)
+    print(f'{"route":<22} {"n":>6} {"fail":>5} {"status":>6} {"capt p50":>9} {"repl p50":>9} {"repl p95":>9} {"d p50":>8} {"d p95":>8}')
+    for route, row in rows.items():
+        print(f'{route[:22]:<22} {row["requests"]:>6} {row["failed"]:>5} {row["status_changed"]:>6} '
+              f'{row["captured_p50_ms"]:>9.2f} {row["replay_p50_ms"]:>9.2f} {row["replay_p95_ms"]:>9.2f} '
+              f'{row["delta_p50_ms"]:>+8.2f} {row["delta_p95_ms"]:>+8.2f}')
+    lags = [r['lag_ms'] for r in replayer.results]
+    print(f'wall {wall:.1f}s ({len(requests) / wall:.0f} req/s); sent late: p50 {percentile(lags, 50):.1f} ms, '
+          f'p95 {percentile(lags, 95):.1f} ms (ms columns: time to response headers)')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'target': args.target, 'speed': args.speed, 'requests': len(requests), 'wall_s': round(wall, 3),
+                       'lag_p95_ms': round(percentile(lags, 95), 3), 'routes': rows}, f, indent=2)
+    return any(row['failed'] for row in rows.values())
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
@@ -0,0 +1 @@
+# Shared runtime pieces for the SQLi and XSS dojos.
@@ -0,0 +1,132 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from flask import Response, request
+
+from dojo import metrics
+
+# --- ADMISSION CONTROL ---
+# Levels are grouped into classes (slow/blind, query-heavy, fast) and each class
+# is a bulkhead: at most `limit` of its requests run at once in a worker, the
+# next `queue` wait their turn in arrival order, and anything beyond that is shed
+# at once with 503 and a Retry-After sized from the queue and the class's recent
+# service time. A queued request that is not admitted within `max_wait` is shed
+# too. A streamed page holds its slot until the response is closed, or until it
+# gives the slot back with vacate(): SQLi pages do so once their panel is sent,
+# before waiting out a deferred sleep() (see dojo/delay.py), so the wait holds
+# neither a sandbox nor a slot. Classes are independent: a queue of sleep()
+# requests never delays a request of another class. Limits are per worker process.
+
+class Bulkhead:
+    def __init__(self, name, limit, queue, max_wait):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.max_wait = max_wait
+        self.service_seconds = 0.1
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self._waiting = deque()
+
+    @property
+    def waiting(self):
+        return len(self._waiting)
+
+    def enter(self):
+        # True once a slot is held, False if the request is shed.
+        with self._lock:
+            if self.active < self.limit and not self._waiting:
+                self.active += 1
+                return True
+            if len(self._waiting) >= self.queue:
+                return False
+            turn = threading.Event()
+            self._waiting.append(turn)
+        if turn.wait(self.max_wait):
+            return True
+        with self._lock:
+            try:
+                self._waiting.remove(turn)
+            except ValueError:
+                return True  # handed a slot just as the wait ran out
+        return False
+
+    def leave(self, seconds):
+        # A freed slot goes straight to the oldest waiter, so arrivals cannot jump the queue.
+        with self._lock:
+            self.service_seconds += 0.2 * (seconds - self.service_seconds)
+            if self._waiting:
+                self._waiting.popleft().set()
+            else:
+                self.active -= 1
+
+    def retry_after(self):
+        return max(1, math.ceil((self.waiting + 1) * self.service_seconds / self.limit))
+
+class AdmissionControl:
+    def __init__(self, classes, queue_per_slot=4, max_wait=5.0):
+        # classes: name -> (limit, endpoints); limit 0 leaves the class unbounded.
+        self.bulkheads = {}
+        self.per_level = {}
+        for name, (limit, endpoints) in classes.items():
+            if limit <= 0:
+                continue
+            bulkhead = self.bulkheads[name] = Bulkhead(name, limit, limit * queue_per_slot, max_wait)
+            for endpoint in endpoints:
+                self.per_level[endpoint] = bulkhead
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        for bulkhead in self.bulkheads.values():
+            bulkhead._reset()
+
+    def active(self):
+        return sum(bulkhead.active for bulkhead in self.bulkheads.values())
+
+    def queued(self):
+        return sum(bulkhead.waiting for bulkhead in self.bulkheads.values())
+
+    def check(self):
+        bulkhead = self.per_level.get(request.endpoint)
+        if bulkhead is None:
+            return None
+        if bulkhead.enter():
+            request.environ['dojo.bulkhead'] = (bulkhead, time.monotonic())
+            return None
+        metrics.current().inc('dojo_admission_shed_total', (('class', bulkhead.name), ('route', request.endpoint)))
+        return Response('Server busy: this level is at capacity, retry shortly.\n', status=503, mimetype='text/plain',
+                        headers={'Retry-After': str(bulkhead.retry_after())})
+
+    def _leave(self, environ, key):
+        held = environ.pop(key, None)
+        if held is not None:
+            bulkhead, start = held
+            bulkhead.leave(time.monotonic() - start)
+
+    def release(self, response):
+        environ = request.environ
+        if response.is_streamed and 'dojo.bulkhead' in environ:
+            # Held by the stream from here on: freed when it is closed, or earlier by vacate().
+            environ['dojo.bulkhead_stream'] = environ.pop('dojo.bulkhead')
+            response.call_on_close(lambda: self._leave(environ, 'dojo.bulkhead_stream'))
+        else:
+            self._leave(environ, 'dojo.bulkhead')
+        return response
+
+    def vacate(self):
+        # Called from inside a streamed body that has sent what it needed the slot for.
+        self._leave(request.environ, 'dojo.bulkhead_stream')
+
+    def release_on_error(self, exception):
+        # A view that raised with PROPAGATE_EXCEPTIONS on (debug, testing) skips after_request.
+        self._leave(request.environ, 'dojo.bulkhead')
+
+    def init_app(self, app):
+        app.before_request(self.check)
+        app.after_request(self.release)
+        app.teardown_request(self.release_on_error)
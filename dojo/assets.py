@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import os
+from flask import Response, abort, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- SHARED STATIC ASSETS ---
+# Both dojos serve the same stylesheet bundle (base + prebuilt utilities) under
+# a content-hashed name, so browsers can cache it forever. Bodies are
+# precompressed once at import. Any font files dropped into static/fonts/ are
+# served the same way.
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+BUNDLES = {'dojo.css': ('dojo.css', 'utilities.css')}
+MIMETYPES = {'.css': 'text/css; charset=utf-8', '.woff2': 'font/woff2', '.woff': 'font/woff', '.ttf': 'font/ttf'}
+COMPRESSIBLE = ('.css', '.ttf')
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+class Asset:
+    __slots__ = ('filename', 'url', 'etag', 'mimetype', 'bodies')
+
+    def __init__(self, name, body):
+        stem, ext = os.path.splitext(name)
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.filename = f'{stem}.{self.etag}{ext}'
+        self.url = '/assets/' + self.filename
+        self.mimetype = MIMETYPES.get(ext, 'application/octet-stream')
+        self.bodies = precompress(body) if ext in COMPRESSIBLE else {'identity': body}
+
+class AssetBundle:
+    def __init__(self, static_dir=STATIC_DIR):
+        self.by_name = {}
+        self.by_filename = {}
+        for name, parts in BUNDLES.items():
+            body = b'\n'.join(read_file(os.path.join(static_dir, part)) for part in parts)
+            self.add(name, body)
+        font_dir = os.path.join(static_dir, 'fonts')
+        if os.path.isdir(font_dir):
+            for name in sorted(os.listdir(font_dir)):
+                if os.path.splitext(name)[1] in MIMETYPES:
+                    self.add('fonts/' + name, read_file(os.path.join(font_dir, name)))
+
+    def add(self, name, body):
+        asset = Asset(name, body)
+        self.by_name[name] = asset
+        self.by_filename[asset.filename] = asset
+
+    def url(self, name):
+        return self.by_name[name].url
+
+    def serve(self, filename):
+        asset = self.by_filename.get(filename)
+        if asset is None:
+            abort(404)
+        return serve_encoded(asset.bodies, asset.etag, asset.mimetype, CACHE_CONTROL)
+
+    def init_app(self, app):
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.jinja_env.globals['asset_url'] = self.url
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+# --- PRECOMPRESSED BODIES ---
+# Shared by the assets here and the cached pages in dojo/pagecache.py: one body
+# per encoding, compressed once, each variant with its own strong ETag.
+
+def precompress(body):
+    # identity plus every encoding that actually makes the body smaller.
+    bodies = {'identity': body}
+    for encoding, compress in (('gzip', lambda data: gzip.compress(data, 9, mtime=0)),
+                               ('br', brotli.compress if brotli is not None else None)):
+        if compress is not None:
+            compressed = compress(body)
+            if len(compressed) < len(body):
+                bodies[encoding] = compressed
+    return bodies
+
+def negotiate(bodies):
+    accept = request.accept_encodings
+    for encoding in ('br', 'gzip'):
+        if encoding in bodies and accept[encoding]:
+            return encoding
+    return 'identity'
+
+def serve_encoded(bodies, etag, content_type, cache_control):
+    encoding = negotiate(bodies)
+    if encoding != 'identity':
+        etag = f'{etag}-{encoding}'
+    headers = {'Cache-Control': cache_control, 'ETag': f'"{etag}"', 'Vary': 'Accept-Encoding'}
+    if etag in request.if_none_match:
+        return Response(status=304, headers=headers)
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(bodies[encoding], headers=headers, content_type=content_type)
+
+assets = AssetBundle()
+
+def init_app(app):
+    assets.init_app(app)
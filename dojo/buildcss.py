@@ -0,0 +1,213 @@
+# Builds dojo/static/utilities.css: the subset of Tailwind-style utility classes
+# the dojo templates actually use, so pages no longer need cdn.tailwindcss.com.
+# Re-run after adding new classes to a template:  python -m dojo.buildcss
+import os
+import re
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = [os.path.join(ROOT, 'sqli', 'vuln_sqli.py'), os.path.join(ROOT, 'xss', 'vuln_xss.py'),
+           os.path.join(ROOT, 'dojo', 'layout.py'), os.path.join(ROOT, 'dojo', 'host.py')]
+OUTPUT = os.path.join(ROOT, 'dojo', 'static', 'utilities.css')
+
+COLORS = {
+    'slate': {100: '#f1f5f9', 200: '#e2e8f0', 300: '#cbd5e1', 400: '#94a3b8', 500: '#64748b', 600: '#475569',
+              700: '#334155', 800: '#1e293b', 900: '#0f172a', 950: '#020617'},
+    'amber': {100: '#fef3c7', 200: '#fde68a', 300: '#fcd34d', 400: '#fbbf24', 500: '#f59e0b', 600: '#d97706',
+              700: '#b45309', 800: '#92400e', 900: '#78350f', 950: '#451a03'},
+    'cyan': {100: '#cffafe', 200: '#a5f3fc', 300: '#67e8f9', 400: '#22d3ee', 500: '#06b6d4', 600: '#0891b2',
+             700: '#0e7490', 800: '#155e75', 900: '#164e63', 950: '#083344'},
+    'red': {100: '#fee2e2', 200: '#fecaca', 300: '#fca5a5', 400: '#f87171', 500: '#ef4444', 600: '#dc2626',
+            700: '#b91c1c', 800: '#991b1b', 900: '#7f1d1d', 950: '#450a0a'},
+    'green': {100: '#dcfce7', 200: '#bbf7d0', 300: '#86efac', 400: '#4ade80', 500: '#22c55e', 600: '#16a34a',
+              700: '#15803d', 800: '#166534', 900: '#14532d', 950: '#052e16'},
+    'blue': {100: '#dbeafe', 200: '#bfdbfe', 300: '#93c5fd', 400: '#60a5fa', 500: '#3b82f6', 600: '#2563eb',
+             700: '#1d4ed8', 800: '#1e40af', 900: '#1e3a8a', 950: '#172554'},
+}
+FIXED_COLORS = {'white': '#ffffff', 'black': '#000000', 'transparent': 'transparent'}
+FONT_SIZES = {'xs': ('0.75rem', '1rem'), 'sm': ('0.875rem', '1.25rem'), 'lg': ('1.125rem', '1.75rem'),
+              'xl': ('1.25rem', '1.75rem'), '2xl': ('1.5rem', '2rem'), '3xl': ('1.875rem', '2.25rem'),
+              '4xl': ('2.25rem', '2.5rem'), '5xl': ('3rem', '1')}
+MAX_WIDTHS = {'md': '28rem', 'lg': '32rem', 'xl': '36rem', '2xl': '42rem'}
+RADII = {'': '0.25rem', '-sm': '0.125rem', '-lg': '0.5rem', '-full': '9999px'}
+SHADOWS = {'sm': '0 1px 2px 0 rgb(0 0 0 / 0.05)',
+           'lg': '0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1)',
+           'xl': '0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1)',
+           '2xl': '0 25px 50px -12px rgb(0 0 0 / 0.25)'}
+BREAKPOINTS = {'md': '768px', 'lg': '1024px'}
+STATIC = {
+    'block': 'display: block', 'inline-block': 'display: inline-block', 'flex': 'display: flex',
+    'inline-flex': 'display: inline-flex', 'grid': 'display: grid', 'hidden': 'display: none',
+    'absolute': 'position: absolute', 'relative': 'position: relative', 'sticky': 'position: sticky',
+    'flex-1': 'flex: 1 1 0%', 'flex-col': 'flex-direction: column', 'flex-row': 'flex-direction: row',
+    'flex-grow': 'flex-grow: 1', 'flex-shrink-0': 'flex-shrink: 0',
+    'items-center': 'align-items: center', 'items-end': 'align-items: flex-end',
+    'justify-between': 'justify-content: space-between', 'justify-center': 'justify-content: center',
+    'mx-auto': 'margin-left: auto; margin-right: auto', 'mt-auto': 'margin-top: auto',
+    'w-full': 'width: 100%', 'w-1/2': 'width: 50%', 'h-full': 'height: 100%', 'min-h-screen': 'min-height: 100vh',
+    'overflow-hidden': 'overflow: hidden', 'overflow-x-hidden': 'overflow-x: hidden', 'overflow-y-auto': 'overflow-y: auto',
+    'outline-none': 'outline: 2px solid transparent; outline-offset: 2px',
+    'pointer-events-none': 'pointer-events: none', 'opacity-20': 'opacity: 0.2',
+    'text-left': 'text-align: left', 'text-center': 'text-align: center',
+    'font-bold': 'font-weight: 700', 'font-light': 'font-weight: 300',
+    'font-mono': "font-family: 'Source Code Pro', ui-monospace, SFMono-Regular, Menlo, Consolas, monospace",
+    'italic': 'font-style: italic', 'underline': 'text-decoration-line: underline', 'uppercase': 'text-transform: uppercase',
+    'tracking-wider': 'letter-spacing: 0.05em', 'tracking-widest': 'letter-spacing: 0.1em',
+    'break-words': 'overflow-wrap: break-word', 'break-all': 'word-break: break-all',
+    'border-dashed': 'border-style: dashed', 'z-50': 'z-index: 50',
+    'top-0': 'top: 0', 'right-0': 'right: 0', 'left-0': 'left: 0',
+    'backdrop-blur-md': 'backdrop-filter: blur(12px)',
+    'animate-pulse': 'animation: pulse 2s cubic-bezier(0.4, 0, 0.6, 1) infinite',
+    'transition': 'transition-property: color, background-color, border-color, text-decoration-color, fill, stroke, opacity, box-shadow, transform, filter, backdrop-filter; transition-timing-function: cubic-bezier(0.4, 0, 0.2, 1); transition-duration: 150ms',
+    'transition-all': 'transition-property: all; transition-timing-function: cubic-bezier(0.4, 0, 0.2, 1); transition-duration: 150ms',
+    'transition-colors': 'transition-property: color, background-color, border-color, text-decoration-color, fill, stroke; transition-timing-function: cubic-bezier(0.4, 0, 0.2, 1); transition-duration: 150ms',
+    'transition-transform': 'transition-property: transform; transition-timing-function: cubic-bezier(0.4, 0, 0.2, 1); transition-duration: 150ms',
+    'bg-gradient-to-r': 'background-image: linear-gradient(to right, var(--tw-gradient-stops))',
+    'border': 'border-width: 1px', 'border-2': 'border-width: 2px', 'border-t': 'border-top-width: 1px',
+    'border-b': 'border-bottom-width: 1px', 'border-r': 'border-right-width: 1px', 'border-r-0': 'border-right-width: 0',
+    'border-l-2': 'border-left-width: 2px', 'border-l-4': 'border-left-width: 4px',
+}
+SPACING = {'p': ('padding',), 'px': ('padding-left', 'padding-right'), 'py': ('padding-top', 'padding-bottom'),
+           'pt': ('padding-top',), 'pb': ('padding-bottom',), 'pl': ('padding-left',), 'pr': ('padding-right',),
+           'm': ('margin',), 'mt': ('margin-top',), 'mb': ('margin-bottom',), 'ml': ('margin-left',), 'mr': ('margin-right',),
+           'w': ('width',), 'h': ('height',), 'gap': ('gap',)}
+# Later groups win, mirroring Tailwind's ordering (e.g. border-r-0 after border).
+ORDER = ['layout', 'box', 'border-width', 'color', 'effect', 'state']
+
+def rem(n):
+    return '0px' if n == 0 else f'{n * 0.25:g}rem'
+
+def color(value):
+    name, _, alpha = value.partition('/')
+    if name in FIXED_COLORS:
+        hexval = FIXED_COLORS[name]
+    else:
+        family, _, shade = name.rpartition('-')
+        if family not in COLORS or not shade.isdigit() or int(shade) not in COLORS[family]:
+            return None
+        hexval = COLORS[family][int(shade)]
+    if not alpha or hexval == 'transparent':
+        return hexval
+    r, g, b = (int(hexval[i:i + 2], 16) for i in (1, 3, 5))
+    return f'rgb({r} {g} {b} / {int(alpha) / 100:g})'
+
+def arbitrary(value):
+    return value[1:-1].replace('_', ' ') if value.startswith('[') and value.endswith(']') else None
+
+def utility(name):
+    # Returns (group, declarations, selector_suffix) or None for unknown tokens.
+    negative = name.startswith('-')
+    base = name[1:] if negative else name
+    if name in STATIC:
+        group = 'border-width' if name.startswith('border') else 'layout'
+        return group, STATIC[name], ''
+    m = re.fullmatch(r'(p|px|py|pt|pb|pl|pr|m|mt|mb|ml|mr|w|h|gap)-(\d+)', base)
+    if m and (not negative or m.group(1).startswith('m')):
+        value = rem(int(m.group(2)))
+        value = '-' + value if negative else value
+        return 'box', '; '.join(f'{prop}: {value}' for prop in SPACING[m.group(1)]), ''
+    m = re.fullmatch(r'space-(x|y)-(\d+)', name)
+    if m:
+        prop = 'margin-left' if m.group(1) == 'x' else 'margin-top'
+        return 'box', f'{prop}: {rem(int(m.group(2)))}', ' > :not([hidden]) ~ :not([hidden])'
+    m = re.fullmatch(r'grid-cols-(\d+)', name)
+    if m:
+        return 'layout', f'grid-template-columns: repeat({m.group(1)}, minmax(0, 1fr))', ''
+    m = re.fullmatch(r'(min-h|min-w|max-w)-(.+)', name)
+    if m:
+        prop = {'min-h': 'min-height', 'min-w': 'min-width', 'max-w': 'max-width'}[m.group(1)]
+        value = arbitrary(m.group(2)) or (MAX_WIDTHS.get(m.group(2)) if m.group(1) == 'max-w' else None)
+        return ('box', f'{prop}: {value}', '') if value else None
+    m = re.fullmatch(r'translate-(x|y)-(\d+)', base)
+    if m:
+        sign = '-' if negative else ''
+        return 'effect', f'transform: translate{m.group(1).upper()}({sign}{rem(int(m.group(2)))})', ''
+    m = re.fullmatch(r'duration-(\d+)', name)
+    if m:
+        return 'effect', f'transition-duration: {m.group(1)}ms', ''
+    m = re.fullmatch(r'rounded(-sm|-lg|-full)?', name)
+    if m:
+        return 'layout', f'border-radius: {RADII[m.group(1) or ""]}', ''
+    m = re.fullmatch(r'text-(xs|sm|lg|xl|[2-5]xl)', name)
+    if m:
+        size, line = FONT_SIZES[m.group(1)]
+        return 'layout', f'font-size: {size}; line-height: {line}', ''
+    m = re.fullmatch(r'shadow(?:-(.+))?', name)
+    if m:
+        value = SHADOWS.get(m.group(1)) if m.group(1) else '0 1px 3px 0 rgb(0 0 0 / 0.1), 0 1px 2px -1px rgb(0 0 0 / 0.1)'
+        value = value or arbitrary(m.group(1) or '')
+        return ('effect', f'box-shadow: {value}', '') if value else None
+    m = re.fullmatch(r'drop-shadow-(\[.+\])', name)
+    if m:
+        return 'effect', f'filter: drop-shadow({arbitrary(m.group(1))})', ''
+    m = re.fullmatch(r'(text|bg|border|from|to|placeholder)-(.+)', name)
+    if m:
+        value = color(m.group(2))
+        if value is None:
+            return None
+        kind = m.group(1)
+        if kind == 'text':
+            return 'color', f'color: {value}', ''
+        if kind == 'bg':
+            return 'color', f'background-color: {value}', ''
+        if kind == 'border':
+            return 'color', f'border-color: {value}', ''
+        if kind == 'placeholder':
+            return 'color', f'color: {value}', '::placeholder'
+        if kind == 'from':
+            return 'color', (f'--tw-gradient-from: {value}; --tw-gradient-to: transparent; '
+                             '--tw-gradient-stops: var(--tw-gradient-from), var(--tw-gradient-to)'), ''
+        return 'color', f'--tw-gradient-to: {value}', ''
+    return None
+
+def escape(name):
+    return re.sub(r'([^A-Za-z0-9_-])', r'\\\1', name)
+
+def rule(token):
+    variants = token.split(':')
+    name = variants.pop()
+    result = utility(name)
+    if result is None or any(v not in ('hover', 'focus', 'group-hover') + tuple(BREAKPOINTS) for v in variants):
+        return None
+    group, declarations, suffix = result
+    selector = '.' + escape(token)
+    media = None
+    for variant in variants:
+        if variant in ('hover', 'focus'):
+            selector += ':' + variant
+        elif variant == 'group-hover':
+            selector = '.group:hover ' + selector
+        else:
+            media = variant
+    if variants and media is None:
+        group = 'state'
+    return (list(BREAKPOINTS).index(media) + 1 if media else 0, ORDER.index(group), token), media, f'{selector}{suffix} {{ {declarations} }}'
+
+def collect():
+    tokens = set()
+    for path in SOURCES:
+        with open(path, encoding='utf-8') as f:
+            tokens.update(re.findall(r"[A-Za-z0-9:/\-\[\]\(\)\.,_#%]+", f.read()))
+    return tokens
+
+def stylesheet():
+    # Returns (css text, rule count) for the classes the templates use now.
+    rules = sorted(r for r in map(rule, collect()) if r)
+    out = ['/* Generated by python -m dojo.buildcss - do not edit by hand. */',
+           '.container { width: 100%; }',
+           '@media (min-width: 640px) { .container { max-width: 640px; } }',
+           '@media (min-width: 768px) { .container { max-width: 768px; } }',
+           '@media (min-width: 1024px) { .container { max-width: 1024px; } }',
+           '@media (min-width: 1280px) { .container { max-width: 1280px; } }',
+           '@media (min-width: 1536px) { .container { max-width: 1536px; } }']
+    for (_, _, _), media, css in rules:
+        out.append(f'@media (min-width: {BREAKPOINTS[media]}) {{ {css} }}' if media else css)
+    return '\n'.join(out) + '\n', len(rules)
+
+def build():
+    css, count = stylesheet()
+    with open(OUTPUT, 'w', encoding='utf-8') as f:
+        f.write(css)
+    return count
+
+if __name__ == '__main__':
+    print(f'{build()} utility rules written to {OUTPUT}')
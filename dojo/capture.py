@@ -0,0 +1,108 @@
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from flask import g, request
+
+from dojo import session
+
+# --- TRAFFIC CAPTURE ---
+# With DOJO_CAPTURE_DIR set, every request is appended to a capture file as it
+# arrives, before any level code runs, so the traffic that took an instance down
+# is on disk even if the worker is not. Each line is a compact JSON array:
+#   ["q", seq, time, method, path, query, body, content type, client]   on arrival
+#   ["r", seq, status, ms, new client]                                   once answered
+# ms is the time to the response headers (streamed pages send their body after).
+# client is a short hash of the session cookie; new client is the hash of a session
+# handed out by this response, so a replay can follow one trainee across requests.
+#
+# Each worker writes its own file with one write() per line; at DOJO_CAPTURE_MAX_BYTES
+# the file becomes <name>.1.jsonl (replacing the older one), so a worker keeps at most
+# that much twice. bench/replay.py re-drives a capture directory.
+
+MAX_BODY = 64 * 1024
+
+encode = json.JSONEncoder(separators=(',', ':')).encode
+
+def client_alias(sid):
+    return hashlib.blake2b(sid.encode(), digest_size=6).hexdigest() if sid else None
+
+class Capture:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.written = 0
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # A forked worker starts its own file (the master's descriptor is not shared).
+        self._lock = threading.Lock()
+        self._fd = None
+        self._seq = itertools.count(1)
+        self._size = 0
+        # Named by pid and start time: files left by a crashed worker are never reused.
+        self.path = os.path.join(self.directory, f'capture-{os.getpid()}-{int(time.time())}.jsonl')
+
+    def _write(self, record):
+        line = (encode(record) + '\n').encode()
+        with self._lock:
+            if self._fd is None or self._size + len(line) > self.max_bytes:
+                self._rotate()
+            # One write() per line: no buffer to lose when the worker dies.
+            os.write(self._fd, line)
+            self._size += len(line)
+            self.written += 1
+
+    def _rotate(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            os.replace(self.path, self.path[:-len('.jsonl')] + '.1.jsonl')
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._size = 0
+
+    def discard(self):
+        # Drops what this process captured so far (dojo/serve.py: the warm-up requests).
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                os.unlink(self.path)
+                self._fd = None
+
+    def arrival(self):
+        if g.get('_dojo_baseline'):
+            return  # the XSS verifier rendering a level for itself (dojo/xssverify.py)
+        seq = next(self._seq)
+        g._capture = (seq, time.perf_counter())
+        req = request._get_current_object()  # one proxy lookup instead of one per field
+        # The raw body stays cached on the request; the form is still parsed from it later.
+        body = req.get_data(as_text=True)[:MAX_BODY] if req.content_length else None
+        self._write(['q', seq, round(time.time(), 6), req.method, req.script_root + req.path,
+                     req.query_string.decode('latin-1'), body, req.content_type if body else None,
+                     client_alias(req.cookies.get(session.COOKIE_NAME))])
+
+    def answered(self, response):
+        captured = g.pop('_capture', None)
+        if captured is not None:
+            seq, start = captured
+            ms = (time.perf_counter() - start) * 1000
+            issued = client_alias(g._dojo_sid) if g.get('_dojo_sid_new') else None
+            self._write(['r', seq, response.status_code, round(ms, 3), issued])
+        return response
+
+CAPTURE_DIR = os.environ.get('DOJO_CAPTURE_DIR') or None
+MAX_BYTES = int(os.environ.get('DOJO_CAPTURE_MAX_BYTES', 32 * 1024 * 1024))
+capture = None
+if CAPTURE_DIR:
+    os.makedirs(CAPTURE_DIR, exist_ok=True)
+    capture = Capture(CAPTURE_DIR, MAX_BYTES)
+
+def init_app(app):
+    # Registered before the other hooks: arrivals are written before rate limits
+    # or levels run, and answers after every other after_request hook.
+    if capture is None:
+        return
+    app.before_request(capture.arrival)
+    app.after_request(capture.answered)
@@ -0,0 +1,143 @@
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+# --- STORED COMMENT LOG (XSS LEVEL 2) ---
+# Comments are partitioned by trainee session and read newest first, one page
+# at a time with keyset pagination (WHERE id < ?), so a page costs the same
+# however many payloads a class has posted. Each session keeps at most
+# max_rows / max_bytes; older entries are evicted first.
+#
+# Writes go through one writer thread per process: everything queued while the
+# previous transaction was committing is applied in the next one (group
+# commit, WAL journal). Readers take a connection from a small pool.
+
+SCHEMA = '''CREATE TABLE comments (id INTEGER PRIMARY KEY AUTOINCREMENT, sid TEXT NOT NULL DEFAULT '',
+                                   content TEXT, size INTEGER NOT NULL DEFAULT 0)'''
+INDEX = 'CREATE INDEX comments_sid ON comments (sid, id)'
+
+class CommentTooLarge(ValueError):
+    pass
+
+class CommentStore:
+    def __init__(self, path, page_size=20, max_rows=200, max_bytes=256 * 1024, max_comment=16 * 1024,
+                 mmap_size=0, pool_size=8, max_batch=256, timeout=5.0):
+        self.path = path
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_comment = max_comment
+        self.mmap_size = mmap_size
+        self.pool_size = pool_size
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.commits = 0
+        self.writes = 0
+        self.evicted = 0
+        self._reset()
+        # Connections and the writer thread do not survive fork(): a worker opens its own.
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._pool = queue.LifoQueue()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.timeout)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        if self.mmap_size:
+            conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        return conn
+
+    # --- reads ---
+
+    def page(self, sid, before=None):
+        # Returns (rows, before_id_of_next_page or None); rows are (id, content), newest first.
+        sql = 'SELECT id, content FROM comments WHERE sid = ?'
+        params = [sid]
+        if before is not None:
+            sql += ' AND id < ?'
+            params.append(before)
+        sql += ' ORDER BY id DESC LIMIT ?'
+        params.append(self.page_size + 1)
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            if self._pool.qsize() < self.pool_size:
+                self._pool.put(conn)
+            else:
+                conn.close()
+        if len(rows) > self.page_size:
+            return rows[:self.page_size], rows[self.page_size - 1][0]
+        return rows, None
+
+    # --- writes ---
+
+    def add(self, sid, content):
+        size = len(content.encode('utf-8'))
+        if size > self.max_comment:
+            raise CommentTooLarge(f'comment is {size} bytes, the limit is {self.max_comment}')
+        return self._submit(('add', sid, content, size))
+
+    def clear(self, sid):
+        return self._submit(('clear', sid, None, 0))
+
+    def _submit(self, op):
+        future = Future()
+        self._queue.put((op, future))
+        if self._writer is None:
+            self._start()
+        return future.result(self.timeout)
+
+    def _start(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='comment-writer', daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    touched = set()
+                    for (kind, sid, content, size), _ in batch:
+                        if kind == 'add':
+                            conn.execute('INSERT INTO comments (sid, content, size) VALUES (?, ?, ?)', (sid, content, size))
+                            touched.add(sid)
+                        else:
+                            conn.execute('DELETE FROM comments WHERE sid = ?', (sid,))
+                    for sid in touched:
+                        self.evicted += self._evict(conn, sid)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.commits += 1
+            self.writes += len(batch)
+            for _, future in batch:
+                future.set_result(None)
+
+    def _evict(self, conn, sid):
+        # Keep the newest entries that fit in both caps.
+        cur = conn.execute('''DELETE FROM comments WHERE id IN (
+                                  SELECT id FROM (
+                                      SELECT id, ROW_NUMBER() OVER w AS n, SUM(size) OVER w AS total
+                                      FROM comments WHERE sid = ? WINDOW w AS (ORDER BY id DESC))
+                                  WHERE n > ? OR total > ?)''', (sid, self.max_rows, self.max_bytes))
+        return cur.rowcount
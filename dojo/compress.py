@@ -0,0 +1,232 @@
+import struct
+import time
+import zlib
+from flask import request
+
+from dojo import metrics
+from dojo.layout import PANEL_CLOSE, PANEL_OPEN
+from dojo.streaming import ClosingStream
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# --- RESPONSE COMPRESSION ---
+# Pages are ~10 KB of layout around a small level panel. dojo/layout.py marks
+# the panel with PANEL_OPEN / PANEL_CLOSE; what comes before the first marker
+# (the prefix) and after the last one (the suffix) is the same on every request
+# to a level, so each distinct prefix / suffix is compressed once and cached:
+#
+#   gzip: the prefix is deflated and sync-flushed, and the compressor is kept in
+#         that state; a response continues from a copy of it, so the panel still
+#         back-references the layout. The suffix is a separate finished deflate
+#         run appended after the panel's sync flush; only the CRC is recomputed.
+#   zstd: prefix, panel and suffix are three concatenated frames (optional
+#         dependency: the zstandard package).
+#   br:   streams cannot be spliced; the whole page is compressed (fast quality),
+#         and brotli is only chosen for clients that accept neither of the above.
+#
+# Streamed responses are compressed chunk by chunk with a flush after each, so
+# early chunks still reach the browser early; their prefix comes from the cache too.
+# Responses that carry their own ETag (assets, cached pages) negotiate their
+# own precompressed bodies and are left alone.
+
+OPEN = PANEL_OPEN.encode()
+CLOSE = PANEL_CLOSE.encode()
+
+COMPRESSIBLE = ('text/html', 'text/plain', 'text/css', 'application/json', 'application/javascript')
+MIN_SIZE = 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+BROTLI_QUALITY = 5
+# A streamed page whose marker has not shown up by then is compressed without a frame.
+MAX_PREFIX = 64 * 1024
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+class Frame:
+    # One compressed prefix or suffix, in every available encoding.
+    __slots__ = ('body', 'crc', 'gzip', 'deflater', 'zstd')
+
+    def __init__(self, body, tail=False):
+        self.body = body
+        self.crc = zlib.crc32(body)
+        if tail:
+            # A complete deflate run of its own: nothing before it is referenced.
+            deflater = zlib.compressobj(9, zlib.DEFLATED, -15)
+            self.gzip = deflater.compress(body) + deflater.flush()
+            self.deflater = None
+        else:
+            self.deflater = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -15)
+            self.gzip = GZIP_HEADER + self.deflater.compress(body) + self.deflater.flush(zlib.Z_SYNC_FLUSH)
+        self.zstd = zstandard.ZstdCompressor(level=19).compress(body) if zstandard is not None else None
+
+class GzipEncoder:
+    def __init__(self, frame):
+        if frame is not None:
+            self.head = frame.gzip
+            self.deflater = frame.deflater.copy()
+            self.crc = frame.crc
+            self.size = len(frame.body)
+        else:
+            self.head = GZIP_HEADER
+            self.deflater = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -15)
+            self.crc = 0
+            self.size = 0
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        return self.deflater.compress(data)
+
+    def flush(self):
+        return self.deflater.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, tail):
+        if tail is None:
+            out = self.deflater.flush()
+        else:
+            out = self.deflater.flush(zlib.Z_SYNC_FLUSH) + tail.gzip
+            self.crc = zlib.crc32(tail.body, self.crc)
+            self.size += len(tail.body)
+        return out + struct.pack('<II', self.crc, self.size & 0xffffffff)
+
+class ZstdEncoder:
+    def __init__(self, frame):
+        self.head = frame.zstd if frame is not None else b''
+        self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def write(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, tail):
+        return self.compressor.flush() + (tail.zstd if tail is not None else b'')
+
+class BrotliEncoder:
+    def __init__(self, frame):
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        self.head = self.compressor.process(frame.body) if frame is not None else b''
+
+    def write(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self, tail):
+        return (self.compressor.process(tail.body) if tail is not None else b'') + self.compressor.finish()
+
+# Server preference when the client accepts several: gzip first, its panel
+# reuses the layout's history; zstd frames compress the panel on its own.
+ENCODERS = {'gzip': GzipEncoder, 'zstd': ZstdEncoder, 'br': BrotliEncoder}
+AVAILABLE = tuple(name for name, module in (('gzip', zlib), ('zstd', zstandard), ('br', brotli)) if module is not None)
+
+def negotiate():
+    accept = request.accept_encodings
+    for encoding in AVAILABLE:
+        if accept[encoding]:
+            return encoding
+    return None
+
+def split(body):
+    # (prefix, panel, suffix); prefix / suffix are empty when the page has no markers.
+    start = body.find(OPEN)
+    if start < 0:
+        return b'', body, b''
+    start += len(OPEN)
+    end = body.rfind(CLOSE, start)
+    if end < 0:
+        return body[:start], body[start:], b''
+    return body[:start], body[start:end], body[end:]
+
+class Compressor:
+    def __init__(self, max_frames=256):
+        self.max_frames = max_frames
+        self._frames = {}
+
+    def frame(self, body, stats, tail=False):
+        key = (body, tail)
+        frame = self._frames.get(key)
+        if frame is not None:
+            result = 'hit'
+        elif len(self._frames) < self.max_frames:
+            frame = self._frames[key] = Frame(body, tail)
+            result = 'miss'
+        else:
+            # Full (e.g. a level echoing input into its heading): compress inline.
+            frame = Frame(body, tail) if tail else None
+            result = 'uncached'
+        stats.inc('dojo_compress_frames_total', (('part', 'suffix' if tail else 'prefix'), ('result', result)))
+        return frame
+
+    def compress(self, body, encoding, stats):
+        prefix, panel, suffix = split(body)
+        frame = self.frame(prefix, stats) if prefix else None
+        encoder = ENCODERS[encoding](frame)
+        if frame is None:
+            panel = prefix + panel
+        tail = self.frame(suffix, stats, tail=True) if suffix else None
+        return b''.join((encoder.head, encoder.write(panel), encoder.finish(tail)))
+
+    def stream(self, chunks, encoding, stats):
+        # Runs after the request context is gone: stats is passed in.
+        chunks = iter(chunks)
+        head = b''
+        for chunk in chunks:
+            head += chunk
+            if OPEN in head or len(head) > MAX_PREFIX:
+                break
+        cut = head.find(OPEN)
+        frame = self.frame(head[:cut + len(OPEN)], stats) if cut >= 0 else None
+        encoder = ENCODERS[encoding](frame)
+        rest = head[cut + len(OPEN):] if frame is not None else head
+        yield encoder.head + encoder.write(rest) + encoder.flush()
+        for chunk in chunks:
+            yield encoder.write(chunk) + encoder.flush()
+        yield encoder.finish(None)
+
+    def process(self, response):
+        if (request.method == 'HEAD' or response.status_code in (204, 304) or response.status_code < 200
+                or 'Content-Encoding' in response.headers or 'ETag' in response.headers
+                or response.mimetype not in COMPRESSIBLE or response.direct_passthrough):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate()
+        if encoding is None:
+            return response
+        stats = metrics.current()
+        if response.is_streamed:
+            body = response.response
+            response.response = ClosingStream(self.stream(response.iter_encoded(), encoding, stats), getattr(body, 'close', None))
+            response.headers.pop('Content-Length', None)
+            stats.inc('dojo_compress_streams_total', (('encoding', encoding),))
+        else:
+            body = response.get_data()
+            if len(body) < MIN_SIZE:
+                return response
+            start = time.perf_counter()
+            compressed = self.compress(body, encoding, stats)
+            stats.observe('dojo_compress_duration_seconds', (('encoding', encoding),), time.perf_counter() - start)
+            stats.inc('dojo_compress_bytes_total', (('encoding', encoding), ('stage', 'in')), len(body))
+            stats.inc('dojo_compress_bytes_total', (('encoding', encoding), ('stage', 'out')), len(compressed))
+            response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def init_app(self, app):
+        # Flask runs after_request hooks in reverse order of registration: call this
+        # before the app registers its own hooks, so compression sees the final body.
+        app.after_request(self.process)
+
+compressor = Compressor()
+
+def init_app(app):
+    compressor.init_app(app)
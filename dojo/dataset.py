@@ -0,0 +1,110 @@
+# --- LARGE SYNTHETIC DATASETS ---
+# Grows the SQLi seed (users / products) to realistic sizes so blind extraction
+# and UNION levels behave like they would against a real table. Rows are
+# generated a batch at a time (random.choices(k=batch) per column) and bulk
+# inserted with executemany() inside one transaction. The finished database is
+# cached on disk as a seed image keyed by the base seed and the dataset
+# parameters; later startups only read the image back.
+#
+# Usage: python -m dojo.dataset --products 1000000 --users 200000   (pre-builds the image)
+import argparse
+import hashlib
+import os
+import random
+import string
+import sys
+import time
+
+from dojo.snapshot import Snapshot
+
+# Bump when the generator changes so cached images are rebuilt.
+VERSION = 1
+BATCH = 10000
+
+ADJECTIVES = ('Quantum', 'Plasma', 'Stealth', 'Neural', 'Photon', 'Graviton', 'Cryo', 'Ion', 'Nano', 'Fusion',
+              'Tachyon', 'Sonic', 'Magnetic', 'Holo', 'Void', 'Flux', 'Omega', 'Cyber', 'Dark', 'Solar')
+NOUNS = ('Core', 'Ray', 'Chip', 'Drive', 'Shield', 'Relay', 'Lens', 'Module', 'Cannon', 'Array',
+         'Reactor', 'Beacon', 'Sensor', 'Blade', 'Matrix', 'Probe', 'Engine', 'Cell', 'Scanner', 'Link')
+FEATURES = ('Powerful', 'Compact', 'Military grade', 'Experimental', 'Refurbished', 'Low latency',
+            'Self-repairing', 'Encrypted', 'Overclocked', 'Radiation hardened')
+PURPOSES = ('CPU', 'weapon', 'cloaking device', 'navigation unit', 'power cell', 'uplink',
+            'storage array', 'targeting system', 'shield generator', 'sensor suite')
+FIRST = ('alex', 'sam', 'kim', 'lee', 'max', 'ana', 'ivan', 'mia', 'noah', 'zoe', 'omar', 'lin', 'eva', 'tom', 'yui', 'raj')
+LAST = ('nguyen', 'tran', 'smith', 'garcia', 'muller', 'rossi', 'kowalski', 'sato', 'silva', 'khan', 'park', 'berg')
+ROLES = ('user',) * 18 + ('staff', 'auditor')
+PASSWORD_CHARS = string.ascii_letters + string.digits
+
+def product_batches(rng, count, batch=BATCH):
+    for start in range(0, count, batch):
+        k = min(batch, count - start)
+        names = zip(rng.choices(ADJECTIVES, k=k), rng.choices(NOUNS, k=k), rng.choices(range(1, 10000), k=k))
+        descriptions = zip(rng.choices(FEATURES, k=k), rng.choices(PURPOSES, k=k))
+        prices = rng.choices(range(10, 20000), k=k)
+        yield [(f'{a} {n} MK-{m}', p, f'{f} {u}') for (a, n, m), p, (f, u) in zip(names, prices, descriptions)]
+
+def user_batches(rng, count, batch=BATCH):
+    for start in range(0, count, batch):
+        k = min(batch, count - start)
+        names = zip(rng.choices(FIRST, k=k), rng.choices(LAST, k=k), range(start, start + k))
+        lengths = rng.choices(range(8, 17), k=k)
+        roles = rng.choices(ROLES, k=k)
+        yield [(f'{first}.{last}{n}', ''.join(rng.choices(PASSWORD_CHARS, k=size)), role)
+               for (first, last, n), size, role in zip(names, lengths, roles)]
+
+def populate(conn, products, users, seed=1337):
+    # Appended after the hand-written seed rows, so admin stays id 1 and the
+    # original products keep their ids.
+    rng = random.Random(seed)
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    with conn:
+        for rows in product_batches(rng, products):
+            conn.executemany('INSERT INTO products (name, price, description) VALUES (?, ?, ?)', rows)
+        for rows in user_batches(rng, users):
+            conn.executemany('INSERT INTO users (username, password, role) VALUES (?, ?, ?)', rows)
+        # What a real application would have for its lookups (level 5 / 6 probes).
+        conn.execute('CREATE INDEX IF NOT EXISTS users_username ON users (username)')
+        conn.execute('CREATE INDEX IF NOT EXISTS products_name ON products (name)')
+
+def image_path(cache_dir, base, products, users, seed):
+    key = hashlib.sha256(base.image).hexdigest()[:12]
+    return os.path.join(cache_dir, f'seed-{key}-p{products}-u{users}-s{seed}-v{VERSION}.db')
+
+def snapshot(init_db, products, users, seed=1337, cache_dir=None):
+    base = Snapshot.build(init_db)
+    path = image_path(cache_dir, base, products, users, seed) if cache_dir else None
+    if path and os.path.exists(path):
+        return Snapshot.load(path)
+    conn = base.connect()
+    populate(conn, products, users, seed)
+    built = Snapshot(conn)
+    conn.close()
+    if path:
+        built.save(path)
+    return built
+
+def main():
+    ap = argparse.ArgumentParser(description='Pre-build the SQLi dojo seed image for a large synthetic dataset.')
+    ap.add_argument('--products', type=int, default=1_000_000)
+    ap.add_argument('--users', type=int, default=200_000)
+    ap.add_argument('--seed', type=int, default=1337)
+    ap.add_argument('--cache-dir', help='defaults to the app\'s SQLI_SEED_CACHE')
+    args = ap.parse_args()
+    os.environ['SQLI_DATASET_PRODUCTS'] = str(args.products)
+    os.environ['SQLI_DATASET_USERS'] = str(args.users)
+    os.environ['SQLI_DATASET_SEED'] = str(args.seed)
+    if args.cache_dir:
+        os.environ['SQLI_SEED_CACHE'] = args.cache_dir
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path[:0] = [root, os.path.join(root, 'sqli')]
+    start = time.perf_counter()
+    import vuln_sqli
+    elapsed = time.perf_counter() - start
+    conn = vuln_sqli.seed.connect()
+    counts = {t: conn.execute(f'SELECT COUNT(*) FROM {t}').fetchone()[0] for t in ('products', 'users')}
+    conn.close()
+    print(f'{counts["products"]} products, {counts["users"]} users, {len(vuln_sqli.seed) / 2**20:.1f} MB image '
+          f'in {vuln_sqli.SEED_CACHE} (app import took {elapsed:.2f}s)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import threading
+import time
+
+# --- DEFERRED SLEEP ---
+# In deferred mode the SQL sleep() UDF does not block inside cur.execute():
+# it only books the requested delay against the trainee. The query finishes at
+# once, and the delay is paid at the end of the streamed page, after the panel
+# has been sent and the sandbox checked back in (see stream_body in
+# sqli/vuln_sqli.py). The observable timing stays the same for the trainee /
+# sqlmap. The response thread still sleeps for the whole delay (a WSGI server
+# cannot park a response without its thread); what the wait no longer holds is
+# the SQLite connection and the trainee's sandbox lock. The number of waits is
+# bounded by max_outstanding per trainee and the Level 6 rate limit, not by the
+# thread pool.
+
+class DelayLedger:
+    def __init__(self, max_outstanding=30.0):
+        self.max_outstanding = max_outstanding
+        self._outstanding = {}
+        self._lock = threading.Lock()
+
+    def grant(self, sid, seconds):
+        # Clip the request so one trainee can never have more than max_outstanding seconds pending.
+        seconds = max(0.0, seconds)
+        with self._lock:
+            pending = self._outstanding.get(sid, 0.0)
+            granted = min(seconds, self.max_outstanding - pending)
+            if granted <= 0:
+                return 0.0
+            self._outstanding[sid] = pending + granted
+            return granted
+
+    def release(self, sid, seconds):
+        with self._lock:
+            pending = self._outstanding.get(sid, 0.0) - seconds
+            if pending > 1e-9:
+                self._outstanding[sid] = pending
+            else:
+                self._outstanding.pop(sid, None)
+
+    def outstanding(self, sid):
+        return self._outstanding.get(sid, 0.0)
+
+    def pay(self, sid, seconds):
+        # Waits out a booked delay, then gives it back to the trainee's budget.
+        try:
+            time.sleep(seconds)
+        finally:
+            self.release(sid, seconds)
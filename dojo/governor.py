@@ -0,0 +1,80 @@
+import sqlite3
+import time
+
+# --- QUERY GOVERNOR ---
+# Puts a budget on every statement a sandbox connection runs. SQLite's
+# progress handler counts VM instructions and checks a wall-clock deadline;
+# setlimit() caps string/blob/row size and SQL text length. When a budget is
+# exceeded the statement is interrupted and the level sees a BudgetExceeded
+# error. The worker and the sandbox stay usable.
+
+class BudgetExceeded(sqlite3.OperationalError):
+    pass
+
+class Budget:
+    __slots__ = ('instructions', 'seconds', 'max_length', 'max_sql_length')
+
+    def __init__(self, instructions=10_000_000, seconds=2.0, max_length=1_000_000, max_sql_length=100_000):
+        self.instructions = instructions
+        self.seconds = seconds
+        self.max_length = max_length
+        self.max_sql_length = max_sql_length
+
+class GovernorState:
+    __slots__ = ('budget', 'check_every', 'steps', 'max_steps', 'deadline', 'tripped')
+
+    def __init__(self, check_every):
+        self.budget = None
+        self.check_every = check_every
+        self.tripped = None
+
+class QueryGovernor:
+    def __init__(self, default, per_level=None, check_every=1000):
+        self.default = default
+        self.per_level = per_level or {}
+        self.check_every = check_every
+
+    def install(self, conn):
+        state = conn.governor = GovernorState(self.check_every)
+
+        def progress():
+            state.steps += 1
+            if state.steps > state.max_steps:
+                state.tripped = 'instruction'
+                return 1
+            if time.monotonic() > state.deadline:
+                state.tripped = 'time'
+                return 1
+            return 0
+
+        conn.set_progress_handler(progress, self.check_every)
+        self.apply(conn, None)
+
+    def apply(self, conn, level):
+        # Called when a request checks out the connection: switch to that level's budget.
+        budget = self.per_level.get(level, self.default)
+        state = conn.governor
+        if state.budget is not budget:
+            state.budget = budget
+            conn.setlimit(sqlite3.SQLITE_LIMIT_LENGTH, budget.max_length)
+            conn.setlimit(sqlite3.SQLITE_LIMIT_SQL_LENGTH, budget.max_sql_length)
+
+def start(conn):
+    # Called right before each statement runs.
+    state = getattr(conn, 'governor', None)
+    if state is not None:
+        state.steps = 0
+        state.max_steps = state.budget.instructions // state.check_every + 1
+        state.deadline = time.monotonic() + state.budget.seconds
+        state.tripped = None
+
+def explain(conn, error):
+    # Returns a BudgetExceeded for errors caused by the governor, else None.
+    state = getattr(conn, 'governor', None)
+    if state is None:
+        return None
+    if state.tripped:
+        return BudgetExceeded(f'query aborted: budget exceeded ({state.tripped} limit)')
+    if isinstance(error, sqlite3.DataError) or 'too big' in str(error):
+        return BudgetExceeded('query aborted: budget exceeded (row/blob size limit)')
+    return None
@@ -0,0 +1,63 @@
+# Combined host: both dojos in one process, mounted under /sqli and /xss.
+#
+# Flask, Jinja, the shared layout (dojo/layout.py) and the asset bundle are
+# loaded once. Assets are served at the root for both apps (asset_url() is
+# not prefixed), /metrics exposes both apps' metrics in one scrape and
+# /scoreboard the shared leaderboard.
+#
+# Usage: python -m dojo.host [--port 1110]   (or: python -m dojo.serve dojo --workers N)
+import argparse
+import os
+import sys
+
+from flask import Flask, Response
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'sqli'), os.path.join(ROOT, 'xss')]
+
+from dojo import assets, metrics, scoreboard
+from dojo.templates import TemplateRegistry
+import vuln_sqli
+import vuln_xss
+
+MOUNTS = {'/sqli': vuln_sqli.app, '/xss': vuln_xss.app}
+
+app = Flask(__name__)
+assets.init_app(app)
+scoreboard.init_app(app, 'dojo')
+templates = TemplateRegistry(app)
+
+index_page = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>DOJO | Cyber Range</title>
+    <link rel="stylesheet" href="{{ asset_url('dojo.css') }}">
+</head>
+<body class="theme-sqli min-h-screen flex flex-col overflow-x-hidden">
+    <div class="container mx-auto mt-8 px-4 space-y-4">
+        <a href="/sqli/" class="block holo-box p-5 rounded-lg text-3xl font-bold holo-text tracking-widest">[SQLi_DOJO]</a>
+        <a href="/xss/" class="block holo-box p-5 rounded-lg text-3xl font-bold holo-text tracking-widest">[XSS_DOJO]</a>
+    </div>
+</body>
+</html>
+"""
+
+@app.route('/')
+def index():
+    return templates.render(index_page)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    registries = [mounted.extensions['dojo_metrics'] for mounted in MOUNTS.values()]
+    return Response(metrics.render(*registries), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+app.wsgi_app = DispatcherMiddleware(app.wsgi_app, MOUNTS)
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Serve both dojos from one process.')
+    ap.add_argument('--port', type=int, default=1110)
+    app.run(port=ap.parse_args().port)
@@ -0,0 +1,180 @@
+import json
+import os
+try:
+    import fcntl
+except ImportError:  # Windows: single-process only
+    fcntl = None
+import sqlite3
+import threading
+import time
+from collections import deque
+from flask import g, has_request_context, request
+
+from dojo import governor, metrics, session, timing
+
+# --- QUERY JOURNAL ---
+# Every statement a trainee's request runs is recorded as
+# (time, session, level, sql, duration, rows, error). Recording only appends to
+# an in-memory ring; a background thread batches entries into a rotating JSONL
+# file. When the ring is full new entries are dropped and counted instead of
+# slowing the request down. Worker processes of a pre-fork server share the file;
+# each batch is appended (and rotated) under an flock on <path>.lock.
+
+class QueryJournal:
+    def __init__(self, path, capacity=10000, batch_size=500, flush_interval=1.0, max_bytes=10 * 1024 * 1024, backups=5):
+        self.path = path
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # The writer thread does not survive fork(): a worker starts its own on first record.
+        self._ring = deque()
+        self._wakeup = threading.Event()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    def record(self, sid, level, sql, duration, rows, error):
+        if len(self._ring) >= self.capacity:
+            self.dropped += 1
+            return
+        self._ring.append((time.time(), sid, level, sql, duration, rows, error))
+        self.recorded += 1
+        if self._writer is None:
+            self._start()
+        if len(self._ring) >= self.batch_size:
+            self._wakeup.set()
+
+    def _start(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='query-journal', daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            while self._ring:
+                self._write_batch()
+
+    def _write_batch(self):
+        lines = []
+        while self._ring and len(lines) < self.batch_size:
+            ts, sid, level, sql, duration, rows, error = self._ring.popleft()
+            lines.append(json.dumps({'ts': round(ts, 3), 'session': sid, 'level': level, 'sql': sql,
+                                     'duration_ms': round(duration * 1000, 3), 'rows': rows, 'error': error}))
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        with open(f'{self.path}.lock', 'ab') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'ab') as f:
+                f.write(data)
+        self.written += len(lines)
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        os.replace(self.path, f'{self.path}.1')
+
+class JournalCursor(sqlite3.Cursor):
+    # Times execute/fetch calls and counts fetched rows; the entry is recorded on
+    # the next execute on this cursor, or when the request ends.
+    def __init__(self, conn, journal, sid, level):
+        super().__init__(conn)
+        self.journal = journal
+        self.sid = sid
+        self.level = level
+        self.pending = None
+
+    def _run(self, method, sql, *args):
+        self.finish()
+        self.pending = [sql, 0.0, 0, None]
+        governor.start(self.connection)
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        except Exception as e:
+            self._failed(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.pending[1] += elapsed
+            timing.add('sql', elapsed)
+
+    def _failed(self, error):
+        # Rows are stepped lazily, so a budget can run out during execute or any fetch.
+        aborted = governor.explain(self.connection, error)
+        if self.pending is not None:
+            self.pending[3] = str(aborted or error)
+        if aborted is not None:
+            metrics.current().inc('dojo_query_aborts_total', (('route', self.level),))
+            raise aborted from error
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters)
+
+    def executescript(self, sql):
+        return self._run(super().executescript, sql)
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        try:
+            rows = method(*args)
+        except Exception as e:
+            self._failed(e)
+            raise
+        elapsed = time.perf_counter() - start
+        timing.add('sql', elapsed)
+        count = len(rows) if isinstance(rows, list) else int(rows is not None)
+        metrics.add_rows(count)
+        if self.pending is not None:
+            self.pending[1] += elapsed
+            self.pending[2] += count
+        return rows
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def finish(self):
+        if self.pending is not None:
+            sql, duration, rows, error = self.pending
+            self.pending = None
+            self.journal.record(self.sid, self.level, sql, duration, rows, error)
+
+def journaling_connection(journal):
+    # Connection factory: cursors opened while serving a request are journaled.
+    class JournalConnection(sqlite3.Connection):
+        def cursor(self, factory=None):
+            if factory is not None or not has_request_context():
+                return super().cursor(factory or sqlite3.Cursor)
+            cur = super().cursor(lambda conn: JournalCursor(conn, journal, session.current_sid(), request.endpoint))
+            g.setdefault('_journal_cursors', []).append(cur)
+            return cur
+    return JournalConnection
+
+def finish(cursors):
+    for cur in cursors:
+        cur.finish()
+
+def init_app(app):
+    @app.teardown_request
+    def finish_journal_entries(exception):
+        finish(g.pop('_journal_cursors', ()))
@@ -0,0 +1,53 @@
+# --- SHARED PAGE LAYOUT ---
+# The page skeleton both dojos extend ({% extends dojo_layout %}); each app only
+# fills in its own nav, headings and colours. Links are built from
+# request.script_root so the same pages work standalone and when mounted
+# under a prefix by dojo/host.py.
+#
+# The level panel is wrapped in PANEL_OPEN / PANEL_CLOSE comments: streamed pages
+# flush everything up to the panel before its content is produced, and
+# dojo/compress.py precompresses the constant layout on either side of it.
+
+PANEL_OPEN = '<!--dojo:panel-->'
+PANEL_CLOSE = '<!--/dojo:panel-->'
+
+LAYOUT = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{% block title %}DOJO{% endblock %}</title>
+    <link rel="stylesheet" href="{{ asset_url('dojo.css') }}">
+    {{ extra_head|default('')|safe }}
+</head>
+<body class="theme-{{ theme }} min-h-screen flex flex-col overflow-x-hidden">
+    {% block nav %}{% endblock %}
+    <div class="container mx-auto flex-grow flex flex-col md:flex-row mt-8 gap-6 px-4 mb-10">
+        <aside class="md:w-72 flex-shrink-0">
+            <div class="holo-box p-5 rounded-lg h-full">
+                {% block modules_heading %}{% endblock %}
+                <div class="space-y-1">
+                {% for i in range(1, 11) %}
+                <a href="{{ request.script_root }}/level{{i}}" class="block px-3 py-2 text-sm rounded transition-all duration-200 mono-font {% block level_link scoped %}{% endblock %}">
+                    Level {{ '%02d' % i }} :: {{ titles[i-1] }}
+                </a>
+                {% endfor %}
+                </div>
+            </div>
+        </aside>
+        <main class="flex-1 relative">
+            <div class="mb-6">
+                {% block heading %}{% endblock %}
+            </div>
+            """ + PANEL_OPEN + """{% block panel %}{% endblock %}""" + PANEL_CLOSE + """
+        </main>
+    </div>
+    {% block footer %}{% endblock %}
+</body>
+</html>
+"""
+
+def init_app(app, theme):
+    app.jinja_env.globals['dojo_layout'] = app.jinja_env.from_string(LAYOUT)
+    app.jinja_env.globals['theme'] = theme
@@ -0,0 +1,176 @@
+import itertools
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, current_app, g, request
+
+# --- PROMETHEUS-STYLE METRICS ---
+# Counters live in a fixed set of lock-striped shards: each thread is given one
+# stripe the first time it records, so threads rarely contend for a lock, and the
+# threaded server starting a new thread per request does not grow the set.
+# /metrics sums the stripes when it is scraped.
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STRIPES = 16
+
+class Stripe:
+    __slots__ = ('lock', 'counters', 'histograms')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+class Metrics:
+    def __init__(self, app_name):
+        self.app_name = app_name
+        self.gauges = {}
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Like any process-local Prometheus client, a forked worker starts its counters from zero.
+        self._stripes = [Stripe() for _ in range(STRIPES)]
+        self._next = itertools.count()
+        self._local = threading.local()
+
+    def _stripe(self):
+        stripe = getattr(self._local, 'stripe', None)
+        if stripe is None:
+            stripe = self._local.stripe = self._stripes[next(self._next) % STRIPES]
+        return stripe
+
+    def inc(self, name, labels=(), value=1):
+        stripe = self._stripe()
+        key = (name, labels)
+        with stripe.lock:
+            stripe.counters[key] = stripe.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        stripe = self._stripe()
+        key = (name, labels)
+        with stripe.lock:
+            hist = stripe.histograms.get(key)
+            if hist is None:
+                hist = stripe.histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0]
+            hist[0][bisect_left(BUCKETS, value)] += 1
+            hist[1] += value
+
+    def gauge(self, name, func, help_text=''):
+        self.gauges[name] = (func, help_text)
+
+    def families(self):
+        # name -> (type, help, sample lines), in exposition order.
+        counters = {}
+        histograms = {}
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe_counters = list(stripe.counters.items())
+                stripe_histograms = [(key, (list(buckets), total)) for key, (buckets, total) in stripe.histograms.items()]
+            for key, value in stripe_counters:
+                counters[key] = counters.get(key, 0) + value
+            for key, (buckets, total) in stripe_histograms:
+                merged = histograms.setdefault(key, [[0] * (len(BUCKETS) + 1), 0.0])
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+
+        families = {}
+        for (name, labels), value in sorted(counters.items()):
+            families.setdefault(name, ('counter', '', []))[2].append(f'{name}{{{self._labels(labels)}}} {value:g}')
+        for (name, labels), (buckets, total) in sorted(histograms.items()):
+            lines = families.setdefault(name, ('histogram', '', []))[2]
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float('inf'),), buckets):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f'{name}_bucket{{{self._labels(labels + (("le", le),))}}} {cumulative}')
+            lines.append(f'{name}_sum{{{self._labels(labels)}}} {total:.6f}')
+            lines.append(f'{name}_count{{{self._labels(labels)}}} {cumulative}')
+        for name, (func, help_text) in sorted(self.gauges.items()):
+            families.setdefault(name, ('gauge', help_text, []))[2].append(f'{name}{{{self._labels(())}}} {func():g}')
+        return families
+
+    def render(self):
+        return render(self)
+
+    def _labels(self, labels):
+        return ','.join(f'{k}="{v}"' for k, v in (('app', self.app_name),) + labels)
+
+def render(*registries):
+    # Several apps in one process (dojo/host.py) share one exposition: their
+    # samples differ by the app label, but each family is declared once.
+    families = {}
+    for registry in registries:
+        for name, (kind, help_text, lines) in registry.families().items():
+            family = families.setdefault(name, (kind, help_text, []))
+            family[2].extend(lines)
+    out = []
+    for name, (kind, help_text, lines) in families.items():
+        if help_text:
+            out.append(f'# HELP {name} {help_text}')
+        out.append(f'# TYPE {name} {kind}')
+        out.extend(lines)
+    return '\n'.join(out) + '\n'
+
+def resident_memory():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def current():
+    return current_app.extensions['dojo_metrics']
+
+def waf_block(level):
+    current().inc('dojo_waf_blocks_total', (('level', level),))
+
+def add_rows(count):
+    g._rows_fetched = g.get('_rows_fetched', 0) + count
+
+def defer_sql():
+    # The page runs its SQL while it is streamed: record_sql() is called when the stream ends.
+    g._sql_deferred = True
+
+def record_sql(metrics=None):
+    metrics = metrics or current()
+    labels = (('route', request.endpoint or 'unknown'),)
+    phases = g.get('_phases')
+    if phases and 'sql' in phases:
+        metrics.observe('dojo_sql_duration_seconds', labels, phases['sql'])
+    rows = g.get('_rows_fetched')
+    if rows:
+        metrics.inc('dojo_rows_fetched_total', labels, rows)
+
+def init_app(app, app_name):
+    metrics = app.extensions['dojo_metrics'] = Metrics(app_name)
+    metrics.gauge('process_resident_memory_bytes', resident_memory, 'Resident set size of this worker.')
+
+    @app.before_request
+    def start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.get('_metrics_start')
+        route = request.endpoint or 'unknown'
+        if start is None or route == 'metrics':
+            return response
+        labels = (('route', route),)
+        metrics.inc('dojo_requests_total', labels + (('status', str(response.status_code)),))
+        if response.is_streamed:
+            # A streamed page runs its SQL and sleep() after the headers: time it until the body is closed.
+            response.call_on_close(lambda: metrics.observe('dojo_request_duration_seconds', labels, time.perf_counter() - start))
+        else:
+            metrics.observe('dojo_request_duration_seconds', labels, time.perf_counter() - start)
+        if not g.get('_sql_deferred'):
+            record_sql(metrics)
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    return metrics
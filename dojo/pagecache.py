@@ -0,0 +1,55 @@
+import functools
+import hashlib
+from flask import current_app, request
+
+from dojo import metrics
+from dojo.assets import precompress, serve_encoded
+
+# --- RENDERED PAGE CACHE ---
+# For views whose output never depends on the request (the payload lives in the
+# URL fragment, or the body is a constant). The first request renders the page;
+# after that the body is served from memory with a strong ETag, 304 on
+# If-None-Match, and gzip/brotli variants compressed once. Pages are keyed by
+# endpoint and mount point (links depend on request.script_root, see dojo/host.py).
+
+CACHE_CONTROL = 'no-cache'
+
+class CachedPage:
+    __slots__ = ('etag', 'content_type', 'bodies')
+
+    def __init__(self, body, content_type):
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.content_type = content_type
+        self.bodies = precompress(body)
+
+    def serve(self):
+        return serve_encoded(self.bodies, self.etag, self.content_type, CACHE_CONTROL)
+
+class PageCache:
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._pages = {}
+
+    def static(self, variant=None):
+        # variant() returns an extra cache key for this request, or None when the
+        # request is not one of the cacheable variants (it is then rendered normally).
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                extra = variant() if variant is not None else ''
+                if extra is None:
+                    return view(*args, **kwargs)
+                key = (request.endpoint, request.script_root, extra)
+                page = self._pages.get(key)
+                if page is None:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed or len(self._pages) >= self.max_entries:
+                        return response
+                    page = self._pages[key] = CachedPage(response.get_data(), response.content_type)
+                    result = 'miss'
+                else:
+                    result = 'hit'
+                metrics.current().inc('dojo_page_cache_total', (('route', request.endpoint), ('result', result)))
+                return page.serve()
+            return wrapper
+        return decorator
@@ -0,0 +1,154 @@
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from flask import Response, abort, request
+
+# --- ON-DEMAND SAMPLING PROFILER ---
+# GET /admin/profile?seconds=10 samples every request thread of this worker at
+# ~100 Hz for that long and answers with collapsed stacks (one
+# "frame;frame;... count" line per distinct stack), ready for flamegraph.pl or
+# speedscope. Each stack is rooted at the route it belongs to (sqli/level3) and
+# the phase the thread was in: the innermost frame from the WAF, the SQL layer,
+# the template engine, the XSS verifier or the compressor decides it, else "app"
+# (level code), or "server" outside the app: headers, socket writes, access log.
+# SQLite and re run in C, so their time shows up under the Python frame that called them.
+#
+# Nothing runs per request while no profile is being taken. While one is, each
+# request records its thread and route, and forgets them once its response (or
+# stream) is closed. Samples cover the worker that answered the profile request
+# only. Requires DOJO_ADMIN_TOKEN (sent as "Authorization: Bearer <token>");
+# without it the endpoint does not exist.
+
+ADMIN_TOKEN = os.environ.get('DOJO_ADMIN_TOKEN') or None
+MAX_SECONDS = 60
+MAX_DEPTH = 96
+
+# Innermost matching frame wins: rows fetched while a template renders count as sql.
+PHASES = (
+    (os.sep + 'dojo' + os.sep + 'waf.py', 'waf'),
+    (os.sep + 'dojo' + os.sep + 'journal.py', 'sql'),
+    (os.sep + 'dojo' + os.sep + 'comments.py', 'sql'),
+    (os.sep + 'sqlite3' + os.sep, 'sql'),
+    (os.sep + 'dojo' + os.sep + 'xssverify.py', 'verify'),
+    (os.sep + 'dojo' + os.sep + 'compress.py', 'compress'),
+    (os.sep + 'jinja2' + os.sep, 'render'),
+    (os.sep + 'dojo' + os.sep + 'templates.py', 'render'),
+    (os.sep + 'flask' + os.sep + 'templating.py', 'render'),
+    # Reached before any of the above: level code, or a streamed body between chunks.
+    (os.sep + 'flask' + os.sep + 'app.py', 'app'),
+    (os.sep + 'flask' + os.sep + 'helpers.py', 'app'),
+    (os.sep + 'dojo' + os.sep + 'streaming.py', 'app'),
+)
+
+_phases = {}
+_labels = {}
+
+def phase_of(filename):
+    phase = _phases.get(filename)
+    if phase is None:
+        phase = _phases[filename] = next((name for part, name in PHASES if part in filename), '')
+    return phase
+
+def label(code):
+    name = _labels.get(code)
+    if name is None:
+        name = _labels[code] = f'{code.co_qualname} ({os.path.basename(code.co_filename)})'
+    return name
+
+class Profiler:
+    def __init__(self, hz=97):
+        # 97 Hz rather than 100: stays out of step with anything running on a 10 ms timer.
+        self.hz = hz
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self.threads = {}
+        self.active = False
+
+    def track(self, app_name):
+        if not self.active:
+            return None
+        tid = threading.get_ident()
+        self.threads[tid] = f'{app_name}/{request.endpoint}'
+        return tid
+
+    def sample(self, seconds, route=None):
+        # Blocks for `seconds`; returns (samples, Counter of collapsed stacks).
+        if not self._lock.acquire(blocking=False):
+            return None
+        stacks = Counter()
+        samples = 0
+        try:
+            self.active = True
+            interval = 1.0 / self.hz
+            end = time.monotonic() + seconds
+            own = threading.get_ident()
+            while time.monotonic() < end:
+                frames = sys._current_frames()
+                for tid, name in list(self.threads.items()):
+                    frame = frames.get(tid)
+                    if frame is None or tid == own or (route and not name.endswith('/' + route)):
+                        continue
+                    stacks[self.collapse(name, frame)] += 1
+                    samples += 1
+                del frames
+                time.sleep(interval)
+        finally:
+            self.active = False
+            self.threads.clear()
+            self._lock.release()
+        return samples, stacks
+
+    def collapse(self, name, frame):
+        names = []
+        phase = ''
+        while frame is not None and len(names) < MAX_DEPTH:
+            code = frame.f_code
+            if not phase:
+                phase = phase_of(code.co_filename)
+            names.append(label(code))
+            frame = frame.f_back
+        names.append(phase or 'server')
+        names.append(name)
+        return ';'.join(reversed(names))
+
+    def init_app(self, app, app_name):
+        @app.before_request
+        def track_thread():
+            tid = self.track(app_name)
+            if tid is not None:
+                # Forgotten once the response is closed, which for a streamed page is after its last chunk.
+                request.environ['dojo.profile_tid'] = tid
+
+        @app.after_request
+        def untrack_thread(response):
+            tid = request.environ.get('dojo.profile_tid')
+            if tid is not None:
+                response.call_on_close(lambda: self.threads.pop(tid, None))
+            return response
+
+        @app.route('/admin/profile')
+        def admin_profile():
+            if ADMIN_TOKEN is None:
+                abort(404)
+            token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+            if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+                abort(403)
+            seconds = min(max(request.args.get('seconds', 10, type=float), 0.1), MAX_SECONDS)
+            result = self.sample(seconds, request.args.get('route') or None)
+            if result is None:
+                return Response('A profile is already being taken in this worker.\n', status=409, mimetype='text/plain')
+            samples, stacks = result
+            body = ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+            return Response(body, mimetype='text/plain', headers={
+                'X-Profile-Samples': str(samples), 'X-Profile-Seconds': f'{seconds:g}', 'X-Profile-Pid': str(os.getpid())})
+
+profiler = Profiler()
+
+def init_app(app, app_name):
+    profiler.init_app(app, app_name)
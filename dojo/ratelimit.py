@@ -0,0 +1,107 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import Response, request
+
+from dojo import metrics, session
+
+# --- PER-CLIENT RATE LIMITS ---
+# One token bucket per (client, level). A client is its session cookie, or its
+# IP address when it sends none: scanners that drop cookies would otherwise get
+# a fresh session, and a fresh bucket, on every request. A bucket holds `burst`
+# tokens and refills at `rate` per second; each request spends one, and an
+# empty bucket answers 429 with Retry-After.
+#
+# A bucket is two floats in an LRU dict. One left idle long enough to refill is
+# the same as no bucket, so those are evicted from the cold end a few at a time
+# as requests come in. Limits are per worker process.
+
+class Limit:
+    __slots__ = ('rate', 'burst')
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+
+    @property
+    def refill_seconds(self):
+        return self.burst / self.rate
+
+class RateLimiter:
+    def __init__(self, per_level, max_buckets=100_000, evict_batch=8):
+        # per_level: endpoint -> Limit; other endpoints are not limited.
+        self.per_level = per_level
+        self.max_buckets = max_buckets
+        self.evict_batch = evict_batch
+        self.idle_seconds = max((limit.refill_seconds for limit in per_level.values()), default=0.0)
+        self.evicted = 0
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # A forked worker starts with no buckets (and a lock nobody holds).
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, key, limit, now):
+        # Spends one token; returns 0 when allowed, else the seconds until one is available.
+        with self._lock:
+            buckets = self._buckets
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [limit.burst, now]
+                tokens = limit.burst
+            else:
+                buckets.move_to_end(key)
+                tokens = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / limit.rate
+            bucket[0] = tokens
+            bucket[1] = now
+            self._evict(now)
+        return wait
+
+    def _evict(self, now):
+        buckets = self._buckets
+        for _ in range(self.evict_batch):
+            if not buckets:
+                return
+            key, (tokens, last) = next(iter(buckets.items()))
+            if now - last < self.idle_seconds and len(buckets) <= self.max_buckets:
+                return
+            del buckets[key]
+            self.evicted += 1
+
+    def client(self):
+        sid = session.cookie_sid()
+        return sid if sid is not None else 'ip:' + (request.remote_addr or '')
+
+    def check(self):
+        limit = self.per_level.get(request.endpoint)
+        if limit is None:
+            return None
+        wait = self.take((self.client(), request.endpoint), limit, time.monotonic())
+        if not wait:
+            return None
+        metrics.current().inc('dojo_rate_limited_total', (('route', request.endpoint),))
+        return Response('Rate limit exceeded: slow down.\n', status=429, mimetype='text/plain',
+                        headers={'Retry-After': str(math.ceil(wait))})
+
+    def init_app(self, app):
+        app.before_request(self.check)
+
+def level_limits(rate, burst, overrides=None, count=10):
+    # The same limit on level1..levelN, with per-level overrides; rate 0 disables limiting.
+    if rate <= 0:
+        return {}
+    limits = {f'level{i}': Limit(rate, burst) for i in range(1, count + 1)}
+    limits.update(overrides or {})
+    return limits
@@ -0,0 +1,181 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- PER-TRAINEE SQLITE SANDBOXES ---
+# The seed database is built once (see dojo/snapshot.py). Each trainee gets a
+# private in-memory clone of it that lives across requests until it is evicted
+# by the LRU / idle / memory limits.
+#
+# With a directory (normally on tmpfs, see dojo/serve.py) each clone is a file
+# <sid>.db instead, so every worker process sees the same sandbox and no sticky
+# sessions are needed. A worker only caches connections; the files are swept
+# by idle time, count and total size.
+
+class Sandbox:
+    __slots__ = ('sid', 'conn', 'lock', 'users', 'last_used', 'size')
+
+    def __init__(self, sid, conn, size):
+        self.sid = sid
+        self.conn = conn
+        self.lock = threading.Lock()
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.size = size
+
+def db_size(conn):
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+
+class SandboxPool:
+    def __init__(self, snapshot, setup=None, factory=sqlite3.Connection, max_sandboxes=512, idle_timeout=1800, max_bytes=256 * 1024 * 1024,
+                 directory=None, mmap_size=0, sweep_interval=30):
+        self.snapshot = snapshot
+        self.setup = setup
+        self.factory = factory
+        self.max_sandboxes = max_sandboxes
+        self.idle_timeout = idle_timeout
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.mmap_size = mmap_size
+        self.sweep_interval = sweep_interval
+        self.total_bytes = 0
+        self.evictions = 0
+        self._boxes = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        # Connections must not cross fork(): idle ones are closed in the parent and
+        # a worker starts with an empty cache.
+        os.register_at_fork(before=self._before_fork, after_in_child=self._after_fork)
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def path(self, sid):
+        return os.path.join(self.directory, f'{sid}.db')
+
+    def clone(self, sid=None):
+        path = self.path(sid) if self.directory is not None and sid is not None else None
+        conn = self.snapshot.connect(self.factory, path=path, mmap_size=self.mmap_size)
+        if self.setup is not None:
+            self.setup(conn)
+        return conn
+
+    def checkout(self, sid):
+        with self._lock:
+            box = self._boxes.get(sid)
+            if box is not None and box.users == 0 and self.directory is not None and not os.path.exists(self.path(sid)):
+                # Swept by another worker: start again from the seed.
+                self._remove(box)
+                box = None
+            if box is None:
+                conn = self.clone(sid)
+                box = Sandbox(sid, conn, db_size(conn) if self.directory is not None else len(self.snapshot))
+                self._boxes[sid] = box
+                self.total_bytes += box.size
+            else:
+                self._boxes.move_to_end(sid)
+            box.users += 1
+            self._evict()
+        # One request at a time per trainee: keeps their transactions from interleaving.
+        box.lock.acquire()
+        box.last_used = time.monotonic()
+        return box
+
+    def checkin(self, box):
+        conn = box.conn
+        try:
+            if conn.in_transaction:
+                conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+        size = db_size(conn)
+        box.last_used = time.monotonic()
+        if self.directory is not None:
+            # The file's mtime is the idle clock every worker's sweep looks at.
+            try:
+                os.utime(self.path(box.sid))
+            except OSError:
+                pass
+        box.lock.release()
+        with self._lock:
+            box.users -= 1
+            self.total_bytes += size - box.size
+            box.size = size
+            self._evict()
+            if self.directory is not None and time.monotonic() - self._last_sweep > self.sweep_interval:
+                self._sweep()
+
+    def drop(self, sid):
+        with self._lock:
+            box = self._boxes.get(sid)
+            if box is not None and box.users == 0:
+                self._remove(box)
+
+    def _remove(self, box):
+        del self._boxes[box.sid]
+        self.total_bytes -= box.size
+        self.evictions += 1
+        box.conn.close()
+
+    def _evict(self):
+        # Caller holds self._lock. Boxes currently serving a request are never evicted.
+        now = time.monotonic()
+        for box in list(self._boxes.values()):
+            over = len(self._boxes) > self.max_sandboxes or self.total_bytes > self.max_bytes
+            idle = now - box.last_used > self.idle_timeout
+            if not (over or idle):
+                # LRU order: everything after this one is newer and within limits.
+                break
+            if box.users == 0:
+                self._remove(box)
+
+    def _sweep(self):
+        # Caller holds self._lock. Shared files are removed oldest first when idle
+        # or over the count/size limits; sandboxes busy in this worker are kept.
+        self._last_sweep = time.monotonic()
+        files = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.db'):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, entry.name[:-3], entry.path))
+        files.sort()
+        count = len(files)
+        total = sum(f[1] for f in files)
+        now = time.time()
+        for mtime, size, sid, path in files:
+            over = count > self.max_sandboxes or total > self.max_bytes
+            if not (over or now - mtime > self.idle_timeout):
+                break
+            box = self._boxes.get(sid)
+            if box is not None:
+                if box.users:
+                    continue
+                self._remove(box)
+            for suffix in ('', '-journal'):
+                try:
+                    os.unlink(path + suffix)
+                except FileNotFoundError:
+                    pass
+            count -= 1
+            total -= size
+
+    def _before_fork(self):
+        with self._lock:
+            for box in list(self._boxes.values()):
+                if box.users == 0:
+                    self._remove(box)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._boxes = OrderedDict()
+        self.total_bytes = 0
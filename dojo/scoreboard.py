@@ -0,0 +1,218 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import g, jsonify, request
+
+from dojo import session
+
+# --- SOLVE EVENTS AND SCOREBOARD ---
+# Levels mark a request as an attempt (attempt()) and, once their own success
+# signal fires, as solved (solve()). When the request ends, one event is
+# published on the bus: (time, app, level, trainee, solved). Streamed pages
+# decide late (rows are checked as they are sent); their event goes out when the
+# stream closes, which ends the request context a second time.
+#
+# The scoreboard folds each event into running aggregates in O(1): per trainee
+# (attempts, first attempt and solve time per level, score) and per level
+# (attempts, solvers, total time-to-solve). The leaderboard is a sorted list
+# of (-score, last solve, trainee) keys, moved with bisect on every new solve.
+#
+# Only sessions that sent their cookie back are scored: a client that drops
+# cookies (curl, sqlmap without its cookie jar) gets a new id on every request
+# and would add a trainee and an event line each time. Level pages hand out the
+# id on first view, so a browser's first payload already carries it. The board
+# keeps at most DOJO_SCOREBOARD_MAX_TRAINEES trainees; past that the one idle
+# the longest is dropped (clients inventing ids of their own).
+#
+# With DOJO_EVENTS_DIR set (dojo/serve.py does), events are appended to a
+# shared file and every worker folds in the lines it has not seen yet before
+# answering, so all workers (and both dojos) serve the same board. The file is
+# replayed on startup; delete it to start a new event.
+
+POINTS_PER_LEVEL = 100
+
+def points(level):
+    # level1 .. level10: later levels are worth more.
+    return POINTS_PER_LEVEL * int(level[5:] or 1)
+
+class TraineeStats:
+    __slots__ = ('trainee', 'attempts', 'score', 'first_attempt', 'solved', 'last_solve')
+
+    def __init__(self, trainee):
+        self.trainee = trainee
+        self.attempts = 0
+        self.score = 0
+        self.first_attempt = {}
+        self.solved = {}
+        self.last_solve = 0.0
+
+    def key(self):
+        return (-self.score, self.last_solve, self.trainee)
+
+class LevelStats:
+    __slots__ = ('attempts', 'solvers', 'total_time_to_solve', 'fastest')
+
+    def __init__(self):
+        self.attempts = 0
+        self.solvers = 0
+        self.total_time_to_solve = 0.0
+        self.fastest = None
+
+class Scoreboard:
+    def __init__(self, max_trainees=10000):
+        self.max_trainees = max_trainees
+        self.trainees = OrderedDict()  # least recently active first
+        self.levels = {}
+        self.ranking = []
+        self.events = 0
+        self.evicted = 0
+
+    def apply(self, event):
+        at, app, level, trainee, solved = event
+        self.events += 1
+        stats = self.trainees.get(trainee)
+        if stats is None:
+            stats = self.trainees[trainee] = TraineeStats(trainee)
+            if len(self.trainees) > self.max_trainees:
+                self._evict()
+        else:
+            self.trainees.move_to_end(trainee)
+        name = f'{app}/{level}'
+        level_stats = self.levels.get(name)
+        if level_stats is None:
+            level_stats = self.levels[name] = LevelStats()
+        stats.attempts += 1
+        level_stats.attempts += 1
+        first = stats.first_attempt.setdefault(name, at)
+        if not solved or name in stats.solved:
+            return
+        elapsed = max(0.0, at - first)
+        stats.solved[name] = elapsed
+        level_stats.solvers += 1
+        level_stats.total_time_to_solve += elapsed
+        if level_stats.fastest is None or elapsed < level_stats.fastest:
+            level_stats.fastest = elapsed
+        if stats.score:
+            del self.ranking[bisect.bisect_left(self.ranking, stats.key())]
+        stats.score += points(level)
+        stats.last_solve = at
+        bisect.insort(self.ranking, stats.key())
+
+    def _evict(self):
+        # Level aggregates keep what the evicted trainee contributed.
+        _, stats = self.trainees.popitem(last=False)
+        if stats.score:
+            del self.ranking[bisect.bisect_left(self.ranking, stats.key())]
+        self.evicted += 1
+
+    def rank(self, trainee):
+        stats = self.trainees.get(trainee)
+        if stats is None or not stats.score:
+            return None
+        return bisect.bisect_left(self.ranking, stats.key()) + 1
+
+    def top(self, limit):
+        return [self.trainees[trainee] for _, _, trainee in self.ranking[:limit]]
+
+class EventBus:
+    def __init__(self, path=None):
+        self.path = path
+        self._subscribers = []
+        self._offset = 0
+        self._reader = None
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Each worker reads the shared file with its own descriptor (a shared one
+        # would share the file position too), resuming where the master stopped.
+        self._lock = threading.Lock()
+        self._reader = None
+
+    def subscribe(self, func):
+        self._subscribers.append(func)
+
+    def publish(self, event):
+        if self.path is None:
+            with self._lock:
+                self._dispatch(event)
+            return
+        line = (json.dumps(event, separators=(',', ':')) + '\n').encode()
+        # One O_APPEND write per event: lines from concurrent workers never interleave.
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        self.poll()
+
+    def poll(self):
+        # Folds in the events other workers appended since the last call.
+        if self.path is None:
+            return
+        with self._lock:
+            if self._reader is None:
+                if not os.path.exists(self.path):
+                    return
+                self._reader = open(self.path, 'rb')
+            self._reader.seek(self._offset)
+            data = self._reader.read()
+            # A line still being written has no newline yet: leave it for the next poll.
+            end = data.rfind(b'\n') + 1
+            self._offset += end
+            for line in data[:end].splitlines():
+                if line:
+                    self._dispatch(json.loads(line))
+
+    def _dispatch(self, event):
+        for func in self._subscribers:
+            func(event)
+
+EVENTS_DIR = os.environ.get('DOJO_EVENTS_DIR') or None
+MAX_TRAINEES = int(os.environ.get('DOJO_SCOREBOARD_MAX_TRAINEES', 10000))
+bus = EventBus(os.path.join(EVENTS_DIR, 'events.jsonl') if EVENTS_DIR else None)
+board = Scoreboard(MAX_TRAINEES)
+bus.subscribe(board.apply)
+
+def attempt(solved=False):
+    # This request tried the current level (a payload was run or checked).
+    # The trainee id is fixed now, while a new session's cookie can still be set.
+    session.current_sid()
+    g._dojo_attempt = g.get('_dojo_attempt', False) or solved
+
+def solve():
+    attempt(True)
+
+def trainee_name(trainee):
+    return trainee[:8]
+
+def init_app(app, app_name):
+    @app.teardown_request
+    def publish_attempt(exception):
+        solved = g.pop('_dojo_attempt', None)
+        # A session created by this request is not scored until its cookie comes back.
+        if solved is not None and request.endpoint and not g.get('_dojo_sid_new'):
+            bus.publish((time.time(), app_name, request.endpoint, session.current_sid(), solved))
+
+    @app.route('/scoreboard')
+    def scoreboard():
+        bus.poll()
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        me = session.cookie_sid()
+        levels = {name: {'attempts': stats.attempts, 'solvers': stats.solvers,
+                         'mean_time_to_solve': round(stats.total_time_to_solve / stats.solvers, 3) if stats.solvers else None,
+                         'fastest': round(stats.fastest, 3) if stats.fastest is not None else None}
+                  for name, stats in sorted(board.levels.items())}
+        return jsonify({
+            'events': board.events,
+            'trainees': len(board.trainees),
+            'evicted': board.evicted,
+            'leaderboard': [{'rank': i, 'trainee': trainee_name(stats.trainee), 'score': stats.score,
+                             'solved': len(stats.solved), 'attempts': stats.attempts}
+                            for i, stats in enumerate(board.top(limit), 1)],
+            'levels': levels,
+            'me': {'trainee': trainee_name(me), 'rank': board.rank(me)} if me else None,
+        })
@@ -0,0 +1,132 @@
+# Production launcher: runs one dojo under a pre-forking multi-process server.
+#
+# The master imports the app (building the seed snapshot), renders every level
+# once so the template cache is filled, freezes the heap and only then forks,
+# so workers share all of that copy-on-write. Workers accept on one shared
+# listening socket and each serves requests on threads. Sandboxes (SQLi) and
+# the comment store (XSS) live as SQLite files on tmpfs, so any worker can
+# serve any trainee without sticky sessions. Solve events (dojo/scoreboard.py)
+# go to one shared log that outlives restarts. Dead workers are respawned.
+#
+# Usage: python -m dojo.serve sqli|xss|dojo [--host 0.0.0.0] [--port 1111] [--workers N] [--shared-dir /dev/shm/dojo]
+import argparse
+import gc
+import glob
+import importlib
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APPS = {
+    # name: (module, default port, {env var naming a shared directory: subdirectory})
+    'sqli': ('vuln_sqli', 1111, {'SQLI_SANDBOX_DIR': 'sqli', 'DOJO_EVENTS_DIR': 'events'}),
+    'xss': ('vuln_xss', 1112, {'XSS_DATA_DIR': 'xss', 'DOJO_EVENTS_DIR': 'events'}),
+    # Both dojos in one process, see dojo/host.py.
+    'dojo': ('dojo.host', 1110, {'SQLI_SANDBOX_DIR': 'sqli', 'XSS_DATA_DIR': 'xss', 'DOJO_EVENTS_DIR': 'events'}),
+}
+
+# Warm-up requests run under this session, so their journal lines are recognisable.
+WARMUP_SID = '0' * 32
+
+def default_shared_dir():
+    return '/dev/shm/dojo' if os.path.isdir('/dev/shm') else os.path.join(tempfile.gettempdir(), 'dojo')
+
+def load(name, shared_dir):
+    module, _, dirs = APPS[name]
+    for env, sub in dirs.items():
+        directory = os.path.join(shared_dir, sub)
+        os.makedirs(directory, exist_ok=True)
+        # Files left by a previous run may come from an older seed.
+        for path in glob.glob(os.path.join(directory, '*.db*')):
+            os.unlink(path)
+        os.environ[env] = directory
+    sys.path[:0] = [ROOT, os.path.join(ROOT, 'sqli'), os.path.join(ROOT, 'xss')]
+    return importlib.import_module(module).app, shared_dir
+
+def warm_up(app, shared_dir):
+    from dojo.session import COOKIE_NAME
+    client = app.test_client()
+    client.set_cookie(COOKIE_NAME, WARMUP_SID)
+    mounts = getattr(app, 'wsgi_app', None)
+    apps = [('', app)] + list(getattr(mounts, 'mounts', {}).items())
+    for prefix, mounted in apps:
+        for rule in mounted.url_map.iter_rules():
+            if 'GET' in rule.methods and not rule.arguments and rule.endpoint not in ('static', 'metrics', 'reset'):
+                # Accept-Encoding: the compressed page frames are built here, before fork.
+                client.get(prefix + rule.rule, headers={'Accept-Encoding': 'gzip, zstd'}).close()
+    for path in glob.glob(os.path.join(shared_dir, '*', f'{WARMUP_SID}.db*')):
+        os.unlink(path)
+    from dojo import capture
+    if capture.capture is not None:
+        capture.capture.discard()
+
+def worker(app, sock, host, port):
+    from werkzeug.serving import make_server
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+def spawn(app, sock, host, port):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            worker(app, sock, host, port)
+        finally:
+            os._exit(1)
+    return pid
+
+def main():
+    ap = argparse.ArgumentParser(description='Run a dojo under a pre-forking multi-process server.')
+    ap.add_argument('app', choices=sorted(APPS))
+    ap.add_argument('--host', default='0.0.0.0')
+    ap.add_argument('--port', type=int)
+    ap.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    ap.add_argument('--backlog', type=int, default=1024)
+    ap.add_argument('--shared-dir', default=default_shared_dir(), help='tmpfs directory for shared SQLite files')
+    args = ap.parse_args()
+    port = args.port or APPS[args.app][1]
+
+    app, shared_dir = load(args.app, args.shared_dir)
+    warm_up(app, shared_dir)
+    sock = socket.create_server((args.host, port), backlog=args.backlog)
+    sock.set_inheritable(True)
+    # Objects created so far are never collected: keeps the GC from touching
+    # (and un-sharing) their pages in every worker.
+    gc.collect()
+    gc.freeze()
+
+    workers = {spawn(app, sock, args.host, port) for _ in range(args.workers)}
+    print(f' * {args.app} dojo on http://{args.host}:{port} ({args.workers} workers, shared files in {shared_dir})', flush=True)
+
+    stopping = False
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if not stopping:
+            print(f' * worker {pid} exited ({status}), respawning', file=sys.stderr, flush=True)
+            time.sleep(0.1)
+            workers.add(spawn(app, sock, args.host, port))
+    sock.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import secrets
+from flask import g, request
+
+# --- TRAINEE SESSION ---
+# Every browser / scanner gets an opaque id cookie. Sandboxes and other
+# per-trainee state are keyed by it.
+COOKIE_NAME = 'dojo_sid'
+
+def cookie_sid():
+    # The id the client sent, or None when it sent none (or garbage).
+    sid = request.cookies.get(COOKIE_NAME, '')
+    if len(sid) != 32 or not all(ch in '0123456789abcdef' for ch in sid):
+        return None
+    return sid
+
+def current_sid():
+    sid = getattr(g, '_dojo_sid', None)
+    if sid is None:
+        sid = cookie_sid()
+        if sid is None:
+            sid = secrets.token_hex(16)
+            g._dojo_sid_new = True
+        g._dojo_sid = sid
+    return sid
+
+def init_app(app):
+    @app.after_request
+    def set_sid_cookie(response):
+        if getattr(g, '_dojo_sid_new', False):
+            response.set_cookie(COOKIE_NAME, g._dojo_sid, httponly=True, samesite='Lax')
+        return response
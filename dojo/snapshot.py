@@ -0,0 +1,107 @@
+import os
+import sqlite3
+
+# --- SEED SNAPSHOTS ---
+# An immutable serialized image of a freshly seeded database. Restoring copies
+# the image back (whole database or selected tables) without re-running any DDL.
+# The image is byte-for-byte a database file, so it can also be materialized on
+# disk (e.g. tmpfs) for connections shared between worker processes.
+
+# Above this image size restore_tables() copies the whole image instead of re-inserting rows.
+PARTIAL_RESTORE_LIMIT = 8 * 1024 * 1024
+
+class Snapshot:
+    def __init__(self, conn):
+        self.image = conn.serialize()
+        self.schema = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'").fetchall())
+
+    @classmethod
+    def build(cls, seed):
+        conn = sqlite3.connect(':memory:')
+        seed(conn)
+        snapshot = cls(conn)
+        conn.close()
+        return snapshot
+
+    @classmethod
+    def load(cls, path):
+        # The file already is the serialized image: no need to round-trip it through serialize().
+        snapshot = cls.__new__(cls)
+        with open(path, 'rb') as f:
+            snapshot.image = f.read()
+        conn = snapshot.connect()
+        snapshot.schema = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'").fetchall())
+        conn.close()
+        return snapshot
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(self.image)
+        os.replace(tmp, path)
+
+    def __len__(self):
+        return len(self.image)
+
+    def materialize(self, path):
+        # Create path from the image unless it already exists; link() makes the
+        # create atomic when several workers race for the same file.
+        if os.path.exists(path):
+            return False
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(self.image)
+        try:
+            os.link(tmp, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.unlink(tmp)
+
+    def connect(self, factory=sqlite3.Connection, path=None, mmap_size=0, timeout=5.0):
+        if path is None:
+            conn = sqlite3.connect(':memory:', check_same_thread=False, factory=factory)
+            conn.deserialize(self.image)
+            return conn
+        self.materialize(path)
+        conn = sqlite3.connect(path, check_same_thread=False, factory=factory, timeout=timeout)
+        if mmap_size:
+            conn.execute(f'PRAGMA mmap_size = {int(mmap_size)}')
+        return conn
+
+    def restore(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if is_file(conn):
+            # deserialize() would detach a file connection into memory: copy pages back instead.
+            src = self.connect()
+            try:
+                src.backup(conn)
+            finally:
+                src.close()
+            return
+        conn.deserialize(self.image)
+
+    def restore_tables(self, conn, tables):
+        if conn.in_transaction:
+            conn.rollback()
+        live = dict(conn.execute("SELECT name, sql FROM main.sqlite_master WHERE type = 'table'").fetchall())
+        # A dropped or altered table cannot be refilled row-for-row, and a large
+        # table is cheaper to get back with the whole image: fall back to it.
+        if len(self.image) > PARTIAL_RESTORE_LIMIT or any(live.get(t) != self.schema.get(t) for t in tables):
+            self.restore(conn)
+            return
+        conn.execute("ATTACH DATABASE ':memory:' AS seed")
+        try:
+            conn.deserialize(self.image, name='seed')
+            with conn:
+                for t in tables:
+                    conn.execute(f'DELETE FROM main."{t}"')
+                    conn.execute(f'INSERT INTO main."{t}" SELECT * FROM seed."{t}"')
+        finally:
+            conn.execute("DETACH DATABASE seed")
+
+def is_file(conn):
+    return bool(conn.execute("PRAGMA database_list").fetchone()[2])
@@ -0,0 +1,69 @@
+# --- STREAMED RESULTS ---
+# Rows are pulled from the cursor in small batches while the page is being
+# sent, so a UNION over a cross join never sits in memory as one big list.
+# Iteration stops at a row cap; the template can then show a truncation marker.
+# on_row sees each row as it is sent (levels check for their flag there).
+
+class RowStream:
+    def __init__(self, cur, cap, batch=64, on_error=None, on_row=None):
+        self.cur = cur
+        self.cap = cap
+        self.batch = batch
+        self.on_error = on_error
+        self.on_row = on_row
+        self.count = 0
+        self.truncated = False
+        self.error = None
+
+    def __iter__(self):
+        try:
+            while self.count < self.cap:
+                rows = self.cur.fetchmany(min(self.batch, self.cap - self.count))
+                if not rows:
+                    return
+                for row in rows:
+                    self.count += 1
+                    if self.on_row is not None:
+                        self.on_row(row)
+                    yield row
+            self.truncated = self.cur.fetchone() is not None
+        except Exception as e:
+            # Errors can surface while stepping later rows; rows already sent stay on the page.
+            self.error = e
+            if self.on_error is not None:
+                yield from self.on_error(e)
+
+def buffered(chunks, size=8192, flush_after=None):
+    # Jinja yields many tiny strings; group them so each write to the client is a useful size.
+    # The chunk containing flush_after is sent at once (early flush before slow work).
+    pending = []
+    length = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        length += len(chunk)
+        if flush_after is not None and flush_after in chunk:
+            flush_after = None
+            length = size
+        if length >= size:
+            yield ''.join(pending)
+            pending = []
+            length = 0
+    if pending:
+        yield ''.join(pending)
+
+class ClosingStream:
+    # Response body that runs on_close exactly once when the server closes it,
+    # even if the client went away before the first chunk.
+    def __init__(self, chunks, on_close):
+        self.chunks = chunks
+        self.on_close = on_close
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        if hasattr(self.chunks, 'close'):
+            self.chunks.close()
+        on_close, self.on_close = self.on_close, None
+        if on_close is not None:
+            on_close()
@@ -0,0 +1,37 @@
+from flask import render_template, stream_template
+
+from dojo import timing
+
+# --- COMPILED TEMPLATE REGISTRY ---
+# render_template_string() lexes and compiles its source on every call. The
+# registry compiles each distinct source once and renders the cached Template
+# through render_template(), so context processors and signals still apply.
+
+class TemplateRegistry:
+    def __init__(self, app, max_entries=256):
+        self.app = app
+        self.max_entries = max_entries
+        # cache=False compiles on every call (the old behaviour); used by bench/bench_render.py.
+        self.cache = True
+        self._compiled = {}
+
+    def get(self, source):
+        if not self.cache:
+            return self.app.jinja_env.from_string(source)
+        template = self._compiled.get(source)
+        if template is None:
+            template = self.app.jinja_env.from_string(source)
+            if len(self._compiled) < self.max_entries:
+                self._compiled[source] = template
+        return template
+
+    def preload(self, *sources):
+        for source in sources:
+            self.get(source)
+
+    def stream(self, source, **context):
+        return stream_template(self.get(source), **context)
+
+    def render(self, source, **context):
+        with timing.phase('render'):
+            return render_template(self.get(source), **context)
@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+
+# --- PER-REQUEST PHASE TIMING ---
+# Time spent in each phase of a request (sql, render, ...) is summed in g and
+# reported in a Server-Timing response header. A streamed page runs most of its
+# phases after that header is sent; an in-process caller (bench/loadtest.py) can
+# pass a dict as environ['dojo.phases'] and read every phase from it once the
+# body has been consumed.
+
+def add(name, seconds):
+    if has_request_context():
+        phases = g.setdefault('_phases', {})
+        phases[name] = phases.get(name, 0.0) + seconds
+
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - start)
+
+def stream(chunks, name, nested=('sql',)):
+    # Times a streamed body only while it produces a chunk, not while the client reads;
+    # nested phases recorded meanwhile (rows fetched as the template renders) count once.
+    phases = g.setdefault('_phases', {})
+    before = sum(phases.get(inner, 0.0) for inner in nested)
+    spent = 0.0
+    chunks = iter(chunks)
+    while True:
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        spent += time.perf_counter() - start
+        if chunk is None:
+            break
+        yield chunk
+    add(name, spent - (sum(phases.get(inner, 0.0) for inner in nested) - before))
+
+def init_app(app):
+    @app.before_request
+    def collect_phases():
+        phases = request.environ.get('dojo.phases')
+        if phases is not None:
+            phases.update(g.get('_phases', {}))
+            g._phases = phases
+
+    @app.after_request
+    def add_server_timing(response):
+        phases = g.get('_phases')
+        if phases:
+            response.headers['Server-Timing'] = ', '.join(f'{name};dur={seconds * 1000:.3f}' for name, seconds in phases.items())
+        return response
@@ -0,0 +1,171 @@
+import re
+
+# --- WAF RULE ENGINE ---
+# Each level's filter is compiled once into an Aho-Corasick automaton over its
+# literal tokens. Checking an input is a single left-to-right pass (one dict
+# lookup per character), so time is linear in the input no matter how it is
+# crafted, and inputs over the level's length budget are rejected before any
+# scanning. The rules reproduce the old ad-hoc checks exactly, including the
+# holes each level is meant to teach.
+
+BLOCK_TEXT = '[BLOCKED]'
+
+def re_ignorecase_folds():
+    # Characters that re.IGNORECASE treats as equal to an ASCII letter
+    # (e.g. U+017F 'ſ' matches 's', U+212A Kelvin sign matches 'k').
+    folds = {chr(c): chr(c).lower() for c in range(ord('A'), ord('Z') + 1)}
+    for c in range(0x80, 0x2200):
+        ch = chr(c)
+        for cand in {ch.lower()[:1], ch.upper()[:1]}:
+            if cand.isascii() and cand.isalpha() and re.fullmatch('(?i)' + cand, ch):
+                folds[ch] = cand.lower()
+    return folds
+
+RE_FOLDS = re_ignorecase_folds()
+
+class Automaton:
+    def __init__(self, patterns, folds=None):
+        self.patterns = list(patterns)
+        self.folds = folds or {}
+        goto = [{}]
+        out = [[]]
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(pid)
+        # Breadth-first: fill failure links and turn goto into a complete DFA over the alphabet.
+        alphabet = {ch for pattern in self.patterns for ch in pattern}
+        fail = [0] * len(goto)
+        delta = [dict() for _ in goto]
+        queue = []
+        for ch in alphabet:
+            nxt = goto[0].get(ch, 0)
+            delta[0][ch] = nxt
+            if nxt:
+                queue.append(nxt)
+        for state in queue:
+            out[state] = out[state] + out[fail[state]]
+            for ch in alphabet:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    delta[state][ch] = delta[fail[state]][ch]
+                else:
+                    fail[nxt] = delta[fail[state]][ch]
+                    delta[state][ch] = nxt
+                    queue.append(nxt)
+        # Transitions back to the root are implied by .get(ch, 0).
+        self.delta = [{ch: nxt for ch, nxt in row.items() if nxt} for row in delta]
+        self.out = [tuple(self.patterns[pid] for pid in pids) for pids in out]
+
+    def scan(self, text):
+        # Yields (end_index, pattern) for every occurrence, overlapping ones included.
+        delta = self.delta
+        out = self.out
+        folds = self.folds
+        state = 0
+        for i, ch in enumerate(text):
+            state = delta[state].get(folds.get(ch, ch), 0)
+            if out[state]:
+                for pattern in out[state]:
+                    yield i, pattern
+
+class Waf:
+    def __init__(self, patterns, max_length, folds=None, lower=False):
+        self.automaton = Automaton(patterns, folds)
+        self.max_length = max_length
+        # lower=True scans text.lower(), mirroring checks written as "x in s.lower()".
+        self.lower = lower
+
+    def too_long(self, text):
+        return len(text) > self.max_length
+
+    def hits(self, text):
+        return self.automaton.scan(text.lower() if self.lower else text)
+
+class KeywordWaf(Waf):
+    # Blocks if any of the literal tokens occurs.
+    def check(self, text):
+        if self.too_long(text):
+            return 'length'
+        for _, pattern in self.hits(text):
+            return pattern
+        return None
+
+class SequenceWaf(Waf):
+    # Blocks "<first>\s+<second>" (e.g. re.search(r'union\s+select', s, re.I)).
+    def __init__(self, first, second, max_length, folds=None):
+        super().__init__((first, second), max_length, folds)
+        self.first = first
+        self.second = second
+
+    def check(self, text):
+        if self.too_long(text):
+            return 'length'
+        first_end = -1
+        for end, pattern in self.hits(text):
+            if pattern == self.first:
+                first_end = end
+                continue
+            start = end - len(self.second) + 1
+            gap = start - 1
+            # Only whitespace may sit between the last <first> and this <second>;
+            # each character is walked back over at most once.
+            while gap > first_end and text[gap].isspace():
+                gap -= 1
+            if gap == first_end and first_end != -1 and start - first_end > 1:
+                return f'{self.first} {self.second}'
+            if gap != first_end:
+                # Something other than whitespace follows <first>: a later <second> cannot pair with it.
+                first_end = -1
+        return None
+
+class ScriptTagWaf(Waf):
+    # Output of re.sub(r'(?i)<script.*?>.*?</script>', '[BLOCKED]', s) followed by
+    # re.sub(r'(?i)<script', '[BLOCKED]', ...), computed from one scan.
+    def __init__(self, max_length):
+        super().__init__(('<script', '>', '</script>', '\n'), max_length, RE_FOLDS)
+
+    def sanitize(self, text):
+        if self.too_long(text):
+            return BLOCK_TEXT
+        opens, closes_gt, end_tags, newlines = [], [], [], []
+        lists = {'<script': opens, '>': closes_gt, '</script>': end_tags, '\n': newlines}
+        for end, pattern in self.hits(text):
+            lists[pattern].append(end - len(pattern) + 1)
+        newlines.append(len(text))
+        gt = tag = nl = 0
+        pos = 0
+        pieces = []
+        for start in opens:
+            if start < pos:
+                continue
+            # '.' does not cross a newline: both lazy groups must stay on this line.
+            while newlines[nl] < start + 7:
+                nl += 1
+            line_end = newlines[nl]
+            while gt < len(closes_gt) and closes_gt[gt] < start + 7:
+                gt += 1
+            matched = None
+            if gt < len(closes_gt) and closes_gt[gt] < line_end:
+                while tag < len(end_tags) and end_tags[tag] <= closes_gt[gt]:
+                    tag += 1
+                if tag < len(end_tags) and end_tags[tag] + 9 <= line_end:
+                    matched = end_tags[tag] + 9
+            pieces.append(text[pos:start])
+            pieces.append(BLOCK_TEXT)
+            # Unmatched openers are still caught by the second, plain '<script' pass.
+            pos = matched if matched is not None else start + 7
+        pieces.append(text[pos:])
+        return ''.join(pieces)
+
+# --- PER-LEVEL RULESETS ---
+SQLI_LEVEL7 = KeywordWaf((' ',), max_length=4096)
+SQLI_LEVEL9 = SequenceWaf('union', 'select', max_length=4096, folds=RE_FOLDS)
+XSS_LEVEL4 = ScriptTagWaf(max_length=8192)
+XSS_LEVEL8 = KeywordWaf(('<script', 'javascript:'), max_length=8192, lower=True)
@@ -0,0 +1,278 @@
+import html
+import re
+from urllib.parse import parse_qs, urlsplit
+
+from flask import g, request
+
+from dojo import metrics, scoreboard
+
+# --- BROWSERLESS XSS SOLVE VERIFIER ---
+# Decides whether a level's response lets injected input execute, without a
+# browser. The page is tokenized the way an HTML parser would see it (tags,
+# attributes, raw-text elements, comments) and every executable construct is
+# collected: inline scripts, event handler attributes, javascript: URLs, script
+# sources the page's CSP allows, and iframe srcdoc documents. A response
+# counts as solved when it has a construct the level's own baseline page (no
+# input) does not. Inline script bodies are compared by their JS token shape,
+# so a payload that stays inside its string literal does not count, while one
+# that breaks out (and still parses) does.
+
+RAW_TEXT = frozenset(('script', 'style', 'xmp', 'iframe', 'noembed', 'noframes', 'noscript', 'textarea', 'title', 'plaintext'))
+URL_ATTRS = frozenset(('href', 'src', 'action', 'formaction', 'data', 'xlink:href'))
+JS_TYPES = frozenset(('', 'text/javascript', 'application/javascript', 'module', 'text/ecmascript', 'application/ecmascript'))
+
+TAG_NAME = re.compile(r'[^\s/>]+')
+ATTR = re.compile(r'''[\s/]*(?:([^\s/>][^\s/>=]*)(?:\s*=\s*("[^"]*"?|'[^']*'?|[^\s>]*))?)?''')
+URL_JUNK = re.compile(r'[\x00-\x20]')
+
+def tokenize(doc):
+    # Yields ('start', tag, attrs) and ('raw', tag, text); text, end tags and comments are skipped.
+    pos = 0
+    end = len(doc)
+    while True:
+        lt = doc.find('<', pos)
+        if lt < 0 or lt + 1 >= end:
+            return
+        nxt = doc[lt + 1]
+        if doc.startswith('<!--', lt):
+            if doc.startswith('<!-->', lt):
+                pos = lt + 5
+            elif doc.startswith('<!--->', lt):
+                pos = lt + 6
+            else:
+                close = doc.find('-->', lt + 4)
+                if close < 0:
+                    return
+                pos = close + 3
+            continue
+        if nxt in '!?' or (nxt == '/' and not doc[lt + 2:lt + 3].isalpha()):
+            close = doc.find('>', lt)
+            if close < 0:
+                return
+            pos = close + 1
+            continue
+        closing = nxt == '/'
+        start = lt + 2 if closing else lt + 1
+        if not doc[start:start + 1].isascii() or not doc[start:start + 1].isalpha():
+            pos = lt + 1
+            continue
+        name = TAG_NAME.match(doc, start)
+        tag = name.group().lower()
+        pos, attrs = _attributes(doc, name.end())
+        if pos is None:
+            return
+        if closing:
+            continue
+        yield 'start', tag, attrs
+        if tag in RAW_TEXT:
+            if tag == 'plaintext':
+                yield 'raw', tag, doc[pos:]
+                return
+            close = re.compile(r'</%s[\s/>]' % re.escape(tag), re.I).search(doc, pos)
+            stop = close.start() if close else end
+            yield 'raw', tag, doc[pos:stop]
+            pos = stop
+
+def _attributes(doc, pos):
+    attrs = {}
+    while True:
+        m = ATTR.match(doc, pos)
+        if m.group(1) is None:
+            pos = m.end()
+            if pos >= len(doc):
+                return None, attrs
+            return pos + 1, attrs
+        name = m.group(1).lower()
+        value = m.group(2) or ''
+        if value[:1] in ('"', "'"):
+            if len(value) < 2 or value[-1] != value[0]:
+                # An unterminated quoted value runs to EOF: the tag never closes.
+                return None, attrs
+            value = value[1:-1]
+        attrs.setdefault(name, html.unescape(value))
+        pos = m.end()
+
+# --- JS token shape ---
+
+JS_TOKEN = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|/\*[\s\S]*?\*/)
+  | (?P<string>'(?:[^'\\\n]|\\[\s\S])*'|"(?:[^"\\\n]|\\[\s\S])*")
+  | (?P<template>`(?:[^`\\]|\\[\s\S])*`)
+  | (?P<number>(?:0[xXbBoO])?[0-9][0-9a-fA-F_]*(?:\.[0-9_]*)?(?:[eE][+-]?[0-9]+)?n?|\.[0-9]+)
+  | (?P<ident>[A-Za-z_$\u0080-\uffff][\w$\u0080-\uffff]*)
+  | (?P<punct>>>>=|\.\.\.|===|!==|\*\*=|<<=|>>=|>>>|\?\?=|&&=|\|\|=|=>|==|!=|<=|>=|&&|\|\||\?\?|\?\.|\+\+|--|[-+*/%&|^]=|<<|>>|\*\*|[{}()\[\];,.<>+\-*/%&|^!~?:=@#])
+''', re.X)
+REGEX_AFTER = frozenset(('(', ',', '=', ':', '[', '!', '&', '|', '?', '{', '}', ';', '+', '-', '*', '%', '<', '>', '~', '^',
+                         '==', '===', '!=', '!==', '&&', '||', '??', '=>', 'return', 'typeof', 'case', 'do', 'else', 'in', 'of',
+                         'new', 'delete', 'void', 'throw', 'yield', 'await', None))
+REGEX_LITERAL = re.compile(r'/(?![*/])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-z]*')
+PAIRS = {')': '(', ']': '[', '}': '{'}
+
+def js_shape(source):
+    # Token kinds with literal contents collapsed; None when the script would not parse.
+    shape = []
+    stack = []
+    pos = 0
+    prev = None
+    while pos < len(source):
+        if source[pos] == '/' and prev in REGEX_AFTER:
+            m = REGEX_LITERAL.match(source, pos)
+            if m:
+                shape.append('R')
+                prev = 'R'
+                pos = m.end()
+                continue
+        m = JS_TOKEN.match(source, pos)
+        if m is None:
+            return None
+        pos = m.end()
+        kind = m.lastgroup
+        if kind in ('ws', 'comment'):
+            continue
+        if kind == 'punct':
+            token = m.group()
+            if token in '([{':
+                stack.append(token)
+            elif token in PAIRS:
+                if not stack or stack.pop() != PAIRS[token]:
+                    return None
+        else:
+            token = {'string': 'S', 'template': 'T', 'number': 'N'}.get(kind, m.group())
+        shape.append(token)
+        prev = token
+    return tuple(shape) if not stack else None
+
+# --- Content-Security-Policy ---
+
+class Policy:
+    __slots__ = ('inline', 'sources')
+
+    def __init__(self, header=''):
+        # sources None: any script URL may load; otherwise only same-origin ('self') ones.
+        self.inline = True
+        self.sources = None
+        for value in filter(None, (header,)):
+            self.add(value)
+
+    def add(self, value):
+        directives = {}
+        for part in value.split(';'):
+            words = part.split()
+            if words:
+                directives[words[0].lower()] = [w.lower() for w in words[1:]]
+        sources = directives.get('script-src', directives.get('default-src'))
+        if sources is None:
+            return
+        if "'unsafe-inline'" not in sources:
+            self.inline = False
+        if '*' not in sources:
+            self.sources = 'self'
+
+def same_origin(url):
+    parts = urlsplit(url)
+    return not parts.scheme and not parts.netloc
+
+# --- Executable constructs ---
+
+def features(doc, policy=None, gadgets=()):
+    policy = policy or Policy()
+    tokens = list(tokenize(doc))
+    for kind, tag, attrs in tokens:
+        if kind == 'start' and tag == 'meta' and attrs.get('http-equiv', '').lower() == 'content-security-policy':
+            policy.add(attrs.get('content', ''))
+    found = set()
+    script_attrs = None
+    for kind, tag, data in tokens:
+        if kind == 'raw':
+            if tag == 'script' and script_attrs is not None and 'src' not in script_attrs and policy.inline:
+                shape = js_shape(data)
+                if shape:
+                    found.add(('script', shape))
+            continue
+        attrs = data
+        script_attrs = attrs if tag == 'script' else None
+        if tag == 'script' and attrs.get('type', '').strip().lower() not in JS_TYPES:
+            script_attrs = None
+            continue
+        for name, value in attrs.items():
+            if name.startswith('on') and len(name) > 2 and value.strip() and policy.inline:
+                found.add(('handler', tag, name, value.strip()))
+            elif name in URL_ATTRS and URL_JUNK.sub('', value).lower().startswith('javascript:') and policy.inline:
+                found.add(('js-url', tag, name, URL_JUNK.sub('', value)))
+        if tag == 'script' and attrs.get('src', '').strip():
+            src = attrs['src'].strip()
+            if policy.sources is None:
+                found.add(('script-src', src))
+            elif same_origin(src):
+                # Same-origin URLs only execute when they return JS: the JSONP gadgets.
+                parts = urlsplit(src)
+                if any(parts.path.endswith(gadget) for gadget in gadgets):
+                    found.add(('script-src', parts.path, tuple(parse_qs(parts.query).get('callback', ['init']))))
+        if tag == 'iframe' and 'srcdoc' in attrs:
+            found.update(('srcdoc',) + f for f in features(attrs['srcdoc'], policy, gadgets))
+    return found
+
+class Verdict:
+    __slots__ = ('solved', 'reasons')
+
+    def __init__(self, reasons):
+        self.reasons = sorted(reasons, key=repr)
+        self.solved = bool(self.reasons)
+
+    def __bool__(self):
+        return self.solved
+
+class SolveVerifier:
+    # levels: endpoint -> name of the request argument carrying the payload
+    # (None: always check, e.g. stored comments; '' : any query string).
+    def __init__(self, levels, gadgets=()):
+        self.levels = levels
+        self.gadgets = gadgets
+        self.checked = 0
+        self.solved = 0
+        self._baselines = {}
+
+    def verify(self, doc, baseline, csp=''):
+        self.checked += 1
+        verdict = Verdict(features(doc, Policy(csp), self.gadgets) - baseline)
+        if verdict:
+            self.solved += 1
+        return verdict
+
+    def baseline(self, app, endpoint):
+        key = (endpoint, request.script_root)
+        found = self._baselines.get(key)
+        if found is None:
+            # The level as an untouched visitor sees it: no payload, a fresh session.
+            # Its own app context, so the outer request's g (session id, timings) is untouched.
+            with app.app_context(), app.test_request_context(request.path, base_url=request.url_root):
+                g._dojo_baseline = True
+                response = app.full_dispatch_request()
+                found = self._baselines[key] = features(response.get_data(as_text=True),
+                                                        Policy(response.headers.get('Content-Security-Policy', '')), self.gadgets)
+        return found
+
+    def has_input(self, endpoint):
+        arg = self.levels[endpoint]
+        if arg is None:
+            return True
+        if arg == '':
+            return bool(request.query_string)
+        return arg in request.args
+
+    def init_app(self, app):
+        @app.after_request
+        def verify_solve(response):
+            endpoint = request.endpoint
+            if (endpoint not in self.levels or g.get('_dojo_baseline') or response.status_code != 200
+                    or response.mimetype != 'text/html' or response.is_streamed or not self.has_input(endpoint)):
+                return response
+            verdict = self.verify(response.get_data(as_text=True), self.baseline(app, endpoint),
+                                  response.headers.get('Content-Security-Policy', ''))
+            g.xss_verdict = verdict
+            scoreboard.attempt(bool(verdict))
+            if verdict:
+                response.headers['X-Dojo-Solved'] = endpoint
+                metrics.current().inc('dojo_xss_solves_total', (('level', endpoint),))
+            return response
@@ -1,26 +1,125 @@
+import os
 import sqlite3
+import sys
 import time
-from flask import Flask, request, render_template_string, redirect, url_for, g
-import re
+from flask import Flask, Response, request, redirect, url_for, g, stream_with_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dojo import assets, capture, compress, dataset, journal, layout, metrics, profiler, scoreboard, session, timing, waf
+from dojo.admission import AdmissionControl
+from dojo.delay import DelayLedger
+from dojo.governor import Budget, QueryGovernor
+from dojo.journal import QueryJournal, journaling_connection
+from dojo.ratelimit import Limit, RateLimiter, level_limits
+from dojo.sandbox import SandboxPool
+from dojo.snapshot import Snapshot
+from dojo.streaming import ClosingStream, RowStream, buffered
+from dojo.templates import TemplateRegistry
 
 app = Flask(__name__)
+capture.init_app(app)
+compress.init_app(app)
+session.init_app(app)
+assets.init_app(app)
+layout.init_app(app, 'sqli')
+journal.init_app(app)
+timing.init_app(app)
+stats = metrics.init_app(app, 'sqli')
+scoreboard.init_app(app, 'sqli')
+profiler.init_app(app, 'sqli')
+templates = TemplateRegistry(app)
 
 # --- DATABASE CONFIG ---
-DATABASE = ':memory:'
+# Each trainee works on a private clone of the seed database (see dojo/sandbox.py).
+SANDBOX_MAX = int(os.environ.get('SQLI_SANDBOX_MAX', 512))
+SANDBOX_IDLE_TIMEOUT = int(os.environ.get('SQLI_SANDBOX_IDLE_TIMEOUT', 1800))
+SANDBOX_MAX_BYTES = int(os.environ.get('SQLI_SANDBOX_MAX_BYTES', 256 * 1024 * 1024))
+# Set by dojo/serve.py: sandboxes become files on tmpfs shared by all worker processes.
+SANDBOX_DIR = os.environ.get('SQLI_SANDBOX_DIR') or None
+SANDBOX_MMAP_SIZE = int(os.environ.get('SQLI_SANDBOX_MMAP_SIZE', 64 * 1024 * 1024))
+
+# Optional large synthetic dataset on top of the hand-written seed (see dojo/dataset.py).
+# The generated image is cached in SEED_CACHE and only read back on later startups.
+DATASET_PRODUCTS = int(os.environ.get('SQLI_DATASET_PRODUCTS', 0))
+DATASET_USERS = int(os.environ.get('SQLI_DATASET_USERS', 0))
+DATASET_SEED = int(os.environ.get('SQLI_DATASET_SEED', 1337))
+SEED_CACHE = os.environ.get('SQLI_SEED_CACHE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seed'))
+
+# UNION-heavy levels stream their rows and stop after this many (see dojo/streaming.py).
+ROW_CAP = int(os.environ.get('SQLI_ROW_CAP', 1000))
+
+# Every executed injection query is journaled per trainee (see dojo/journal.py).
+JOURNAL_PATH = os.environ.get('SQLI_JOURNAL', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'journal', 'queries.jsonl'))
+queries = QueryJournal(JOURNAL_PATH)
+
+# 'deferred': sleep() only books the delay; the response thread waits it out once the sandbox is released (see dojo/delay.py).
+# 'blocking': sleep() really sleeps inside cur.execute().
+SLEEP_MODE = os.environ.get('SQLI_SLEEP_MODE', 'deferred')
+# Level 6 is solved once sleep() injected at least this much into one statement.
+LEVEL6_DELAY = 2.0
+MAX_OUTSTANDING_DELAY = float(os.environ.get('SQLI_MAX_OUTSTANDING_DELAY', 30))
+
+delays = DelayLedger(MAX_OUTSTANDING_DELAY)
+
+def sql_sleep(s):
+    # g.sleep_seconds sums the delay injected through this UDF: booked in deferred mode,
+    # measured on the monotonic clock in blocking mode. Level 6 judges on it, not on wall time.
+    seconds = float(s)
+    if SLEEP_MODE == 'deferred':
+        granted = delays.grant(session.current_sid(), seconds)
+        g.deferred_delay = g.get('deferred_delay', 0.0) + granted
+    else:
+        start = time.monotonic()
+        time.sleep(seconds)
+        granted = time.monotonic() - start
+    g.sleep_seconds = g.get('sleep_seconds', 0.0) + granted
+    # FIX: Sleep function now returns 1 (True) after sleeping.
+    # Old: lambda s: time.sleep(float(s)) -> Returns None -> Query becomes False -> No results shown.
+    return 1
+
+# Per-statement budgets for injected SQL (see dojo/governor.py). Level 6 gets room for its intended delay.
+DEFAULT_BUDGET = Budget(instructions=10_000_000, seconds=2.0, max_length=1_000_000)
+LEVEL_BUDGETS = {
+    'level6': Budget(instructions=10_000_000, seconds=MAX_OUTSTANDING_DELAY + 2, max_length=1_000_000),
+}
+governor = QueryGovernor(DEFAULT_BUDGET, LEVEL_BUDGETS)
+
+# Per-client request rates for scanners (see dojo/ratelimit.py); 0 disables. Every
+# Level 6 request can hold a worker for its sleep(), so its bucket is tighter.
+RATE_LIMIT = float(os.environ.get('SQLI_RATE_LIMIT', 10))
+RATE_BURST = int(os.environ.get('SQLI_RATE_BURST', 30))
+limiter = RateLimiter(level_limits(RATE_LIMIT, RATE_BURST, {'level6': Limit(RATE_LIMIT / 5, max(1, RATE_BURST // 3))}))
+limiter.init_app(app)
+stats.gauge('dojo_rate_limit_buckets', lambda: len(limiter), 'Client token buckets held by this worker.')
+
+# Bulkheads per level class (see dojo/admission.py): concurrent requests per worker,
+# 0 for unbounded. Blind levels are scripted and sleep; the UNION and stacked-query
+# levels run the biggest statements; the rest stay unbounded and never queue behind them.
+SLOW_CONCURRENCY = int(os.environ.get('SQLI_SLOW_CONCURRENCY', 8))
+HEAVY_CONCURRENCY = int(os.environ.get('SQLI_HEAVY_CONCURRENCY', 2))
+FAST_CONCURRENCY = int(os.environ.get('SQLI_FAST_CONCURRENCY', 0))
+QUEUE_PER_SLOT = int(os.environ.get('SQLI_QUEUE_PER_SLOT', 4))
+QUEUE_WAIT = float(os.environ.get('SQLI_QUEUE_WAIT', 5))
+admission = AdmissionControl({
+    'slow': (SLOW_CONCURRENCY, ('level5', 'level6')),
+    'heavy': (HEAVY_CONCURRENCY, ('level2', 'level3', 'level7', 'level9', 'level10', 'reset')),
+    'fast': (FAST_CONCURRENCY, ('level1', 'level4', 'level8')),
+}, QUEUE_PER_SLOT, QUEUE_WAIT)
+admission.init_app(app)
+stats.gauge('dojo_admission_active', admission.active, 'Requests holding a bulkhead slot in this worker.')
+stats.gauge('dojo_admission_queued', admission.queued, 'Requests waiting for a bulkhead slot in this worker.')
+
+def prepare_connection(db):
+    db.create_function("sleep", 1, sql_sleep)
+    db.row_factory = sqlite3.Row
+    governor.install(db)
 
 def get_db():
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(DATABASE, check_same_thread=False)
-        # FIX: Sleep function now returns 1 (True) after sleeping.
-        # Old: lambda s: time.sleep(float(s)) -> Returns None -> Query becomes False -> No results shown.
-        db.create_function("sleep", 1, lambda s: (time.sleep(float(s)) is None) and 1)
-        try:
-            cur = db.cursor()
-            cur.execute("SELECT count(*) FROM users")
-        except:
-            init_db(db)
-    db.row_factory = sqlite3.Row
+        g._sandbox = sandboxes.checkout(session.current_sid())
+        db = g._database = g._sandbox.conn
+        governor.apply(db, request.endpoint)
     return db
 
 def init_db(db):
@@ -42,62 +141,52 @@ def init_db(db):
     
     db.commit()
 
+if DATASET_PRODUCTS or DATASET_USERS:
+    seed = dataset.snapshot(init_db, DATASET_PRODUCTS, DATASET_USERS, DATASET_SEED, SEED_CACHE)
+else:
+    seed = Snapshot.build(init_db)
+sandboxes = SandboxPool(seed, setup=prepare_connection, factory=journaling_connection(queries), max_sandboxes=SANDBOX_MAX,
+                        idle_timeout=SANDBOX_IDLE_TIMEOUT, max_bytes=SANDBOX_MAX_BYTES, directory=SANDBOX_DIR, mmap_size=SANDBOX_MMAP_SIZE)
+stats.gauge('dojo_sandboxes_active', lambda: len(sandboxes), 'Trainee sandboxes currently pooled.')
+stats.gauge('dojo_sandbox_bytes', lambda: sandboxes.total_bytes, 'Estimated memory held by sandboxes pooled in this worker.')
+stats.gauge('dojo_journal_dropped', lambda: queries.dropped, 'Query journal entries dropped under overload.')
+
+@app.teardown_request
+def release_deferred_delay(exception):
+    # The stream ended before the delay was paid (view error, client gone): give the budget back.
+    delay = g.pop('deferred_delay', 0.0)
+    if delay:
+        delays.release(session.current_sid(), delay)
+
 @app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, '_database', None)
-    if db is not None:
-        db.close()
+    box = getattr(g, '_sandbox', None)
+    if box is not None:
+        sandboxes.checkin(box)
 
 # --- THEME & TEMPLATES ---
 base_layout = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>SQLi DOJO | Cyber Lab</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-    <link href="https://fonts.googleapis.com/css2?family=Rajdhani:wght@400;600;700&family=Source+Code+Pro:wght@400;700&display=swap" rel="stylesheet">
-    <style>
-        body { font-family: 'Rajdhani', sans-serif; background-color: #020617; color: #fbbf24; background-image: linear-gradient(rgba(245, 158, 11, 0.1) 1px, transparent 1px), linear-gradient(90deg, rgba(245, 158, 11, 0.1) 1px, transparent 1px); background-size: 40px 40px; }
-        .mono-font { font-family: 'Source Code Pro', monospace; }
-        .holo-text { text-shadow: 0 0 5px #f59e0b, 0 0 10px #f59e0b; }
-        .holo-box { background: rgba(69, 26, 3, 0.6); border: 1px solid #f59e0b; box-shadow: 0 0 15px rgba(245, 158, 11, 0.2), inset 0 0 20px rgba(245, 158, 11, 0.1); backdrop-filter: blur(4px); }
-        input, textarea, select { background-color: #0f172a; color: #fcd34d; border: 1px solid #92400e; font-family: 'Source Code Pro', monospace; }
-        input:focus { outline: none; border-color: #f59e0b; box-shadow: 0 0 10px #f59e0b; }
-        ::-webkit-scrollbar { width: 8px; }
-        ::-webkit-scrollbar-thumb { background: #b45309; border-radius: 4px; }
-    </style>
-</head>
-<body class="min-h-screen flex flex-col overflow-x-hidden">
+{% extends dojo_layout %}
+{% block title %}SQLi DOJO | Cyber Lab{% endblock %}
+{% block nav %}
     <nav class="bg-slate-950/90 border-b border-amber-800 p-4 sticky top-0 z-50 backdrop-blur-md">
         <div class="container mx-auto flex justify-between items-center">
-            <a href="/" class="text-3xl font-bold holo-text tracking-widest">[SQLi_DOJO]</a>
-            <a href="/reset" class="text-red-400 border border-red-900/50 bg-red-900/20 px-4 py-1 rounded hover:shadow-[0_0_10px_rgba(248,113,113,0.5)]">// RESET_DB</a>
+            <a href="{{ request.script_root }}/" class="text-3xl font-bold holo-text tracking-widest">[SQLi_DOJO]</a>
+            <a href="{{ request.script_root }}/reset" class="text-red-400 border border-red-900/50 bg-red-900/20 px-4 py-1 rounded hover:shadow-[0_0_10px_rgba(248,113,113,0.5)]">// RESET_DB</a>
         </div>
     </nav>
-    <div class="container mx-auto flex-grow flex flex-col md:flex-row mt-8 gap-6 px-4 mb-10">
-        <aside class="md:w-72 flex-shrink-0">
-            <div class="holo-box p-5 rounded-lg h-full">
-                <h3 class="text-amber-300 uppercase text-sm font-bold mb-4 border-b border-amber-800 pb-2">Modules</h3>
-                <div class="space-y-1">
-                {% for i in range(1, 11) %}
-                <a href="/level{{i}}" class="block px-3 py-2 text-sm rounded transition-all duration-200 mono-font {{ 'bg-amber-900/50 text-white border-l-4 border-amber-500' if active_level == i else 'text-slate-400 hover:text-amber-200 hover:bg-amber-900/20' }}">
-                    Level {{ '%02d' % i }} :: {{ titles[i-1] }}
-                </a>
-                {% endfor %}
-                </div>
-            </div>
-        </aside>
-        <main class="flex-1 relative">
-            <div class="mb-6">
+{% endblock %}
+{% block modules_heading %}<h3 class="text-amber-300 uppercase text-sm font-bold mb-4 border-b border-amber-800 pb-2">Modules</h3>{% endblock %}
+{% block level_link %}{{ 'bg-amber-900/50 text-white border-l-4 border-amber-500' if active_level == i else 'text-slate-400 hover:text-amber-200 hover:bg-amber-900/20' }}{% endblock %}
+{% block heading %}
                 <h1 class="text-5xl font-bold text-white drop-shadow-[0_0_5px_rgba(255,255,255,0.5)]">{{ current_title }}</h1>
                 <p class="text-slate-300 mono-font border-l-2 border-amber-600 pl-4 py-1 mt-4 bg-gradient-to-r from-amber-900/20 to-transparent">
                     <span class="text-amber-500 font-bold">Briefing:</span> {{ description }}
                 </p>
-            </div>
+{% endblock %}
+{% block panel %}
             <div class="holo-box p-8 min-h-[400px] relative rounded-lg overflow-hidden flex flex-col">
-                {{ content | safe }}
+                {% if content is string %}{{ content | safe }}{% else %}{% for chunk in content %}{{ chunk | safe }}{% endfor %}{% endif %}
                 {% if query_log %}
                 <div class="mt-auto pt-6 border-t border-amber-900/50">
                     <div class="text-xs text-slate-500 font-mono mb-1">EXECUTED QUERY LOG:</div>
@@ -105,10 +194,7 @@ base_layout = """
                 </div>
                 {% endif %}
             </div>
-        </main>
-    </div>
-</body>
-</html>
+{% endblock %}
 """
 
 titles = [
@@ -117,38 +203,101 @@ titles = [
     "WAF Bypass", "Stacked Queries"
 ]
 
-def render_page(level_id, description, content, query_log=None, **kwargs):
-    return render_template_string(base_layout, active_level=level_id, titles=titles, current_title=titles[level_id-1], description=description, content=render_template_string(content, **kwargs), query_log=query_log)
+def render_page(level_id, description, content, query_log=None, deferred=None, **kwargs):
+    # Every level page hands out the session id (before any streaming: the cookie must go
+    # with the headers), so the trainee's first payload is already scored (see dojo/scoreboard.py).
+    session.current_sid()
+    if deferred is not None:
+        # Early flush: the layout head, sidebar and objective are sent before deferred()
+        # runs the level's SQL; the panel follows once it returns its template variables.
+        # Rows are fetched lazily while the panel is sent, so the sandbox and its journal
+        # entries are released once the panel is out (or when the stream closes), not at teardown.
+        held = [g.pop('_sandbox', None), g.pop('_journal_cursors', [])]
+        metrics.defer_sql()
+        body = deferred_content(templates.get(content), deferred, kwargs, held)
+        page = templates.stream(base_layout, active_level=level_id, titles=titles, current_title=titles[level_id-1], description=description, content=body, query_log=query_log)
+        return Response(ClosingStream(stream_with_context(stream_body(page, held)), lambda: release_stream(held)), mimetype='text/html')
+    return templates.render(base_layout, active_level=level_id, titles=titles, current_title=titles[level_id-1], description=description, content=templates.render(content, **kwargs), query_log=query_log)
+
+def deferred_content(template, deferred, kwargs, held):
+    # Runs when the layout reaches the panel; everything before it has been flushed.
+    kwargs.update(deferred())
+    if request.values:
+        scoreboard.attempt()
+    box = g.pop('_sandbox', None)
+    if box is not None:
+        held[0] = box
+    held[1].extend(g.pop('_journal_cursors', []))
+    yield from template.generate(**kwargs)
+
+def stream_body(page, held):
+    yield from buffered(timing.stream(page, 'render'), flush_after=layout.PANEL_OPEN)
+    metrics.record_sql()
+    # The panel is out: the sandbox and the bulkhead slot go back before the sleep() calls
+    # evaluated while rows were streamed are paid, so other requests do not wait on them.
+    release_stream(held)
+    admission.vacate()
+    delay = g.pop('deferred_delay', 0.0)
+    if delay:
+        delays.pay(session.current_sid(), delay)
+
+def has_flag(row):
+    # Success signal for the extraction levels: a row carrying the secrets flag was sent.
+    if any('FLAG{' in str(value) for value in row):
+        scoreboard.solve()
+
+def release_stream(held):
+    # Called at the end of the stream and again when it is closed; only the first call releases.
+    box, cursors = held
+    held[:] = [None, []]
+    journal.finish(cursors)
+    if box is not None:
+        sandboxes.checkin(box)
+
+templates.preload(base_layout)
 
 @app.route('/')
-def index(): return redirect('/level1')
+def index(): return redirect(url_for('level1'))
+
+# Tables each level's queries read or write; /reset?level=N only restores these.
+LEVEL_TABLES = {
+    1: ('users',), 2: ('products',), 3: ('products', 'secrets'), 4: ('users',), 5: ('users',),
+    6: ('products',), 7: ('products', 'secrets'), 8: ('users',), 9: ('products', 'secrets'), 10: ('users',),
+}
 
 @app.route('/reset')
 def reset():
+    # Only the caller's sandbox is restored, straight from the seed snapshot.
     db = get_db()
-    c = db.cursor()
-    c.executescript("DROP TABLE IF EXISTS users; DROP TABLE IF EXISTS products; DROP TABLE IF EXISTS secrets;")
-    init_db(db)
-    return redirect('/')
+    level = request.args.get('level', type=int)
+    if level in LEVEL_TABLES:
+        seed.restore_tables(db, LEVEL_TABLES[level])
+        return redirect(url_for(f'level{level}'))
+    seed.restore(db)
+    return redirect(url_for('index'))
 
 # --- LEVELS ---
 
 @app.route('/level1', methods=['GET', 'POST'])
 def level1():
     query_log = None
-    msg = ""
+    run_query = None
     if request.method == 'POST':
         username = request.form.get('username', '')
         password = request.form.get('password', '')
         # VULN: String concat
         sql = f"SELECT * FROM users WHERE username = '{username}' AND password = '{password}'"
         query_log = sql
-        try:
-            cur = get_db().cursor()
-            cur.execute(sql)
-            if cur.fetchone(): msg = "<div class='text-green-400 text-2xl font-bold'>ACCESS GRANTED</div>"
-            else: msg = "<div class='text-red-500 font-bold'>ACCESS DENIED</div>"
-        except Exception as e: msg = f"<div class='text-red-500'>SQL ERROR: {e}</div>"
+        def run_query():
+            try:
+                cur = get_db().cursor()
+                cur.execute(sql)
+                if cur.fetchone():
+                    scoreboard.solve()
+                    msg = "<div class='text-green-400 text-2xl font-bold'>ACCESS GRANTED</div>"
+                else: msg = "<div class='text-red-500 font-bold'>ACCESS DENIED</div>"
+            except Exception as e: msg = f"<div class='text-red-500'>SQL ERROR: {e}</div>"
+            return {'msg': msg}
 
     content = """
     <form method="POST" class="max-w-md mx-auto mt-10">
@@ -160,62 +309,72 @@ def level1():
     </form>
     <div class="mt-8 text-center">{{ msg|safe }}</div>
     """
-    return render_page(1, "Objective: Login as Admin without password. (String Injection)", content, query_log, msg=msg)
+    return render_page(1, "Objective: Login as Admin without password. (String Injection)", content, query_log, deferred=run_query, msg="")
 
 @app.route('/level2')
 def level2():
     id_param = request.args.get('id', '1')
     sql = f"SELECT name, price FROM products WHERE id = {id_param}"
-    try:
-        cur = get_db().cursor()
-        cur.execute(sql)
-        items = cur.fetchall()
-    except: items = []
+    def run_query():
+        try:
+            cur = get_db().cursor()
+            cur.execute(sql)
+            # Solved once the page lists more than the one product an id selects.
+            items = RowStream(cur, ROW_CAP, on_row=lambda row: items.count > 1 and scoreboard.solve())
+        except: items = []
+        return {'items': items}
     content = """
     <div class="text-center mb-6">
         <form method="GET" class="inline-flex shadow-lg"><span class="p-2 border border-amber-800 bg-amber-900/50">ID:</span><input name="id" value="{{ id_param }}" class="w-24 p-2 text-center bg-slate-900 border-amber-800"><button class="bg-amber-700 px-4 py-2 text-black font-bold">GO</button></form>
     </div>
     <div class="grid grid-cols-2 gap-4">{% for item in items %}<div class="border border-amber-800 p-4"><h3 class="font-bold text-white">{{ item['name'] }}</h3><div class="text-amber-500">{{ item['price'] }} $</div></div>{% endfor %}</div>
+    {% if items.truncated %}<div class="p-2 text-slate-500 italic">... truncated after {{ items.count }} rows</div>{% endif %}
     """
-    return render_page(2, "Objective: Display all products. (Integer Injection)", content, sql, items=items, id_param=id_param)
+    return render_page(2, "Objective: Display all products. (Integer Injection)", content, sql, deferred=run_query, id_param=id_param)
 
 @app.route('/level3')
 def level3():
     search = request.args.get('search', '')
-    results = []
+    run_query = None
     # VULN: UNION Injection
     sql = f"SELECT name, description, price FROM products WHERE name LIKE '%{search}%'"
     if search:
-        try:
-            cur = get_db().cursor()
-            cur.execute(sql)
-            results = cur.fetchall()
-        except Exception as e: results = [("SQL Error", str(e), 0)]
+        def run_query():
+            try:
+                cur = get_db().cursor()
+                cur.execute(sql)
+                results = RowStream(cur, ROW_CAP, on_error=lambda e: [("SQL Error", str(e), 0)], on_row=has_flag)
+            except Exception as e: results = [("SQL Error", str(e), 0)]
+            return {'results': results}
     content = """
     <form method="GET" class="flex gap-2 mb-8"><input type="text" name="search" value="{{ search }}" class="flex-1 p-3 bg-slate-900" placeholder="Search..."><button class="bg-amber-600 px-6 font-bold text-black">SCAN</button></form>
     <div class="space-y-2">{% for r in results %}<div class="p-2 border-l-2 border-amber-500 bg-slate-900/50">{{ r[0] }} :: {{ r[1] }}</div>{% endfor %}</div>
+    {% if results.truncated %}<div class="p-2 text-slate-500 italic">... truncated after {{ results.count }} rows</div>{% endif %}
         """
-    return render_page(3, "Objective: Extract Flag from 'secrets' table using UNION.", content, sql, results=results, search=search)
+    return render_page(3, "Objective: Extract Flag from 'secrets' table using UNION.", content, sql, deferred=run_query, results=[], search=search)
 
 @app.route('/level4')
 def level4():
     # FIX: Use string context to easily trigger syntax errors
     id_param = request.args.get('uuid', 'user-001')
-    error_msg = None
-    success_signal = False
     
     # Query search by string
     sql = f"SELECT * FROM users WHERE username = '{id_param}'" 
     
-    try:
-        cur = get_db().cursor()
-        cur.execute(sql)
-        cur.fetchall()
-    except Exception as e:
-        error_msg = str(e)
-        # If there's a SQL syntax error, consider exploitation successful
-        if "unrecognized token" in error_msg or "syntax" in error_msg.lower() or "unterminated" in error_msg.lower():
-            success_signal = True
+    def run_query():
+        error_msg = None
+        success_signal = False
+        try:
+            cur = get_db().cursor()
+            cur.execute(sql)
+            cur.fetchall()
+        except Exception as e:
+            error_msg = str(e)
+            # If there's a SQL syntax error, consider exploitation successful
+            if "unrecognized token" in error_msg or "syntax" in error_msg.lower() or "unterminated" in error_msg.lower():
+                success_signal = True
+                scoreboard.solve()
+        return {'error_msg': error_msg, 'success_signal': success_signal}
 
     content = """
     <div class="text-center max-w-lg mx-auto">
@@ -239,7 +398,7 @@ def level4():
         {% endif %}
     </div>
     """
-    return render_page(4, "Objective: Trigger database syntax errors.", content, sql, id_param=id_param, error_msg=error_msg, success_signal=success_signal)
+    return render_page(4, "Objective: Trigger database syntax errors.", content, sql, deferred=run_query, id_param=id_param)
 
 @app.route('/level5')
 def level5():
@@ -247,19 +406,25 @@ def level5():
     
     # FIX: Block direct 'admin' input at Python code level
     # Force user to use injection like: admin' AND 1=1-- 
+    run_query = None
     if username.strip() == 'admin':
         status = "<span class='text-red-500 font-bold'>[ DIRECT ACCESS BLOCKED BY IPS ]</span>"
         sql = "BLOCKED: Direct 'admin' string not allowed."
     else:
+        status = ""
         sql = f"SELECT * FROM users WHERE username = '{username}'"
-        exists = False
-        try:
-            cur = get_db().cursor()
-            cur.execute(sql)
-            if cur.fetchone(): exists = True
-        except: pass
-        
-        status = "<span class='text-green-400 font-bold'>[ USER FOUND ]</span>" if exists else "<span class='text-slate-500'>[ NOT FOUND ]</span>"
+        def run_query():
+            exists = False
+            try:
+                cur = get_db().cursor()
+                cur.execute(sql)
+                row = cur.fetchone()
+                if row:
+                    exists = True
+                    if row['username'] == 'admin': scoreboard.solve()
+            except: pass
+            
+            return {'status': "<span class='text-green-400 font-bold'>[ USER FOUND ]</span>" if exists else "<span class='text-slate-500'>[ NOT FOUND ]</span>"}
 
     content = """
     <div class="text-center mt-10 max-w-lg mx-auto">
@@ -273,30 +438,41 @@ def level5():
         </div>
     </div>
     """
-    return render_page(5, "Objective: Bypass simple filter and confirm 'admin' user exists (Blind).", content, sql, username=username, status=status)
+    return render_page(5, "Objective: Bypass simple filter and confirm 'admin' user exists (Blind).", content, sql, deferred=run_query, username=username, status=status)
 
 @app.route('/level6')
 def level6():
     search = request.args.get('q', '')
-    start_time = time.time()
-    results = []
-    
-    # Logic: Empty search doesn't query to save resources
-    # Only query when there's search (or payload)
-    if search:
-        # VULN: Time Based Blind
-        sql = f"SELECT * FROM products WHERE name = '{search}'"
-        try:
-            cur = get_db().cursor()
-            cur.execute(sql)
-            results = cur.fetchall()
-        except: pass
     
-    duration = time.time() - start_time
-    # Only show time if query takes more than 0.1s (abnormal delay or user testing)
-    msg = f"{duration:.2f}s" if duration > 0.1 else "0.00s"
-    
-    status_class = "text-green-500 font-bold border-green-500" if duration > 2 else "text-slate-600 border-slate-800"
+    def run_query():
+        # The statement's delay is what sleep() injected (see sql_sleep), counted from zero here.
+        g.sleep_seconds = 0.0
+        start_time = time.monotonic()
+        results = []
+        
+        # Logic: Empty search doesn't query to save resources
+        # Only query when there's search (or payload)
+        if search:
+            # VULN: Time Based Blind
+            sql = f"SELECT * FROM products WHERE name = '{search}'"
+            try:
+                cur = get_db().cursor()
+                cur.execute(sql)
+                results = cur.fetchall()
+            except: pass
+        
+        injected = g.pop('sleep_seconds', 0.0)
+        # Sandbox checkout, query execution and waiting for the CPU: reported, never judged,
+        # so a loaded box neither fakes a delay nor hides one.
+        elapsed = time.monotonic() - start_time
+        overhead = max(0.0, elapsed - injected) if SLEEP_MODE == 'blocking' else elapsed
+        # Only show time if the delay is noticeable (abnormal delay or user testing)
+        msg = f"{injected:.2f}s" if injected > 0.1 else "0.00s"
+        
+        solved = injected >= LEVEL6_DELAY
+        status_class = "text-green-500 font-bold border-green-500" if solved else "text-slate-600 border-slate-800"
+        if solved: scoreboard.solve()
+        return {'msg': msg, 'status_class': status_class, 'solved': solved, 'overhead_ms': overhead * 1000}
 
     content = """
     <div class="text-center max-w-xl mx-auto">
@@ -307,41 +483,50 @@ def level6():
         </form>
         
         <div class="mt-8 flex flex-col items-center justify-center">
-            <div class="text-xs text-slate-500 uppercase tracking-widest mb-2">Response Time</div>
+            <div class="text-xs text-slate-500 uppercase tracking-widest mb-2">Injected Delay</div>
             <div class="p-4 border-2 {{ status_class }} bg-black font-mono text-3xl min-w-[150px] transition-all duration-300">
                 {{ msg }}
             </div>
-            {% if duration > 2 %}
+            <div class="mt-2 text-xs text-slate-500 font-mono">+ {{ '%.1f'|format(overhead_ms) }} ms query overhead (not counted)</div>
+            {% if solved %}
             <div class="mt-4 text-green-400 font-mono text-sm animate-pulse">[!] TIMING ATTACK DETECTED [!]</div>
             {% endif %}
         </div>
     </div>
     """
-    return render_page(6, "Objective: Make database sleep for 3 seconds.", content, "HIDDEN (Blind)", search=search, msg=msg, status_class=status_class, duration=duration)
+    return render_page(6, "Objective: Make database sleep for 3 seconds.", content, "HIDDEN (Blind)", deferred=run_query, search=search)
 
 @app.route('/level7')
 def level7():
     id_param = request.args.get('id', '1')
     item = None
     error = None
+    run_query = None
     
-    # FILTER: Block space characters
-    if ' ' in id_param:
-        error = "WAF ERROR: Malicious input detected (Space character)."
+    # FILTER: Block space characters (same as: ' ' in id_param)
+    blocked = waf.SQLI_LEVEL7.check(id_param)
+    if blocked:
+        error = "WAF ERROR: Input too long." if blocked == 'length' else "WAF ERROR: Malicious input detected (Space character)."
         sql = "BLOCKED"
+        metrics.waf_block('level7')
     else:
         # Query to get products
         # Products table structure: id, name, price, description
         sql = f"SELECT name, price, description FROM products WHERE id = {id_param}"
-        try:
-            cur = get_db().cursor()
-            cur.execute(sql)
-            row = cur.fetchone()
-            if row:
-                # Convert row to dict for easier display
-                item = dict(row)
-        except Exception as e: 
-            error = f"SQL Error: {str(e)}"
+        def run_query():
+            item = None
+            error = None
+            try:
+                cur = get_db().cursor()
+                cur.execute(sql)
+                row = cur.fetchone()
+                if row:
+                    # Convert row to dict for easier display
+                    item = dict(row)
+                    if 'FLAG' in str(item['name']) or 'FLAG' in str(item['description']): scoreboard.solve()
+            except Exception as e: 
+                error = f"SQL Error: {str(e)}"
+            return {'item': item, 'error': error}
 
     content = """
     <div class="max-w-2xl mx-auto">
@@ -380,7 +565,7 @@ def level7():
         {% endif %}
     </div>
     """
-    return render_page(7, "Objective: Bypass WAF to extract 'flag' from 'secrets' table.", content, sql, id_param=id_param, item=item, error=error)
+    return render_page(7, "Objective: Bypass WAF to extract 'flag' from 'secrets' table.", content, sql, deferred=run_query, id_param=id_param, item=item, error=error)
 
 @app.route('/level8', methods=['GET', 'POST'])
 def level8():
@@ -408,66 +593,79 @@ def level8():
     else:
         # VULN: Second order - Data from DB (g.stored_user) reused without filtering
         sql = f"SELECT role FROM users WHERE username = '{stored_user}'"
-        role = "guest"
-        try:
-            cur = get_db().cursor()
-            cur.execute(sql)
-            res = cur.fetchone()
-            if res: role = res[0]
-        except Exception as e: role = f"ERROR: {e}"
+        def run_query():
+            role = "guest"
+            try:
+                cur = get_db().cursor()
+                cur.execute(sql)
+                res = cur.fetchone()
+                if res: role = res[0]
+                if role == 'admin': scoreboard.solve()
+            except Exception as e: role = f"ERROR: {e}"
+            return {'role': role}
 
         content = """
         <div class="max-w-md mx-auto text-center">
             <div class="text-2xl text-white mb-2">User: {{ user }}</div>
             <div class="border-t border-amber-900 pt-2 mt-2">ROLE: <span class="text-red-400 font-bold text-xl">{{ role }}</span></div>
-            <div class="mt-6"><a href="/level8" class="text-amber-500 underline">Try again</a></div>
+            <div class="mt-6"><a href="{{ url_for('level8') }}" class="text-amber-500 underline">Try again</a></div>
         </div>
         """
-        return render_page(8, "Payload Execution.", content, sql, user=stored_user, role=role)
+        return render_page(8, "Payload Execution.", content, sql, deferred=run_query, user=stored_user)
 
 @app.route('/level9')
 def level9():
     search = request.args.get('q', '')
-    results = []
     
-    # FILTER: Regex blocks "UNION SELECT" with whitespace (space, tab, newline)
-    if re.search(r'union\s+select', search, re.IGNORECASE):
-        msg = "<div class='text-red-500 text-center text-3xl font-bold p-8 border-2 border-red-500 bg-red-900/30'>WAF BLOCKED: 'UNION SELECT'</div>"
+    # FILTER: Blocks "UNION SELECT" with whitespace (space, tab, newline)
+    # Same as: re.search(r'union\s+select', search, re.IGNORECASE)
+    blocked = waf.SQLI_LEVEL9.check(search)
+    if blocked:
+        metrics.waf_block('level9')
+        reason = "INPUT TOO LONG" if blocked == 'length' else "'UNION SELECT'"
+        msg = f"<div class='text-red-500 text-center text-3xl font-bold p-8 border-2 border-red-500 bg-red-900/30'>WAF BLOCKED: {reason}</div>"
         return render_page(9, "WAF Bypass.", msg, "BLOCKED_BY_WAF")
 
     # FIX: Main query selects 3 columns (name, description, price) to match standard payload (id, flag, 1)
     sql = f"SELECT name, description, price FROM products WHERE name LIKE '%{search}%'"
-    try:
-        cur = get_db().cursor()
-        cur.execute(sql)
-        results = cur.fetchall()
-    except Exception as e: results = [] # Hide SQL errors
+    def run_query():
+        try:
+            cur = get_db().cursor()
+            cur.execute(sql)
+            results = RowStream(cur, ROW_CAP, on_row=has_flag) # Errors while fetching are hidden too
+        except Exception as e: results = [] # Hide SQL errors
+        return {'results': results}
 
     content = """
     <div class="max-w-lg mx-auto">
         <div class="mb-4 text-red-400 text-center border border-red-900/50 p-2">WAF Active: Keyword filtering enabled</div>
         <form method="GET" class="flex gap-2"><input type="text" name="q" value="{{ search }}" class="flex-1 p-2 bg-slate-900 border-amber-800" placeholder="Search"><button class="bg-amber-600 px-4 font-bold text-black">SEARCH</button></form>
         <ul class="mt-6 space-y-2 font-mono text-amber-200">{% for r in results %}<li class="p-2 bg-slate-900/50">{{ r[0] }} - {{ r[1] }}</li>{% endfor %}</ul>
+        {% if results.truncated %}<div class="p-2 text-slate-500 italic">... truncated after {{ results.count }} rows</div>{% endif %}
     </div>
     """
-    return render_page(9, "Objective: Bypass WAF keyword filtering.", content, sql, search=search, results=results)
+    return render_page(9, "Objective: Bypass WAF keyword filtering.", content, sql, deferred=run_query, search=search)
 
 @app.route('/level10', methods=['GET', 'POST'])
 def level10():
-    msg = ""
     query_log = ""
+    run_query = None
     if request.method == 'POST':
         user_input = request.form.get('id', '')
         sql = f"SELECT * FROM users WHERE id = {user_input}"
         query_log = sql
-        try:
-            cur = get_db().cursor()
-            cur.executescript(sql) # VULN: Stacked Queries
-            # Check if pwned
-            cur.execute("SELECT password FROM users WHERE username='admin'")
-            if cur.fetchone()[0] == 'pwned': msg = "<div class='text-green-400 text-2xl font-bold'>SYSTEM PWNED! Password changed.</div>"
-            else: msg = "<div class='text-slate-400 italic'>Query executed. Admin password unchanged.</div>"
-        except Exception as e: msg = f"<div class='text-red-500'>Error: {e}</div>"
+        def run_query():
+            try:
+                cur = get_db().cursor()
+                cur.executescript(sql) # VULN: Stacked Queries
+                # Check if pwned
+                cur.execute("SELECT password FROM users WHERE username='admin'")
+                if cur.fetchone()[0] == 'pwned':
+                    scoreboard.solve()
+                    msg = "<div class='text-green-400 text-2xl font-bold'>SYSTEM PWNED! Password changed.</div>"
+                else: msg = "<div class='text-slate-400 italic'>Query executed. Admin password unchanged.</div>"
+            except Exception as e: msg = f"<div class='text-red-500'>Error: {e}</div>"
+            return {'msg': msg}
 
     content = """
     <div class="text-center max-w-lg mx-auto">
@@ -476,7 +674,7 @@ def level10():
         <div class="mt-8 border p-4 border-amber-900 bg-black/80 min-h-[60px] flex items-center justify-center">{{ msg|safe }}</div>
     </div>
     """
-    return render_page(10, "Objective: Use semicolon ; to execute UPDATE command on admin password.", content, query_log, msg=msg)
+    return render_page(10, "Objective: Use semicolon ; to execute UPDATE command on admin password.", content, query_log, deferred=run_query, msg="")
 
 if __name__ == '__main__':
     app.run(debug=True, port=1111)
\ No newline at end of file
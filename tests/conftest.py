@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'sqli'), os.path.join(ROOT, 'xss')]
+
+# The dojos read their configuration at import time.
+os.environ.setdefault('SQLI_JOURNAL', os.path.join(tempfile.mkdtemp(prefix='dojo-tests-'), 'queries.jsonl'))
+os.environ.setdefault('SQLI_RATE_LIMIT', '0')
+os.environ.setdefault('XSS_RATE_LIMIT', '0')
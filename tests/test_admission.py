@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from flask import Flask, Response, stream_with_context
+
+from dojo import metrics
+from dojo.admission import AdmissionControl, Bulkhead
+
+def test_bulkhead_queues_in_order_then_sheds():
+    bulkhead = Bulkhead('heavy', limit=1, queue=2, max_wait=5.0)
+    assert bulkhead.enter()
+    admitted = []
+
+    def wait(name):
+        if bulkhead.enter():
+            admitted.append(name)
+
+    waiters = []
+    for name in ('first', 'second'):
+        waiters.append(threading.Thread(target=wait, args=(name,)))
+        waiters[-1].start()
+        while bulkhead.waiting < len(waiters):
+            time.sleep(0.001)
+    assert not bulkhead.enter()  # queue full: shed at once
+    assert bulkhead.retry_after() >= 1
+
+    bulkhead.leave(0.1)
+    waiters[0].join(1)
+    assert admitted == ['first']
+    bulkhead.leave(0.1)
+    waiters[1].join(1)
+    assert admitted == ['first', 'second']
+    assert bulkhead.active == 1
+    bulkhead.leave(0.1)
+    assert bulkhead.active == 0
+
+def test_queued_request_is_shed_after_max_wait():
+    bulkhead = Bulkhead('slow', limit=1, queue=1, max_wait=0.05)
+    assert bulkhead.enter()
+    start = time.monotonic()
+    assert not bulkhead.enter()
+    assert time.monotonic() - start >= 0.05
+    assert bulkhead.waiting == 0
+
+def make_app(limit=1):
+    app = Flask(__name__)
+    metrics.init_app(app, 'test')
+    admission = AdmissionControl({'heavy': (limit, ('page', 'stream', 'vacating', 'broken')), 'fast': (0, ('free',))}, queue_per_slot=0)
+    admission.init_app(app)
+
+    @app.route('/page')
+    def page():
+        return 'done'
+
+    @app.route('/stream')
+    def stream():
+        return Response(iter(['chunk'] * 3))
+
+    @app.route('/vacating')
+    def vacating():
+        def body():
+            yield 'panel'
+            admission.vacate()
+            yield 'after the slot'
+        return Response(stream_with_context(body()))
+
+    @app.route('/broken')
+    def broken():
+        raise RuntimeError('level bug')
+
+    @app.route('/free')
+    def free():
+        return 'free'
+
+    return app, admission
+
+def test_buffered_response_frees_its_slot_at_once():
+    app, admission = make_app()
+    client = app.test_client()
+    for _ in range(3):
+        assert client.get('/page').status_code == 200  # never closed, like a careless client
+    assert admission.active() == 0
+
+def test_streamed_response_holds_its_slot_until_closed():
+    app, admission = make_app()
+    client = app.test_client()
+    response = client.get('/stream', buffered=False)
+    assert admission.active() == 1
+    shed = client.get('/page')
+    assert shed.status_code == 503
+    assert int(shed.headers['Retry-After']) >= 1
+    assert client.get('/free').status_code == 200  # unbounded class
+    response.close()
+    assert admission.active() == 0
+    assert client.get('/page').status_code == 200
+    assert 'dojo_admission_shed_total{app="test",class="heavy",route="page"} 1' in \
+        app.extensions['dojo_metrics'].render()
+
+def test_a_view_that_raises_frees_its_slot():
+    app, admission = make_app()
+    app.config['PROPAGATE_EXCEPTIONS'] = True  # as under app.run(debug=True)
+    client = app.test_client()
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            client.get('/broken')
+    assert admission.active() == 0
+    assert client.get('/page').status_code == 200
+
+def test_a_stream_can_give_its_slot_back_early():
+    app, admission = make_app()
+    client = app.test_client()
+    response = client.get('/vacating', buffered=False)
+    chunks = iter(response.response)
+    assert next(chunks) == b'panel'
+    assert admission.active() == 1
+    assert next(chunks) == b'after the slot'
+    assert admission.active() == 0
+    response.close()  # does not free it a second time
+    assert admission.active() == 0
+    assert client.get('/page').status_code == 200
+    assert admission.active() == 0
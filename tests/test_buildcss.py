@@ -0,0 +1,6 @@
+from dojo import buildcss
+
+def test_committed_stylesheet_covers_every_template_class():
+    # Fails when a template gains a class: re-run python -m dojo.buildcss and commit the result.
+    with open(buildcss.OUTPUT, encoding='utf-8') as f:
+        assert f.read() == buildcss.stylesheet()[0]
@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+import threading
+
+import pytest
+from flask import Flask, request
+from werkzeug.serving import make_server
+
+from dojo import session
+from dojo.capture import Capture, client_alias
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench'))
+import replay
+
+def make_app(capture):
+    app = Flask(__name__)
+    app.before_request(capture.arrival)
+    app.after_request(capture.answered)
+    session.init_app(app)
+
+    @app.route('/level1')
+    def level1():
+        return f'hello {session.current_sid()}'
+
+    @app.route('/level2', methods=['POST'])
+    def level2():
+        session.current_sid()
+        return request.form.get('q', ''), 200 if request.cookies.get(session.COOKIE_NAME) else 403
+    return app
+
+@pytest.fixture
+def captured(tmp_path):
+    capture = Capture(str(tmp_path), max_bytes=1024 * 1024)
+    app = make_app(capture)
+    trainee = app.test_client()
+    trainee.get('/level1')                      # hands out a session
+    trainee.get('/level1?q=%27%20OR%201=1--')
+    trainee.post('/level2', data={'q': "' UNION SELECT 1--"})
+    app.test_client().post('/level2', data={'q': 'x'})  # no cookie: 403
+    return capture, app
+
+def test_capture_records_arrivals_and_answers(captured):
+    capture, _ = captured
+    with open(capture.path) as f:
+        records = [json.loads(line) for line in f]
+    assert [record[:2] for record in records] == [['q', 1], ['r', 1], ['q', 2], ['r', 2], ['q', 3], ['r', 3], ['q', 4], ['r', 4]]
+    arrival = records[4]
+    assert arrival[3:8] == ['POST', '/level2', '', "q='+UNION+SELECT+1--", 'application/x-www-form-urlencoded']
+    # The first request had no cookie and was handed one; later requests carry its alias.
+    assert records[0][8] is None and records[1][4] is not None
+    assert records[2][8] == records[4][8] == records[1][4]
+    assert capture.written == 8
+
+def test_replay_loads_a_capture_round_trip(captured):
+    capture, _ = captured
+    requests = replay.load(capture.directory)
+    assert [(r['method'], r['path'], r['query'], r['status']) for r in requests] == [
+        ('GET', '/level1', '', 200), ('GET', '/level1', 'q=%27%20OR%201=1--', 200),
+        ('POST', '/level2', '', 200), ('POST', '/level2', '', 403)]
+    assert all(r['ms'] >= 0 for r in requests)
+    groups = replay.trainees(requests)
+    # The first three are one trainee; the cookieless POST is on its own.
+    assert [len(group) for group in groups] == [3, 1]
+
+def test_rotated_file_is_read_first_and_a_torn_line_is_skipped(tmp_path):
+    capture = Capture(str(tmp_path), max_bytes=400)
+    app = make_app(capture)
+    client = app.test_client()
+    for i in range(6):
+        client.get(f'/level1?n={i}')
+    assert os.path.exists(capture.path[:-len('.jsonl')] + '.1.jsonl')
+    with open(capture.path, 'a') as f:
+        f.write('["q",99,')
+    queries = [r['query'] for r in replay.load(str(tmp_path))]
+    assert queries == sorted(queries) and queries[-1] == 'n=5'
+
+def test_replayer_re_drives_the_capture(captured):
+    capture, app = captured
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        requests = replay.load(capture.directory)
+        replayer = replay.Replayer(f'http://127.0.0.1:{server.server_port}', None, requests[0]['at'])
+        for group in replay.trainees(requests):
+            replayer.run(group, 0.0)
+    finally:
+        server.shutdown()
+    # The replayed trainee picks up the session it is handed, so statuses match the capture.
+    assert sorted((r['path'], r['status'], r['captured_status']) for r in replayer.results) == [
+        ('/level1', 200, 200), ('/level1', 200, 200), ('/level2', 200, 200), ('/level2', 403, 403)]
+    rows = replay.report(replayer.results)
+    assert rows['/level2']['status_changed'] == 0 and rows['/level2']['failed'] == 0
+
+def test_client_alias_is_stable_and_short():
+    sid = '0' * 32
+    assert client_alias(sid) == client_alias(sid) and len(client_alias(sid)) == 12
+    assert client_alias(None) is None
@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+from dojo.comments import INDEX, SCHEMA, CommentStore, CommentTooLarge
+
+@pytest.fixture
+def make_store(tmp_path):
+    def make(**limits):
+        path = str(tmp_path / 'comments.db')
+        conn = sqlite3.connect(path)
+        conn.execute(SCHEMA)
+        conn.execute(INDEX)
+        conn.close()
+        return CommentStore(path, **limits)
+    return make
+
+def pages(store, sid):
+    out = []
+    before = None
+    while True:
+        rows, before = store.page(sid, before)
+        out.append([content for _, content in rows])
+        if before is None:
+            return out
+
+def test_keyset_pages_are_newest_first_and_per_session(make_store):
+    store = make_store(page_size=3)
+    for i in range(7):
+        store.add('a', f'a{i}')
+    store.add('b', 'b0')
+    assert pages(store, 'a') == [['a6', 'a5', 'a4'], ['a3', 'a2', 'a1'], ['a0']]
+    assert pages(store, 'b') == [['b0']]
+    assert pages(store, 'c') == [[]]
+
+def test_a_full_last_page_has_no_next_cursor(make_store):
+    store = make_store(page_size=3)
+    for i in range(6):
+        store.add('a', f'a{i}')
+    assert pages(store, 'a') == [['a5', 'a4', 'a3'], ['a2', 'a1', 'a0']]
+
+def test_row_cap_evicts_oldest_of_that_session_only(make_store):
+    store = make_store(page_size=50, max_rows=5)
+    store.add('b', 'kept')
+    for i in range(8):
+        store.add('a', f'a{i}')
+    assert pages(store, 'a') == [['a7', 'a6', 'a5', 'a4', 'a3']]
+    assert pages(store, 'b') == [['kept']]
+    assert store.evicted == 3
+
+def test_byte_cap_keeps_the_newest_that_fit(make_store):
+    store = make_store(page_size=50, max_bytes=100)
+    for i in range(5):
+        store.add('a', str(i) * 40)
+    assert pages(store, 'a') == [['4' * 40, '3' * 40]]
+
+def test_oversized_comment_is_rejected(make_store):
+    store = make_store(max_comment=10)
+    with pytest.raises(CommentTooLarge):
+        store.add('a', 'x' * 11)
+    assert pages(store, 'a') == [[]]
+
+def test_clear_removes_one_session(make_store):
+    store = make_store()
+    store.add('a', 'a0')
+    store.add('b', 'b0')
+    store.clear('a')
+    assert pages(store, 'a') == [[]]
+    assert pages(store, 'b') == [['b0']]
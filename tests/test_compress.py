@@ -0,0 +1,56 @@
+import gzip
+import zlib
+
+import pytest
+
+from dojo import metrics
+from dojo.compress import Compressor
+from dojo.layout import PANEL_CLOSE, PANEL_OPEN
+
+PREFIX = '<html><head><title>dojo</title></head><body>' + 'sidebar ' * 400 + PANEL_OPEN
+SUFFIX = PANEL_CLOSE + 'footer ' * 300 + '</body></html>'
+
+def page(panel):
+    return (PREFIX + panel + SUFFIX).encode()
+
+@pytest.fixture
+def stats():
+    return metrics.Metrics('test')
+
+def test_spliced_gzip_frames_round_trip(stats):
+    compressor = Compressor()
+    for panel in ('<p>first</p>', '<p>second panel, reusing the cached frames</p>', ''):
+        body = page(panel)
+        assert gzip.decompress(compressor.compress(body, 'gzip', stats)) == body
+    frames = stats.families()['dojo_compress_frames_total'][2]
+    assert any('part="prefix",result="hit"} 2' in line for line in frames)
+    assert any('part="suffix",result="hit"} 2' in line for line in frames)
+
+def test_gzip_without_markers_or_with_a_full_frame_cache(stats):
+    compressor = Compressor(max_frames=0)
+    for body in ((b'plain text ' * 200), page('<p>uncached</p>'), (PREFIX + 'no close marker').encode()):
+        assert gzip.decompress(compressor.compress(body, 'gzip', stats)) == body
+
+def test_streamed_gzip_flushes_each_chunk(stats):
+    compressor = Compressor()
+    body = page('<p>' + 'row ' * 500 + '</p>')
+    # The marker is split across chunks, as a template might yield it.
+    cut = len(PREFIX) - 5
+    chunks = [body[:cut], body[cut:cut + 100], body[cut + 100:]]
+    decoder = zlib.decompressobj(31)
+    out = b''
+    for i, compressed in enumerate(compressor.stream(iter(chunks), 'gzip', stats)):
+        out += decoder.decompress(compressed)
+        if i == 0:
+            # Everything received so far is readable before the rest is sent.
+            assert out == body[:cut + 100]
+    assert decoder.eof
+    assert out == body
+
+def test_zstd_frames_round_trip(stats):
+    zstandard = pytest.importorskip('zstandard')
+    compressor = Compressor()
+    body = page('<p>zstd</p>')
+    compressed = compressor.compress(body, 'zstd', stats)
+    reader = zstandard.ZstdDecompressor().stream_reader(compressed, read_across_frames=True)
+    assert reader.read() == body
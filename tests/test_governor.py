@@ -0,0 +1,64 @@
+import secrets
+import sqlite3
+
+import pytest
+
+import vuln_sqli
+from dojo import governor
+from dojo.governor import Budget, BudgetExceeded, QueryGovernor
+from dojo.session import COOKIE_NAME
+
+RECURSIVE_CTE = 'WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT count(*) FROM n'
+
+class Connection(sqlite3.Connection):
+    pass  # the built-in class takes no attributes; sandboxes use a subclass too
+
+def governed(budget):
+    conn = sqlite3.connect(':memory:', factory=Connection)
+    QueryGovernor(budget, check_every=100).install(conn)
+    return conn
+
+def run(conn, sql):
+    # What JournalCursor does around every statement.
+    governor.start(conn)
+    try:
+        return conn.execute(sql).fetchall()
+    except sqlite3.Error as e:
+        aborted = governor.explain(conn, e)
+        if aborted is not None:
+            raise aborted from e
+        raise
+
+def test_recursive_cte_hits_the_instruction_budget():
+    conn = governed(Budget(instructions=100_000, seconds=30))
+    with pytest.raises(BudgetExceeded, match=r'budget exceeded \(instruction limit\)'):
+        run(conn, RECURSIVE_CTE)
+    # The connection stays usable and the next statement gets a fresh budget.
+    assert run(conn, 'SELECT 1') == [(1,)]
+
+def test_recursive_cte_hits_the_time_budget():
+    conn = governed(Budget(instructions=10 ** 12, seconds=0.05))
+    with pytest.raises(BudgetExceeded, match=r'budget exceeded \(time limit\)'):
+        run(conn, RECURSIVE_CTE)
+
+def test_oversized_randomblob_hits_the_length_limit():
+    conn = governed(Budget(max_length=10_000))
+    assert len(run(conn, 'SELECT randomblob(5000)')[0][0]) == 5000
+    with pytest.raises(BudgetExceeded, match=r'budget exceeded \(row/blob size limit\)'):
+        run(conn, 'SELECT randomblob(20000)')
+
+def test_other_errors_are_passed_through():
+    conn = governed(Budget())
+    with pytest.raises(sqlite3.OperationalError) as info:
+        run(conn, 'SELECT * FROM missing')
+    assert not isinstance(info.value, BudgetExceeded)
+
+def test_levels_report_the_budget_error():
+    client = vuln_sqli.app.test_client()
+    client.set_cookie(COOKIE_NAME, secrets.token_hex(16))
+    response = client.post('/level1', data={'username': "' OR length(randomblob(2000000))--", 'password': ''})
+    assert 'query aborted: budget exceeded (row/blob size limit)' in response.get_data(as_text=True)
+    response = client.post('/level1', data={'username': f"' OR ({RECURSIVE_CTE}) > 0--", 'password': ''})
+    assert 'query aborted: budget exceeded' in response.get_data(as_text=True)
+    response = client.post('/level1', data={'username': "admin'--", 'password': ''})
+    assert 'ACCESS GRANTED' in response.get_data(as_text=True)
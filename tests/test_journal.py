@@ -0,0 +1,55 @@
+import json
+import time
+
+from dojo.journal import QueryJournal
+
+def wait_written(journal, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while journal.written < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert journal.written == count
+
+def entries(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_entries_are_flushed_by_the_writer_thread(tmp_path):
+    path = tmp_path / 'queries.jsonl'
+    journal = QueryJournal(str(path), batch_size=100, flush_interval=0.05)
+    journal.record('sid', 'level1', "SELECT 1", 0.0015, 1, None)
+    journal.record('sid', 'level2', "SELECT x", 0.0, 0, 'no such column: x')
+    # Under batch_size: written on the next flush interval.
+    wait_written(journal, 2)
+    first, second = entries(path)
+    assert (first['session'], first['level'], first['sql'], first['duration_ms'], first['rows']) == \
+        ('sid', 'level1', 'SELECT 1', 1.5, 1)
+    assert second['error'] == 'no such column: x'
+
+def test_a_full_batch_wakes_the_writer(tmp_path):
+    path = tmp_path / 'queries.jsonl'
+    journal = QueryJournal(str(path), batch_size=3, flush_interval=60)
+    for i in range(3):
+        journal.record('sid', 'level1', f'SELECT {i}', 0.0, 0, None)
+    wait_written(journal, 3)
+    assert [entry['sql'] for entry in entries(path)] == ['SELECT 0', 'SELECT 1', 'SELECT 2']
+
+def test_a_full_ring_drops_entries(tmp_path):
+    journal = QueryJournal(str(tmp_path / 'queries.jsonl'), capacity=3, batch_size=100, flush_interval=60)
+    for i in range(5):
+        journal.record('sid', 'level1', f'SELECT {i}', 0.0, 0, None)
+    assert (journal.recorded, journal.dropped) == (3, 2)
+
+def test_rotation_keeps_the_configured_backups(tmp_path):
+    path = tmp_path / 'queries.jsonl'
+    journal = QueryJournal(str(path), batch_size=1, flush_interval=0.01, max_bytes=200, backups=2)
+    for i in range(12):
+        journal.record('sid', 'level1', f"SELECT '{i:02d}' || '{'x' * 60}'", 0.0, 0, None)
+        wait_written(journal, i + 1)
+    assert sorted(p.name for p in tmp_path.iterdir()) == \
+        ['queries.jsonl', 'queries.jsonl.1', 'queries.jsonl.2', 'queries.jsonl.lock']
+    for name in ('queries.jsonl', 'queries.jsonl.1', 'queries.jsonl.2'):
+        assert (tmp_path / name).stat().st_size <= 200
+    # Newest entries in the live file, older ones shifted down the backups; the oldest are gone.
+    kept = [entry['sql'][8:10] for name in ('queries.jsonl.2', 'queries.jsonl.1', 'queries.jsonl')
+            for entry in entries(tmp_path / name)]
+    assert kept == [f'{i:02d}' for i in range(12 - len(kept), 12)]
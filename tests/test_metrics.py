@@ -0,0 +1,32 @@
+import threading
+
+from dojo import metrics
+
+def test_counters_from_many_threads_stay_in_fixed_stripes():
+    registry = metrics.Metrics('test')
+
+    def request():
+        registry.inc('dojo_requests_total', (('route', 'level1'),))
+        registry.observe('dojo_request_duration_seconds', (('route', 'level1'),), 0.003)
+
+    # One short-lived thread per request, like the threaded WSGI server.
+    for _ in range(500):
+        thread = threading.Thread(target=request)
+        thread.start()
+        thread.join()
+
+    assert len(registry._stripes) == metrics.STRIPES
+    families = registry.families()
+    assert families['dojo_requests_total'][2] == ['dojo_requests_total{app="test",route="level1"} 500']
+    histogram = families['dojo_request_duration_seconds'][2]
+    assert 'dojo_request_duration_seconds_bucket{app="test",route="level1",le="0.005"} 500' in histogram
+    assert 'dojo_request_duration_seconds_count{app="test",route="level1"} 500' in histogram
+
+def test_concurrent_increments_are_not_lost():
+    registry = metrics.Metrics('test')
+    threads = [threading.Thread(target=lambda: [registry.inc('hits') for _ in range(2000)]) for _ in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.families()['hits'][2] == ['hits{app="test"} 64000']
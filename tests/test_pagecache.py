@@ -0,0 +1,32 @@
+import gzip
+
+import pytest
+
+import vuln_xss
+from dojo.assets import assets
+
+@pytest.fixture(params=['page', 'asset'])
+def url(request):
+    # A cached XSS page and the shared stylesheet go through the same negotiation.
+    return '/level3' if request.param == 'page' else assets.url('dojo.css')
+
+def test_gzip_variant_has_its_own_etag(url):
+    client = vuln_xss.app.test_client()
+    plain = client.get(url)
+    zipped = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert zipped.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(zipped.data) == plain.data
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+
+def test_if_none_match_answers_304_per_variant(url):
+    client = vuln_xss.app.test_client()
+    etag = client.get(url, headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    assert client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 304
+    # The identity body is a different representation: not matched by the gzip ETag.
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+def test_refused_encoding_is_not_sent(url):
+    client = vuln_xss.app.test_client()
+    response = client.get(url, headers={'Accept-Encoding': 'gzip;q=0, br;q=0'})
+    assert 'Content-Encoding' not in response.headers
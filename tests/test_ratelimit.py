@@ -0,0 +1,75 @@
+import secrets
+
+import pytest
+from flask import Flask
+
+from dojo import metrics
+from dojo.ratelimit import Limit, RateLimiter, level_limits
+from dojo.session import COOKIE_NAME
+
+LIMIT = Limit(rate=2.0, burst=3)
+
+def test_burst_then_refill():
+    limiter = RateLimiter({'level1': LIMIT})
+    assert [limiter.take('a', LIMIT, 100.0) for _ in range(3)] == [0, 0, 0]
+    # Empty: the next token is half a second away at 2 per second.
+    assert limiter.take('a', LIMIT, 100.0) == pytest.approx(0.5)
+    assert limiter.take('a', LIMIT, 100.25) == pytest.approx(0.25)
+    assert limiter.take('a', LIMIT, 100.5) == 0
+    # A long pause refills up to the burst, not beyond it.
+    assert [limiter.take('a', LIMIT, 200.0) for _ in range(3)] == [0, 0, 0]
+    assert limiter.take('a', LIMIT, 200.0) > 0
+    # Other clients have their own bucket.
+    assert limiter.take('b', LIMIT, 200.0) == 0
+
+def test_idle_buckets_are_evicted():
+    limiter = RateLimiter({'level1': LIMIT}, max_buckets=2)
+    for key in ('a', 'b', 'c'):
+        limiter.take(key, LIMIT, 0.0)
+    # Over max_buckets: the least recently used goes first.
+    assert len(limiter) == 2 and limiter.evicted == 1
+    # Refilled buckets are dropped as later requests come in.
+    limiter.take('d', LIMIT, LIMIT.refill_seconds + 1)
+    assert len(limiter) == 1 and limiter.evicted == 3
+
+def test_level_limits():
+    assert level_limits(0, 30) == {}
+    limits = level_limits(10, 30, {'level6': Limit(2, 10)})
+    assert sorted(limits) == sorted(f'level{i}' for i in range(1, 11))
+    assert (limits['level1'].rate, limits['level6'].burst) == (10, 10)
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    metrics.init_app(app, 'test')
+    RateLimiter({'level1': Limit(rate=0.5, burst=2)}).init_app(app)
+
+    @app.route('/level1')
+    def level1():
+        return 'ok'
+
+    @app.route('/unlimited')
+    def unlimited():
+        return 'ok'
+    return app
+
+def test_empty_bucket_answers_429_with_retry_after(app):
+    client = app.test_client()
+    client.set_cookie(COOKIE_NAME, secrets.token_hex(16))
+    assert [client.get('/level1').status_code for _ in range(2)] == [200, 200]
+    response = client.get('/level1')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+    assert any('dojo_rate_limited_total' in line and 'route="level1"' in line
+               for line in app.test_client().get('/metrics').get_data(as_text=True).splitlines())
+    # Endpoints without a limit and other sessions are not affected.
+    assert client.get('/unlimited').status_code == 200
+    other = app.test_client()
+    other.set_cookie(COOKIE_NAME, secrets.token_hex(16))
+    assert other.get('/level1').status_code == 200
+
+def test_cookieless_clients_share_their_address_bucket(app):
+    # Dropping the cookie does not reset the bucket.
+    statuses = [app.test_client().get('/level1').status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    assert app.test_client().get('/level1', environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code == 200
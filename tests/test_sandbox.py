@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from dojo.sandbox import SandboxPool
+from dojo.snapshot import Snapshot
+
+def seed(conn):
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.execute('CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.executemany('INSERT INTO users (name) VALUES (?)', [('admin',), ('user',)])
+    conn.executemany('INSERT INTO products (name) VALUES (?)', [('chip',), ('core',)])
+    conn.commit()
+
+@pytest.fixture(scope='module')
+def snapshot():
+    return Snapshot.build(seed)
+
+def names(conn, table):
+    return [row[0] for row in conn.execute(f'SELECT name FROM {table} ORDER BY id')]
+
+def test_each_trainee_keeps_a_private_clone(snapshot):
+    pool = SandboxPool(snapshot)
+    box = pool.checkout('a')
+    box.conn.execute("UPDATE users SET name = 'pwned' WHERE id = 1")
+    pool.checkin(box)
+
+    other = pool.checkout('b')
+    assert names(other.conn, 'users') == ['admin', 'user']
+    pool.checkin(other)
+    again = pool.checkout('a')
+    assert again is box
+    assert names(again.conn, 'users') == ['pwned', 'user']
+    pool.checkin(again)
+
+def test_one_request_at_a_time_per_trainee(snapshot):
+    pool = SandboxPool(snapshot)
+    box = pool.checkout('a')
+    entered = threading.Event()
+
+    def second():
+        pool.checkin(pool.checkout('a'))
+        entered.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    assert not entered.wait(0.1)
+    pool.checkin(box)
+    assert entered.wait(1)
+    thread.join()
+
+def test_lru_eviction_spares_busy_sandboxes(snapshot):
+    pool = SandboxPool(snapshot, max_sandboxes=2)
+    busy = pool.checkout('busy')
+    for sid in ('b', 'c', 'd'):
+        pool.checkin(pool.checkout(sid))
+    assert 'busy' in pool._boxes
+    assert len(pool) == 2
+    pool.checkin(busy)
+    assert pool.evictions == 2
+
+def test_idle_sandboxes_are_evicted(snapshot):
+    pool = SandboxPool(snapshot, idle_timeout=0.05)
+    pool.checkin(pool.checkout('a'))
+    time.sleep(0.1)
+    pool.checkin(pool.checkout('b'))
+    assert list(pool._boxes) == ['b']
+
+def test_workers_share_file_sandboxes(snapshot, tmp_path):
+    # Two pools on one directory stand in for two worker processes.
+    first, second = SandboxPool(snapshot, directory=str(tmp_path)), SandboxPool(snapshot, directory=str(tmp_path))
+    box = first.checkout('a')
+    box.conn.execute("DELETE FROM products")
+    first.checkin(box)
+    other = second.checkout('a')
+    assert names(other.conn, 'products') == []
+    second.checkin(other)
@@ -0,0 +1,61 @@
+import secrets
+
+from flask import Flask
+
+from dojo import scoreboard, session
+from dojo.session import COOKIE_NAME
+
+def test_leaderboard_orders_by_score_then_earliest_solve():
+    board = scoreboard.Scoreboard()
+    for event in [(1.0, 'sqli', 'level1', 'a', False), (2.0, 'sqli', 'level1', 'a', True),
+                  (3.0, 'sqli', 'level2', 'b', True), (4.0, 'sqli', 'level1', 'c', True),
+                  (5.0, 'sqli', 'level1', 'c', True)]:  # a second solve scores nothing
+        board.apply(event)
+    assert [stats.trainee for stats in board.top(10)] == ['b', 'a', 'c']
+    assert board.rank('c') == 3
+    assert board.levels['sqli/level1'].solvers == 2
+    assert board.levels['sqli/level1'].total_time_to_solve == 1.0
+
+def test_idle_trainees_are_evicted_past_the_cap():
+    board = scoreboard.Scoreboard(max_trainees=2)
+    board.apply((1.0, 'sqli', 'level1', 'a', True))
+    board.apply((2.0, 'sqli', 'level1', 'b', False))
+    board.apply((3.0, 'sqli', 'level2', 'a', False))  # a is active again: b is now the idlest
+    board.apply((4.0, 'sqli', 'level1', 'c', True))
+    assert list(board.trainees) == ['a', 'c']
+    assert board.evicted == 1
+    board.apply((5.0, 'sqli', 'level1', 'd', False))
+    assert list(board.trainees) == ['c', 'd']
+    assert [stats.trainee for stats in board.top(10)] == ['c']
+    assert board.rank('a') is None
+
+def make_app():
+    app = Flask(__name__)
+    session.init_app(app)
+    scoreboard.init_app(app, 'test')
+
+    @app.route('/level1')
+    def level1():
+        scoreboard.solve()
+        return 'solved'
+
+    return app
+
+def test_only_sessions_that_return_their_cookie_are_scored(monkeypatch):
+    board = scoreboard.Scoreboard()
+    bus = scoreboard.EventBus()
+    bus.subscribe(board.apply)
+    monkeypatch.setattr(scoreboard, 'bus', bus)
+    app = make_app()
+
+    cookieless = app.test_client(use_cookies=False)
+    for _ in range(5):
+        cookieless.get('/level1')
+    assert board.events == 0
+
+    sid = secrets.token_hex(16)
+    trainee = app.test_client()
+    trainee.set_cookie(COOKIE_NAME, sid)
+    trainee.get('/level1')
+    assert list(board.trainees) == [sid]
+    assert board.rank(sid) == 1
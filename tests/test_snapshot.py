@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+from dojo.snapshot import Snapshot
+
+def seed(conn):
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.execute('CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.executemany('INSERT INTO users (name) VALUES (?)', [('admin',), ('user',)])
+    conn.executemany('INSERT INTO products (name) VALUES (?)', [('chip',), ('core',)])
+    conn.commit()
+
+@pytest.fixture(scope='module')
+def snapshot():
+    return Snapshot.build(seed)
+
+def names(conn, table):
+    return [row[0] for row in conn.execute(f'SELECT name FROM {table} ORDER BY id')]
+
+def test_restore_tables_only_touches_the_level_tables(snapshot):
+    conn = snapshot.connect()
+    conn.execute("UPDATE users SET name = 'pwned'")
+    conn.execute("DELETE FROM products")
+    conn.commit()
+    snapshot.restore_tables(conn, ('users',))
+    assert names(conn, 'users') == ['admin', 'user']
+    assert names(conn, 'products') == []
+    snapshot.restore(conn)
+    assert names(conn, 'products') == ['chip', 'core']
+
+def test_restore_tables_falls_back_to_the_image_after_a_drop(snapshot, tmp_path):
+    for conn in (snapshot.connect(), snapshot.connect(path=str(tmp_path / 'box.db'))):
+        conn.execute('DROP TABLE users')
+        conn.execute("DELETE FROM products")
+        conn.commit()
+        snapshot.restore_tables(conn, ('users',))
+        assert names(conn, 'users') == ['admin', 'user']
+        assert names(conn, 'products') == ['chip', 'core']
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute('SELECT * FROM seed.users')  # the attached seed is gone again
+        conn.close()
@@ -0,0 +1,79 @@
+import secrets
+import threading
+import time
+
+import pytest
+
+import vuln_sqli
+from dojo.session import COOKIE_NAME
+
+SLEEP = 0.5  # per product row: three rows, 1.5 s in all
+
+@pytest.fixture
+def sid():
+    return secrets.token_hex(16)
+
+def trainee(sid):
+    client = vuln_sqli.app.test_client()
+    client.set_cookie(COOKIE_NAME, sid)
+    return client
+
+def test_level6_delay_does_not_hold_the_sandbox(sid):
+    body = {}
+
+    def blind():
+        response = trainee(sid).get(f"/level6?q=x' OR sleep({SLEEP})--")
+        body['text'] = response.get_data(as_text=True)
+        response.close()
+
+    thread = threading.Thread(target=blind)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while vuln_sqli.delays.outstanding(sid) == 0 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert vuln_sqli.delays.outstanding(sid) > 0
+
+    start = time.monotonic()
+    response = trainee(sid).get('/level2?id=1 OR 1=1')
+    assert 'Stealth Chip' in response.get_data(as_text=True)
+    response.close()
+    assert time.monotonic() - start < 3 * SLEEP
+    assert thread.is_alive()  # still paying its delay
+    slow = vuln_sqli.admission.bulkheads['slow']
+    deadline = time.monotonic() + SLEEP
+    while slow.active and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert slow.active == 0  # nor a slow-class bulkhead slot
+    assert thread.is_alive()
+
+    thread.join()
+    assert '1.50s' in body['text']
+    assert vuln_sqli.delays.outstanding(sid) == 0
+
+def test_level6_delay_is_paid_before_the_response_ends(sid):
+    start = time.monotonic()
+    response = trainee(sid).get("/level6?q=x' OR sleep(0.2)--")
+    response.get_data()
+    response.close()
+    assert time.monotonic() - start >= 0.6
+    assert vuln_sqli.delays.outstanding(sid) == 0
+
+def test_unpaid_delay_is_returned_when_the_client_goes_away(sid):
+    response = trainee(sid).get(f"/level6?q=x' OR sleep({SLEEP})--", buffered=False)
+    next(iter(response.response))  # the page shell only
+    response.close()
+    assert vuln_sqli.delays.outstanding(sid) == 0
+
+def test_request_duration_covers_the_streamed_delay(sid):
+    def slow_count():
+        lines = vuln_sqli.stats.families().get('dojo_request_duration_seconds', ('', '', []))[2]
+        bucket = 'dojo_request_duration_seconds_bucket{app="sqli",route="level6",le="0.5"}'
+        count = 'dojo_request_duration_seconds_count{app="sqli",route="level6"}'
+        values = {line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1]) for line in lines}
+        return values.get(count, 0) - values.get(bucket, 0)
+
+    before = slow_count()
+    response = trainee(sid).get("/level6?q=x' OR sleep(0.2)--")
+    response.get_data()
+    response.close()
+    assert slow_count() == before + 1
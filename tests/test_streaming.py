@@ -0,0 +1,59 @@
+import secrets
+import sqlite3
+
+import vuln_sqli
+from dojo.session import COOKIE_NAME
+from dojo.streaming import ClosingStream, RowStream, buffered
+
+def cursor(count):
+    conn = sqlite3.connect(':memory:')
+    return conn.execute(f'WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {count}) SELECT i FROM n')
+
+def test_row_stream_stops_at_the_cap():
+    rows = RowStream(cursor(10), cap=4, batch=3)
+    assert [row[0] for row in rows] == [1, 2, 3, 4]
+    assert rows.truncated
+    assert rows.count == 4
+
+def test_row_stream_under_the_cap_is_not_truncated():
+    rows = RowStream(cursor(3), cap=4)
+    assert len(list(rows)) == 3
+    assert not rows.truncated
+
+def test_row_stream_keeps_rows_sent_before_an_error():
+    cur = sqlite3.connect(':memory:').execute(
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 5) "
+        "SELECT CASE WHEN i < 4 THEN i ELSE json('broken') END FROM n")
+    rows = RowStream(cur, cap=10, batch=1, on_error=lambda e: iter([('error',)]))
+    out = list(rows)
+    # sqlite3 steps one row ahead of fetchmany(), so the error can cut the last good row.
+    assert out[:2] == [(1,), (2,)]
+    assert out[-1] == ('error',)
+    assert rows.error is not None
+
+def test_buffered_groups_small_chunks():
+    assert list(buffered(['ab', 'cd', 'ef', 'g'], size=4)) == ['abcd', 'efg']
+
+def test_buffered_flushes_the_marker_chunk_at_once():
+    chunks = list(buffered(['<head>', '<!--panel-->', 'a', 'b'], size=1000, flush_after='<!--panel-->'))
+    assert chunks == ['<head><!--panel-->', 'ab']
+
+def test_closing_stream_runs_on_close_once():
+    closed = []
+    stream = ClosingStream(iter(['x']), lambda: closed.append(1))
+    stream.close()
+    stream.close()
+    assert closed == [1]
+
+def test_abandoned_sqli_stream_releases_the_sandbox():
+    sid = secrets.token_hex(16)
+    client = vuln_sqli.app.test_client()
+    client.set_cookie(COOKIE_NAME, sid)
+    response = client.get("/level3?search=' UNION SELECT id, flag, 1 FROM secrets--", buffered=False)
+    chunks = iter(response.response)
+    next(chunks)
+    next(chunks)  # the panel has started: the sandbox is checked out
+    response.close()
+    box = vuln_sqli.sandboxes._boxes[sid]
+    assert box.users == 0
+    assert not box.lock.locked()
@@ -0,0 +1,22 @@
+import vuln_sqli
+
+def test_streamed_page_reports_sql_and_render_phases():
+    phases = {}
+    response = vuln_sqli.app.test_client().get("/level3?search=' UNION SELECT id, flag, 1 FROM secrets--",
+                                                buffered=False, environ_overrides={'dojo.phases': phases})
+    chunks = iter(response.response)
+    next(chunks)
+    # The page shell is out before the level's SQL has run.
+    assert 'sql' not in phases
+    for _ in chunks:
+        pass
+    response.close()
+    assert phases['sql'] > 0
+    assert phases['render'] > 0
+
+def test_buffered_page_still_sends_server_timing():
+    phases = {}
+    response = vuln_sqli.app.test_client().get('/level8?step=register', environ_overrides={'dojo.phases': phases})
+    assert 'render;dur=' in response.headers['Server-Timing']
+    assert phases['render'] > 0
+    response.close()
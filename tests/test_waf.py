@@ -0,0 +1,71 @@
+import re
+
+import pytest
+
+from dojo import waf
+
+# The per-level checks as they were written before dojo/waf.py.
+def legacy_sqli_level7(s):
+    return ' ' in s
+
+def legacy_sqli_level9(s):
+    return bool(re.search(r'union\s+select', s, re.IGNORECASE))
+
+def legacy_xss_level4(q):
+    s = re.sub(r'(?i)<script.*?>.*?</script>', '[BLOCKED]', q)
+    return re.sub(r'(?i)<script', '[BLOCKED]', s)
+
+def legacy_xss_level8(s):
+    return '<script' in s.lower() or 'javascript:' in s.lower()
+
+# Payloads the filter must stop, then the bypasses each level is meant to teach.
+SQLI_LEVEL7 = [
+    "1 OR 1=1", "1 UNION SELECT password FROM users",
+    "1/**/OR/**/1=1", "1\tOR\t1=1", "1%0aOR%0a1=1", "1\nUNION\nSELECT\npassword\nFROM\nusers", "1",
+]
+SQLI_LEVEL9 = [
+    "' UNION SELECT 1,2,3--", "x' union\tselect username,password from users--", "'\nUnIoN\n\nsElEcT 1--",
+    "' UNION/**/SELECT 1,2,3--", "' UNION ALL SELECT 1,2,3--", "' unionselect", "' UNION(SELECT 1,2,3)--",
+    "' union  x select", "union union select", "' uniſon select", "' unıon select",
+]
+XSS_LEVEL4 = [
+    "<script>alert(1)</script>", "<SCRIPT>alert(1)</SCRIPT>", "<script src=//x></script>", "<scr<script>ipt>",
+    "<script>\nalert(1)</script>", "<ſcript>alert(1)</ſcript>",
+    "<img src=x onerror=alert(1)>", "<svg onload=alert(1)>", "<scr ipt>", "plain text",
+]
+XSS_LEVEL8 = [
+    "<script>alert(1)</script>", "<ScRiPt>alert(1)</ScRiPt>", "javascript:alert(1)", "JAVASCRIPT:alert(1)",
+    "<img src=x onerror=alert(1)>", "java\tscript:alert(1)", "%3Cscript%3E", "<SCRİPT>", "data:text/html,x",
+]
+
+def verdict(result):
+    return result is not None
+
+@pytest.mark.parametrize('payload', SQLI_LEVEL7)
+def test_sqli_level7_matches_legacy(payload):
+    assert verdict(waf.SQLI_LEVEL7.check(payload)) == legacy_sqli_level7(payload)
+
+@pytest.mark.parametrize('payload', SQLI_LEVEL9)
+def test_sqli_level9_matches_legacy(payload):
+    assert verdict(waf.SQLI_LEVEL9.check(payload)) == legacy_sqli_level9(payload)
+
+@pytest.mark.parametrize('payload', XSS_LEVEL4)
+def test_xss_level4_matches_legacy(payload):
+    assert waf.XSS_LEVEL4.sanitize(payload) == legacy_xss_level4(payload)
+
+@pytest.mark.parametrize('payload', XSS_LEVEL8)
+def test_xss_level8_matches_legacy(payload):
+    assert verdict(waf.XSS_LEVEL8.check(payload)) == legacy_xss_level8(payload)
+
+def test_known_payloads_are_split_between_blocked_and_bypassed():
+    # Guards the lists above: each level has both kinds, so the comparison means something.
+    for payloads, legacy in ((SQLI_LEVEL7, legacy_sqli_level7), (SQLI_LEVEL9, legacy_sqli_level9),
+                             (XSS_LEVEL8, legacy_xss_level8)):
+        assert {legacy(p) for p in payloads} == {True, False}
+    assert {legacy_xss_level4(p) == p for p in XSS_LEVEL4} == {True, False}
+
+def test_inputs_over_the_length_budget_are_blocked():
+    assert waf.SQLI_LEVEL7.check('x' * 4097) == 'length'
+    assert waf.SQLI_LEVEL9.check('x' * 4097) == 'length'
+    assert waf.XSS_LEVEL4.sanitize('x' * 8193) == waf.BLOCK_TEXT
+    assert waf.XSS_LEVEL8.check('x' * 8193) == 'length'
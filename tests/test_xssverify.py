@@ -0,0 +1,76 @@
+import pytest
+
+import vuln_xss
+from dojo.xssverify import Policy, SolveVerifier, features, js_shape
+
+def solved(path, **args):
+    response = vuln_xss.app.test_client().get(path, query_string=args)
+    assert response.status_code == 200
+    return response.headers.get('X-Dojo-Solved') is not None
+
+@pytest.mark.parametrize('payload', [
+    '<script>alert(1)</script>',
+    '<img src=x onerror=alert(1)>',
+    '<svg/onload=alert(1)>',
+    '<a href=" java&#x09;script:alert(1)">x</a>',
+    '<iframe srcdoc="<script>alert(1)</script>"></iframe>',
+])
+def test_tag_breakout_solves(payload):
+    assert solved('/level1', q=payload)
+
+@pytest.mark.parametrize('payload', [
+    'Guest',
+    '&lt;script&gt;alert(1)&lt;/script&gt;',
+    '<script type="text/plain">alert(1)</script>',
+    '<!-- <script>alert(1)</script> -->',
+    '<textarea><script>alert(1)</script></textarea>',
+])
+def test_inert_markup_does_not_solve(payload):
+    assert not solved('/level1', q=payload)
+
+def test_attribute_breakout_solves():
+    assert solved('/level5', u='" onfocus="alert(1)" autofocus x="')
+    assert solved('/level5', u='"onmouseover=alert(1)//')
+    # JS string context: the quote closes the literal and the rest still parses.
+    assert solved('/level7', p="';alert(1);'")
+
+def test_escaped_payloads_do_not_solve():
+    # Level 5 escapes angle brackets, Level 6 escapes everything.
+    assert not solved('/level5', u='<script>alert(1)</script>')
+    assert not solved('/level6', link='" onmouseover="alert(1)')
+    # Level 7: an escaped quote keeps the payload inside the string literal.
+    assert not solved('/level7', p="\\';alert(1);\\'")
+    assert not solved('/level7', p='System Normal')
+
+def test_javascript_url_solves_level6():
+    assert solved('/level6', link='javascript:alert(1)')
+    assert not solved('/level6', link='https://example.com/javascript:alert(1)')
+
+def test_jsonp_callback_solves_under_csp():
+    assert solved('/level10', q='<script src="/api/widgets?callback=alert(1)//"></script>')
+    # The page's own callback is the baseline; inline and foreign scripts are blocked by the CSP.
+    assert not solved('/level10', q='<script src="/api/widgets?callback=loadWidgets"></script>')
+    assert not solved('/level10', q='<script>alert(1)</script>')
+    assert not solved('/level10', q='<img src=x onerror=alert(1)>')
+    assert not solved('/level10', q='<script src="https://evil.example/x.js"></script>')
+
+def test_verify_compares_against_the_baseline():
+    verifier = SolveVerifier({}, gadgets=('/api/widgets',))
+    page = '<html><script>var x = %s;</script></html>'
+    baseline = features(page % "'safe'")
+    assert not verifier.verify(page % "'other text'", baseline)
+    verdict = verifier.verify(page % "'';alert(1);''", baseline)
+    assert verdict and verdict.reasons
+    assert (verifier.checked, verifier.solved) == (2, 1)
+
+def test_js_shape_rejects_broken_scripts():
+    assert js_shape("var a = 'x';") == ('var', 'a', '=', 'S', ';')
+    assert js_shape("var a = '';alert(1)'';") is not None
+    assert js_shape("var a = ''';") is None
+    assert js_shape('alert(1') is None
+
+def test_policy_reads_script_src():
+    assert Policy().inline and Policy().sources is None
+    strict = Policy("default-src 'self'; img-src *")
+    assert not strict.inline and strict.sources == 'self'
+    assert Policy("script-src 'self' 'unsafe-inline'").inline
@@ -1,125 +1,107 @@
-import sqlite3
-from flask import Flask, request, render_template_string, redirect, url_for, make_response
-import re
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from flask import Flask, abort, request, redirect, url_for, make_response
 import html
 import urllib.parse
 import json
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dojo import assets, capture, compress, layout, metrics, profiler, scoreboard, session, timing, waf
+from dojo.comments import INDEX, SCHEMA, CommentStore, CommentTooLarge
+from dojo.pagecache import PageCache
+from dojo.ratelimit import RateLimiter, level_limits
+from dojo.snapshot import Snapshot
+from dojo.xssverify import SolveVerifier
+from dojo.templates import TemplateRegistry
+
 app = Flask(__name__)
+capture.init_app(app)
+compress.init_app(app)
+session.init_app(app)
+assets.init_app(app)
+layout.init_app(app, 'xss')
+timing.init_app(app)
+stats = metrics.init_app(app, 'xss')
+scoreboard.init_app(app, 'xss')
+profiler.init_app(app, 'xss')
+templates = TemplateRegistry(app)
+# Levels whose output is identical for every request are rendered once (see dojo/pagecache.py).
+pages = PageCache()
+# Solved levels are detected server-side from the response (see dojo/xssverify.py):
+# endpoint -> request argument carrying the payload. Levels 3 and 9 run entirely
+# in the URL fragment, which never reaches the server.
+verifier = SolveVerifier({'level1': 'q', 'level2': None, 'level4': 'q', 'level5': 'u', 'level6': 'link',
+                          'level7': 'p', 'level8': '', 'level10': 'q'}, gadgets=('/api/widgets',))
+verifier.init_app(app)
+
+# Per-client request rates for fuzzers (see dojo/ratelimit.py); 0 disables.
+RATE_LIMIT = float(os.environ.get('XSS_RATE_LIMIT', 10))
+RATE_BURST = int(os.environ.get('XSS_RATE_BURST', 30))
+limiter = RateLimiter(level_limits(RATE_LIMIT, RATE_BURST))
+limiter.init_app(app)
+stats.gauge('dojo_rate_limit_buckets', lambda: len(limiter), 'Client token buckets held by this worker.')
 
 # --- DATABASE SETUP ---
-def init_db():
-    conn = sqlite3.connect(':memory:', check_same_thread=False)
+def init_db(conn):
     c = conn.cursor()
-    c.execute('''CREATE TABLE comments (id INTEGER PRIMARY KEY AUTOINCREMENT, content TEXT)''')
+    c.execute(SCHEMA)
+    c.execute(INDEX)
     conn.commit()
-    return conn
 
-db = init_db()
+# Set by dojo/serve.py: the comment store becomes a tmpfs file shared by all worker processes.
+# Standalone it lives in a private temporary directory.
+DATA_DIR = os.environ.get('XSS_DATA_DIR') or None
+if DATA_DIR is None:
+    DATA_DIR = tempfile.mkdtemp(prefix='dojo-xss-')
+    atexit.register(shutil.rmtree, DATA_DIR, True)
+MMAP_SIZE = int(os.environ.get('XSS_MMAP_SIZE', 64 * 1024 * 1024))
+
+# Level 2 comment log: per-session, paginated and capped (see dojo/comments.py).
+COMMENT_PAGE_SIZE = int(os.environ.get('XSS_COMMENT_PAGE_SIZE', 20))
+COMMENT_MAX_ROWS = int(os.environ.get('XSS_COMMENT_MAX_ROWS', 200))
+COMMENT_MAX_BYTES = int(os.environ.get('XSS_COMMENT_MAX_BYTES', 256 * 1024))
+
+seed = Snapshot.build(init_db)
+os.makedirs(DATA_DIR, exist_ok=True)
+seed.materialize(os.path.join(DATA_DIR, 'comments.db'))
+comments = CommentStore(os.path.join(DATA_DIR, 'comments.db'), page_size=COMMENT_PAGE_SIZE, max_rows=COMMENT_MAX_ROWS,
+                        max_bytes=COMMENT_MAX_BYTES, mmap_size=MMAP_SIZE)
+stats.gauge('dojo_comment_commits', lambda: comments.commits, 'Comment store transactions committed by this worker.')
+stats.gauge('dojo_comment_writes', lambda: comments.writes, 'Comment store writes applied by this worker.')
+stats.gauge('dojo_comment_evictions', lambda: comments.evicted, 'Comments evicted by the per-session caps.')
 
 # --- TEMPLATES (Frontend - Blue Holographic Theme) ---
-# FIX: Changed {% block extra_head %} to {{ extra_head|default('')|safe }} so variables pass through correctly
+# FIX: Changed {% block extra_head %} to {{ extra_head|default('')|safe }} so variables pass through correctly (see dojo/layout.py)
 base_layout = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>XSS DOJO | Advanced Cyber Range</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-    <link href="https://fonts.googleapis.com/css2?family=Rajdhani:wght@400;600;700&family=Source+Code+Pro:wght@400;700&display=swap" rel="stylesheet">
-    <style>
-        body { 
-            font-family: 'Rajdhani', sans-serif; 
-            background-color: #020617; /* Slate 950 */
-            color: #38bdf8; /* Sky 400 */
-            background-image: 
-                linear-gradient(rgba(6, 182, 212, 0.1) 1px, transparent 1px), 
-                linear-gradient(90deg, rgba(6, 182, 212, 0.1) 1px, transparent 1px);
-            background-size: 40px 40px;
-        }
-        
-        .mono-font { font-family: 'Source Code Pro', monospace; }
-        
-        /* Holographic Effects */
-        .holo-text { text-shadow: 0 0 5px #0ea5e9, 0 0 10px #0ea5e9; }
-        .holo-box { 
-            background: rgba(8, 47, 73, 0.6); 
-            border: 1px solid #0ea5e9; 
-            box-shadow: 0 0 15px rgba(14, 165, 233, 0.2), inset 0 0 20px rgba(14, 165, 233, 0.1); 
-            backdrop-filter: blur(4px);
-        }
-        
-        input, textarea, select { 
-            background-color: #0f172a; 
-            color: #bae6fd; 
-            border: 1px solid #1e40af; 
-            font-family: 'Source Code Pro', monospace;
-        }
-        input:focus, textarea:focus, select:focus { 
-            outline: none; 
-            border-color: #38bdf8; 
-            box-shadow: 0 0 10px #38bdf8; 
-        }
-        
-        .scan-line {
-            width: 100%;
-            height: 2px;
-            background: rgba(56, 189, 248, 0.5);
-            animation: scan 3s linear infinite;
-        }
-        @keyframes scan {
-            0% { transform: translateY(0); opacity: 0; }
-            50% { opacity: 1; }
-            100% { transform: translateY(400px); opacity: 0; }
-        }
-
-        /* Scrollbar */
-        ::-webkit-scrollbar { width: 8px; }
-        ::-webkit-scrollbar-track { background: #020617; }
-        ::-webkit-scrollbar-thumb { background: #0369a1; border-radius: 4px; }
-        ::-webkit-scrollbar-thumb:hover { background: #0ea5e9; }
-    </style>
-    {{ extra_head|default('')|safe }}
-</head>
-<body class="min-h-screen flex flex-col overflow-x-hidden">
+{% extends dojo_layout %}
+{% block title %}XSS DOJO | Advanced Cyber Range{% endblock %}
+{% block nav %}
     <!-- Navbar -->
     <nav class="bg-slate-950/90 border-b border-cyan-800 p-4 sticky top-0 z-50 backdrop-blur-md">
         <div class="container mx-auto flex justify-between items-center">
-            <a href="/" class="text-3xl font-bold holo-text tracking-widest flex items-center gap-2">
+            <a href="{{ request.script_root }}/" class="text-3xl font-bold holo-text tracking-widest flex items-center gap-2">
                 [XSS_DOJO]
             </a>
             <div class="space-x-6 text-sm flex items-center font-bold">
                 <span class="text-cyan-600 uppercase tracking-widest">SYSTEM: <span class="text-cyan-400">OPERATIONAL</span></span>
-                <a href="/reset" class="text-red-400 hover:text-red-200 border border-red-900/50 bg-red-900/20 px-4 py-1 rounded transition-all hover:shadow-[0_0_10px_rgba(248,113,113,0.5)]">
+                <a href="{{ request.script_root }}/reset" class="text-red-400 hover:text-red-200 border border-red-900/50 bg-red-900/20 px-4 py-1 rounded transition-all hover:shadow-[0_0_10px_rgba(248,113,113,0.5)]">
                     // RESET_DB
                 </a>
             </div>
         </div>
     </nav>
-
-    <div class="container mx-auto flex-grow flex flex-col md:flex-row mt-8 gap-6 px-4 mb-10">
-        <!-- Sidebar Navigation -->
-        <aside class="md:w-72 flex-shrink-0">
-            <div class="holo-box p-5 rounded-lg h-full">
+{% endblock %}
+{% block modules_heading %}
                 <h3 class="text-cyan-300 uppercase text-sm font-bold mb-4 border-b border-cyan-800 pb-2 flex justify-between">
                     <span>Training Modules</span>
                     <span>v2.2</span>
                 </h3>
-                <div class="space-y-1">
-                {% for i in range(1, 11) %}
-                <a href="/level{{i}}" class="block px-3 py-2 text-sm rounded transition-all duration-200 mono-font
-                    {{ 'bg-cyan-900/50 text-white border-l-4 border-cyan-400 shadow-[0_0_10px_rgba(34,211,238,0.3)]' if active_level == i else 'text-slate-400 hover:text-cyan-200 hover:bg-cyan-900/20 hover:pl-4' }}">
-                    Level {{ '%02d' % i }} :: {{ titles[i-1] }}
-                </a>
-                {% endfor %}
-                </div>
-            </div>
-        </aside>
-
-        <!-- Main Interface -->
-        <main class="flex-1 relative">
-            <div class="mb-6">
+{% endblock %}
+{% block level_link %}{{ 'bg-cyan-900/50 text-white border-l-4 border-cyan-400 shadow-[0_0_10px_rgba(34,211,238,0.3)]' if active_level == i else 'text-slate-400 hover:text-cyan-200 hover:bg-cyan-900/20 hover:pl-4' }}{% endblock %}
+{% block heading %}
                 <div class="flex items-end gap-4 mb-2">
                     <h1 class="text-5xl font-bold text-white drop-shadow-[0_0_5px_rgba(255,255,255,0.5)]">{{ current_title }}</h1>
                     <span class="text-cyan-600 font-mono text-xl mb-1">ID: {{ 'L%02d' % active_level }}</span>
@@ -137,21 +119,19 @@ base_layout = """
                 <p class="text-slate-300 mono-font border-l-2 border-cyan-600 pl-4 py-1 bg-gradient-to-r from-cyan-900/20 to-transparent">
                     <span class="text-cyan-500 font-bold">Briefing:</span> {{ description }}
                 </p>
-            </div>
-            
+{% endblock %}
+{% block panel %}
             <div class="holo-box p-8 min-h-[400px] relative rounded-lg overflow-hidden">
                 <div class="scan-line absolute top-0 left-0 pointer-events-none opacity-20"></div>
                 <!-- Injection Point Rendered Here -->
                 {{ content | safe }}
             </div>
-        </main>
-    </div>
-    
+{% endblock %}
+{% block footer %}
     <footer class="bg-slate-950 border-t border-cyan-900 text-center p-6 text-slate-600 text-xs mt-auto mono-font">
         © sondt (Administrator) // All Rights Reserved
     </footer>
-</body>
-</html>
+{% endblock %}
 """
 
 titles = [
@@ -167,18 +147,30 @@ titles = [
     "CSP Bypass (JSONP Gadget)"
 ]
 
+def render_page(level_id, description, content, **kwargs):
+    # Hands out the session id on first view, so the trainee's first payload is scored (see dojo/scoreboard.py).
+    session.current_sid()
+    return templates.render(base_layout, active_level=level_id, titles=titles,
+                            current_title=titles[level_id-1],
+                            description=description,
+                            content=content, **kwargs)
+
+templates.preload(base_layout)
+
 # --- ROUTES ---
 
 @app.route('/')
 def index():
-    return redirect('/level1')
+    return redirect(url_for('level1'))
 
 @app.route('/reset')
 def reset():
-    global db
-    db.close()
-    db = init_db()
-    return redirect('/')
+    # Only level 2 keeps state, and only the caller's own comments are removed.
+    level = request.args.get('level', type=int)
+    comments.clear(session.current_sid())
+    if level in range(1, 11):
+        return redirect(url_for(f'level{level}'))
+    return redirect(url_for('index'))
 
 # LEVEL 1: Reflected (Basic)
 @app.route('/level1')
@@ -198,10 +190,7 @@ def level1():
             <div class="text-3xl text-white break-words font-light">Welcome back, <span class="text-cyan-300">{query}</span></div>
         </div>
     """
-    return render_template_string(base_layout, active_level=1, titles=titles, 
-                                  current_title=titles[0], 
-                                  description="The basics. No filters applied. Input is reflected directly into the HTML body.",
-                                  content=html_content)
+    return render_page(1, "The basics. No filters applied. Input is reflected directly into the HTML body.", html_content)
 
 # LEVEL 2: Stored
 @app.route('/level2', methods=['GET', 'POST'])
@@ -209,16 +198,23 @@ def level2():
     if request.method == 'POST':
         comment = request.form.get('comment', '')
         # VULN: Stored XSS without sanitization
-        c = db.cursor()
-        c.execute("INSERT INTO comments (content) VALUES (?)", (comment,))
-        db.commit()
-        return redirect('/level2')
-
-    c = db.cursor()
-    c.execute("SELECT content FROM comments")
-    comments = c.fetchall()
+        with timing.phase('sql'):
+            try:
+                comments.add(session.current_sid(), comment)
+            except CommentTooLarge:
+                abort(413)
+        return redirect(url_for('level2'))
+
+    before = request.args.get('before', type=int)
+    with timing.phase('sql'):
+        rows, older = comments.page(session.current_sid(), before)
     
-    comments_html = "".join([f'<div class="border-l-2 border-cyan-500 bg-slate-900/50 p-4 mb-3 text-cyan-100 break-words shadow-sm">{row[0]}</div>' for row in comments])
+    comments_html = "".join([f'<div class="border-l-2 border-cyan-500 bg-slate-900/50 p-4 mb-3 text-cyan-100 break-words shadow-sm">{row[1]}</div>' for row in rows])
+    pager = ''
+    if before is not None:
+        pager += f'<a href="{url_for("level2")}" class="text-cyan-500 underline">Newest</a>'
+    if older is not None:
+        pager += f'<a href="{url_for("level2", before=older)}" class="text-cyan-500 underline">Older entries</a>'
     
     html_content = f"""
         <div class="grid grid-cols-1 lg:grid-cols-2 gap-8">
@@ -232,18 +228,17 @@ def level2():
             <div class="bg-slate-950/30 p-4 rounded border border-slate-800">
                 <h3 class="font-bold mb-4 text-xl text-cyan-400 border-b border-cyan-800/50 pb-2">SERVER LOGS</h3>
                 <div class="h-80 overflow-y-auto pr-2 custom-scrollbar">
-                    {comments_html if comments else '<div class="text-slate-600 italic text-center mt-10">No entries found.</div>'}
+                    {comments_html if rows else '<div class="text-slate-600 italic text-center mt-10">No entries found.</div>'}
                 </div>
+                {f'<div class="flex justify-between mt-3 text-sm">{pager}</div>' if pager else ''}
             </div>
         </div>
     """
-    return render_template_string(base_layout, active_level=2, titles=titles,
-                                  current_title=titles[1],
-                                  description="Persistence. The payload is saved to the database and executed every time the page loads.",
-                                  content=html_content)
+    return render_page(2, "Persistence. The payload is saved to the database and executed every time the page loads.", html_content)
 
 # LEVEL 3: DOM Based
 @app.route('/level3')
+@pages.static()
 def level3():
     html_content = """
         <div class="text-center py-12">
@@ -269,18 +264,19 @@ def level3():
             }, 500);
         </script>
     """
-    return render_template_string(base_layout, active_level=3, titles=titles,
-                                  current_title=titles[2],
-                                  description="Client-side vulnerability. The server does not see the payload.",
-                                  content=html_content)
+    return render_page(3, "Client-side vulnerability. The server does not see the payload.", html_content)
 
 # LEVEL 4: Tag Filter (No Script)
 @app.route('/level4')
 def level4():
     query = request.args.get('q', '')
-    # FILTER: Remove <script> tags (case insensitive)
-    safe_query = re.sub(r'(?i)<script.*?>.*?</script>', '[BLOCKED]', query)
-    safe_query = re.sub(r'(?i)<script', '[BLOCKED]', safe_query)
+    # FILTER: Remove <script> tags (case insensitive). Same output as:
+    #   safe_query = re.sub(r'(?i)<script.*?>.*?</script>', '[BLOCKED]', query)
+    #   safe_query = re.sub(r'(?i)<script', '[BLOCKED]', safe_query)
+    # but computed in one linear pass (see dojo/waf.py).
+    safe_query = waf.XSS_LEVEL4.sanitize(query)
+    if safe_query != query:
+        metrics.waf_block('level4')
     
     html_content = f"""
         <form method="GET" class="max-w-2xl mx-auto">
@@ -298,10 +294,7 @@ def level4():
             <div class="text-xl">{safe_query}</div>
         </div>
     """
-    return render_template_string(base_layout, active_level=4, titles=titles,
-                                  current_title=titles[3],
-                                  description="Bypass. The administrator has blocked the <script> tag.",
-                                  content=html_content)
+    return render_page(4, "Bypass. The administrator has blocked the <script> tag.", html_content)
 
 # LEVEL 5: Attribute Injection
 @app.route('/level5')
@@ -323,10 +316,7 @@ def level5():
             </form>
           </div>
     """
-    return render_template_string(base_layout, active_level=5, titles=titles,
-                                  current_title=titles[4],
-                                  description="Context Breakout. Angle brackets are escaped. You cannot create new tags.",
-                                  content=html_content)
+    return render_page(5, "Context Breakout. Angle brackets are escaped. You cannot create new tags.", html_content)
 
 # LEVEL 6: Protocol Injection
 @app.route('/level6')
@@ -357,10 +347,7 @@ def level6():
             </form>
         </div>
     """
-    return render_template_string(base_layout, active_level=6, titles=titles,
-                                  current_title=titles[5],
-                                  description="Protocol. All HTML characters are escaped. You are trapped inside the href attribute.",
-                                  content=html_content)
+    return render_page(6, "Protocol. All HTML characters are escaped. You are trapped inside the href attribute.", html_content)
 
 # LEVEL 7: JS Context
 @app.route('/level7')
@@ -386,10 +373,7 @@ def level7():
             <button class="ml-2 bg-cyan-700 text-white px-4 py-2 rounded">UPDATE</button>
         </form>
     """
-    return render_template_string(base_layout, active_level=7, titles=titles,
-                                  current_title=titles[6],
-                                  description="Script Injection. Input is inside a JS string. Tags and double quotes are blocked.",
-                                  content=html_content)
+    return render_page(7, "Script Injection. Input is inside a JS string. Tags and double quotes are blocked.", html_content)
 
 # LEVEL 8: Double Encoding
 @app.route('/level8')
@@ -399,8 +383,10 @@ def level8():
     # 1. WAF CHECK (Checks on raw input)
     decoded_once = urllib.parse.unquote(raw_query)
     
-    if '<script' in decoded_once.lower() or 'javascript:' in decoded_once.lower():
-        return render_template_string(base_layout, active_level=8, titles=titles, current_title=titles[7], description="BLOCKED", content="<div class='text-red-500 text-center text-4xl font-bold border-2 border-red-500 p-10 bg-red-900/20'>🚫 WAF BLOCKED REQUEST</div>")
+    # Same as: '<script' in decoded_once.lower() or 'javascript:' in decoded_once.lower()
+    if waf.XSS_LEVEL8.check(decoded_once):
+        metrics.waf_block('level8')
+        return render_page(8, "BLOCKED", "<div class='text-red-500 text-center text-4xl font-bold border-2 border-red-500 p-10 bg-red-900/20'>🚫 WAF BLOCKED REQUEST</div>")
 
     # 2. VULNERABILITY: Application decodes AGAIN
     final_content = urllib.parse.unquote(decoded_once)
@@ -417,13 +403,11 @@ def level8():
             Search result: <span class="text-white">{final_content}</span>
         </div>
     """
-    return render_template_string(base_layout, active_level=8, titles=titles,
-                                  current_title=titles[7],
-                                  description="Obfuscation. The WAF checks for '<script' and 'javascript:'.",
-                                  content=html_content)
+    return render_page(8, "Obfuscation. The WAF checks for '<script' and 'javascript:'.", html_content)
 
 # LEVEL 9: Client-Side Template Injection (CSTI)
 @app.route('/level9')
+@pages.static()
 def level9():
     # Fix: Use raw string (r) for regex to avoid syntax warning about invalid escape sequence \s
     html_content = r"""
@@ -471,13 +455,14 @@ def level9():
             window.addEventListener('hashchange', parseTemplate);
         </script>
     """
-    return render_template_string(base_layout, active_level=9, titles=titles,
-                                  current_title=titles[8],
-                                  description="Template Injection. The application manually parses '{{ code }}' and executes it.",
-                                  content=html_content)
+    return render_page(9, "Template Injection. The application manually parses '{{ code }}' and executes it.", html_content)
 
 # LEVEL 10: CSP Bypass (JSONP/Gadget)
+# Only the callbacks the app itself uses are cached; anything else is a trainee's payload.
+CACHED_CALLBACKS = ('init', 'loadWidgets')
+
 @app.route('/api/widgets')
+@pages.static(variant=lambda: request.args.get('callback', 'init') if request.args.get('callback', 'init') in CACHED_CALLBACKS else None)
 def api_widgets():
     callback = request.args.get('callback', 'init')
     data = json.dumps({"status": "ok", "items": ["Widget A", "Widget B"]})
@@ -523,7 +508,7 @@ def level10():
             </div>
             
             <!-- Safe Widget Loader using internal API -->
-            <script src="/api/widgets?callback=loadWidgets"></script>
+            <script src="{request.script_root}/api/widgets?callback=loadWidgets"></script>
             <script>
                 // This inline script will be BLOCKED by CSP
                 console.log("If you see this, CSP is broken.");
@@ -535,12 +520,8 @@ def level10():
         </div>
     """
     
-    # FIX: Pass extra_head directly to render_template_string
-    return render_template_string(base_layout, active_level=10, titles=titles,
-                                  current_title=titles[9],
-                                  description="CSP Bypass. 'script-src self' is active. Inline scripts are blocked.",
-                                  content=html_content,
-                                  extra_head=custom_head)
+    # FIX: Pass extra_head directly to render_page
+    return render_page(10, "CSP Bypass. 'script-src self' is active. Inline scripts are blocked.", html_content, extra_head=custom_head)
 
 if __name__ == '__main__':
     app.run(debug=False, port=1112)
\ No newline at end of file